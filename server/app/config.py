@@ -1,5 +1,7 @@
 # config.py
 import os
+from typing import Any, Optional
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -12,6 +14,87 @@ class Settings(BaseSettings):
     confluence_api_token: str
     confluence_space_key: str
 
+    # --- Local Fake Confluence ---
+    # When set, every Confluence call goes to a fake_confluence.py instance at this URL
+    # and the Confluence credentials above may be left unset.
+    fake_confluence_url: Optional[str] = None
+
+    # --- Confluence HTTP Client Settings ---
+    confluence_pool_size: int = 20
+    confluence_timeout_seconds: float = 10.0
+    confluence_connect_timeout_seconds: float = 5.0
+    confluence_upload_timeout_seconds: float = 120.0
+
+    # How often the cached root-page mapping is re-checked against Confluence
+    root_page_refresh_seconds: int = 6 * 3600
+
+    # --- Page Body Cache Settings ---
+    content_cache_max_entries: int = 500
+    content_cache_dir: Optional[str] = None
+    content_cache_ttl_seconds: int = 600
+    content_fetch_timeout_seconds: float = 4.0
+
+    # --- Attachment Cache Settings ---
+    attachment_cache_dir: str = "/tmp/attachment_cache"
+    attachment_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    attachment_cache_max_file_bytes: int = 200 * 1024 * 1024
+    attachment_cache_max_age_seconds: int = 3600
+
+    # --- Attachment Streaming Settings ---
+    # Keep the stream cap below confluence_pool_size so page reads always find a free connection.
+    attachment_stream_max_concurrent: int = 8
+    attachment_stream_queue_timeout_seconds: float = 5.0
+    attachment_stream_min_chunk_bytes: int = 64 * 1024
+    attachment_stream_max_chunk_bytes: int = 1024 * 1024
+
+    # --- Attachment Upload Settings ---
+    attachment_upload_concurrency: int = 4
+    attachment_upload_max_attempts: int = 3
+    attachment_upload_chunk_bytes: int = 256 * 1024
+
+    # --- Confluence Rate Limit Settings ---
+    confluence_rate_limit_per_second: float = 10.0
+    confluence_rate_limit_burst: int = 20
+    confluence_background_reserve_tokens: int = 5
+    confluence_rate_limit_max_retries: int = 2
+    confluence_retry_after_max_seconds: float = 60.0
+
+    # --- Confluence Circuit Breaker Settings ---
+    confluence_breaker_failure_threshold: int = 5
+    confluence_breaker_reset_seconds: float = 30.0
+
+    # --- Search Settings ---
+    # Hard cap on title suggestions returned per typeahead request
+    typeahead_max_results: int = 20
+    search_cache_max_entries: int = 500
+    search_cache_ttl_seconds: float = 60.0
+    # How often each worker re-reads the content version bumped by other workers
+    search_cache_version_poll_seconds: float = 2.0
+    # "postgres" (tsvector full-text index) or "bm25" (embedded index, no extensions needed)
+    search_backend: str = "postgres"
+    # Highlighted fragments per search hit, and words per fragment
+    search_snippet_fragments: int = 2
+    search_snippet_window_words: int = 24
+    # Pages fetched from Confluence per step when indexing pages that have no search entry yet
+    page_content_backfill_batch_size: int = 20
+    bm25_index_dir: str = "/tmp/bm25_index"
+    # Publish segments kept before the index is rebuilt into a single base segment
+    bm25_max_segments: int = 16
+
+    # --- Page Tree Settings ---
+    # How often each worker checks whether its in-memory page tree is outdated
+    page_tree_version_poll_seconds: float = 2.0
+    # How often the stored child counts are re-checked against the Page table
+    child_count_reconcile_seconds: int = 6 * 3600
+
+    # --- HTML Processing Settings ---
+    # Worker processes for HTML parsing and conversion (0 runs everything on the event loop)
+    html_pool_workers: int = 2
+    # Documents per task when a batch is sent to the pool
+    html_pool_chunk_size: int = 8
+    # Smaller documents are parsed inline; the IPC round trip would cost more than the parse
+    html_pool_inline_max_bytes: int = 16 * 1024
+
     # --- Database Settings (NEW) ---
     database_url: str
 
@@ -20,6 +103,16 @@ class Settings(BaseSettings):
     algorithm: str
     access_token_expire_minutes: int
 
+    @model_validator(mode="before")
+    @classmethod
+    def use_fake_confluence(cls, values: Any) -> Any:
+        if isinstance(values, dict) and values.get("fake_confluence_url"):
+            values["confluence_url"] = values["fake_confluence_url"]
+            values.setdefault("confluence_username", "fake")
+            values.setdefault("confluence_api_token", "fake")
+            values.setdefault("confluence_space_key", "KB")
+        return values
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
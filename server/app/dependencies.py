@@ -0,0 +1,13 @@
+# server/app/dependencies.py
+from fastapi import Request
+
+from app.services.confluence_service import ConfluenceService
+
+
+def get_confluence_service(request: Request) -> ConfluenceService:
+    """
+    Returns the process-wide ConfluenceService created in the app lifespan
+    (see app.main), so every router shares one connection pool and one
+    root-page mapping.
+    """
+    return request.app.state.confluence_service
@@ -1,20 +1,21 @@
 # server/app/main.py
 import os
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.db import db
-from app.routers import knowledge_router, auth_router, cms_router, notification_router, group_router, tag_router
+from app.config import settings
+from app.services.confluence_service import ConfluenceService
+from app.services.outbound_scheduler import priority_scope, Priority
+from app.services.bm25_index import bm25_index
+from app.services.html_pool import html_pool
+from app.services.page_tree import page_tree
+from app.routers import knowledge_router, auth_router, cms_router, notification_router, group_router, tag_router, metrics_router
 
-app = FastAPI(
-    title="Knowledge Hub API",
-    description="Fetches and transforms data from Confluence.",
-    version="1.0.0"
-)
-
-# --- Background Task ---
+# --- Background Tasks ---
 async def cleanup_old_notifications():
     """
     A background task that runs every hour to delete notifications
@@ -44,14 +45,96 @@ async def cleanup_old_notifications():
             # Catch exceptions so the loop doesn't break
             print(f"Error during notification cleanup: {e}")
 
-@app.on_event("startup")
-async def startup():
+async def reconcile_child_counts(confluence_service: ConfluenceService):
+    """
+    Periodically repairs the denormalized child counts on Page. The database
+    triggers keep them current; this only catches rows changed outside them
+    (manual SQL, restored backups).
+    """
+    while True:
+        try:
+            await asyncio.sleep(settings.child_count_reconcile_seconds)
+            repaired = await confluence_service.page_repo.reconcile_child_counts()
+            if repaired:
+                print(f"[{datetime.now()}] Repaired child counts on {repaired} page(s).")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error during child count reconciliation: {e}")
+
+async def refresh_root_pages(confluence_service: ConfluenceService, refresh_now: bool):
+    """
+    Keeps the cached root-page mapping in line with Confluence. When startup used
+    the DB cache, it is re-checked once right away (in the background), then
+    every `root_page_refresh_seconds`.
+    """
+    with priority_scope(Priority.BACKGROUND):
+        while True:
+            try:
+                if refresh_now:
+                    await confluence_service.refresh_root_pages()
+                refresh_now = True
+                await asyncio.sleep(settings.root_page_refresh_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error during root page refresh: {e}")
+                await asyncio.sleep(60)
+
+async def backfill_page_content(confluence_service: ConfluenceService):
+    """
+    Indexes pages that were synced before the search index existed. Runs once
+    per start and is a no-op once every page has a search entry.
+    """
+    with priority_scope(Priority.BACKGROUND):
+        try:
+            indexed = await confluence_service.backfill_page_content()
+            if indexed:
+                print(f"[{datetime.now()}] Indexed {indexed} page(s) that had no search entry.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error during page content backfill: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     await db.connect()
-    asyncio.create_task(cleanup_old_notifications())
 
-@app.on_event("shutdown")
-async def shutdown():
-    await db.disconnect()
+    # One ConfluenceService (and one Confluence connection pool) per process, shared by all routers
+    confluence_service = ConfluenceService(settings)
+    app.state.confluence_service = confluence_service
+    source = await confluence_service.load_root_pages()
+    print(
+        f"Root pages loaded from {source}; "
+        f"{confluence_service.confluence_repo.upstream_requests} Confluence request(s) made during startup."
+    )
+    tree = await page_tree.rebuild()
+    print(f"Page tree loaded: {len(tree)} pages in {page_tree.last_build_ms:.0f}ms.")
+    if settings.search_backend == "bm25" and not bm25_index.exists():
+        # First start on this host; later workers map the files written here
+        await confluence_service.rebuild_bm25_index()
+
+    background_tasks = [
+        asyncio.create_task(cleanup_old_notifications()),
+        asyncio.create_task(refresh_root_pages(confluence_service, refresh_now=(source == "cache"))),
+        asyncio.create_task(reconcile_child_counts(confluence_service)),
+        asyncio.create_task(backfill_page_content(confluence_service)),
+    ]
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await confluence_service.close()
+        html_pool.shutdown()
+        await db.disconnect()
+
+app = FastAPI(
+    title="Knowledge Hub API",
+    description="Fetches and transforms data from Confluence.",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
 origins = [
     "http://localhost:8080",
@@ -79,6 +162,7 @@ app.include_router(cms_router.router)
 app.include_router(notification_router.router)
 app.include_router(group_router.router, prefix="/api/groups")
 app.include_router(tag_router.router, prefix="/api/tags")
+app.include_router(metrics_router.router)
 
 
 @app.get("/", tags=["Health Check"])
@@ -11,7 +11,7 @@ from app.services.submission_repository import SubmissionRepository
 from app.schemas import cms_schemas, content_schemas, auth_schemas
 from app.schemas.content_schemas import PageTreeNodeWithPermission, PageTreeNode
 from app.schemas.cms_schemas import ContentNode
-from app.config import settings
+from app.dependencies import get_confluence_service
 from .auth_router import get_current_user, get_current_admin_user
 
 router = APIRouter(
@@ -19,8 +19,7 @@ router = APIRouter(
     tags=["CMS"]
 )
 
-# Instantiate the service and new repository
-confluence_service = ConfluenceService(settings)
+# Instantiate the repository and services (the ConfluenceService is shared, see app.dependencies)
 submission_repo = SubmissionRepository()
 permission_service = PermissionService()
 
@@ -31,7 +30,8 @@ permission_service = PermissionService()
 )
 async def get_content_index(
     parent_id: Optional[str] = Query(None),
-    current_user: auth_schemas.UserResponse = Depends(get_current_user) # Inject user
+    current_user: auth_schemas.UserResponse = Depends(get_current_user), # Inject user
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
     Provides a hierarchical tree of content.
@@ -70,7 +70,7 @@ async def upload_attachment_endpoint(file: UploadFile = File(...)):
     response_model=List[PageTreeNode],
     dependencies=[Depends(get_current_user)]
 )
-async def get_page_tree_structure(parent_id: Optional[str] = Query(None)):
+async def get_page_tree_structure(parent_id: Optional[str] = Query(None), confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches the page hierarchy in a tree structure for the CMS from the local database.
     - If `parent_id` is not provided, returns the top-level root pages.
@@ -86,7 +86,8 @@ async def get_page_tree_structure(parent_id: Optional[str] = Query(None)):
 async def get_page_tree_with_permissions_endpoint(
     parent_id: Optional[str] = Query(None),
     allowed_only: bool = Query(False),
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
     Fetches the page hierarchy for the create page, including a permission flag
@@ -102,7 +103,8 @@ async def get_page_tree_with_permissions_endpoint(
 )
 async def create_page(
     page_data: cms_schemas.PageCreate,
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """Orchestrates page creation via the Confluence service."""
     created_page = await confluence_service.create_page_for_review(page_data, current_user.id, current_user.name)
@@ -148,7 +150,8 @@ async def preview_attachment(temp_id: str):
 )
 async def get_page_details_for_edit_endpoint(
     page_id: str,
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
     Fetches the combined data for a page from both the DB and Confluence,
@@ -178,7 +181,8 @@ async def get_page_details_for_edit_endpoint(
 async def update_page_endpoint(
     page_id: str,
     page_data: cms_schemas.PageUpdate,
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
     Updates an existing page.
@@ -208,7 +212,7 @@ async def update_page_endpoint(
     # CHANGED: Allow Group Admins to preview
     dependencies=[Depends(get_current_user)]
 )
-async def get_article_preview_endpoint(page_id: str, current_user: auth_schemas.UserResponse = Depends(get_current_user)):
+async def get_article_preview_endpoint(page_id: str, current_user: auth_schemas.UserResponse = Depends(get_current_user), confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches the full content of a pending article for an admin to preview,
     using the main hybrid fetcher to ensure data consistency.
@@ -237,7 +241,7 @@ async def get_article_preview_endpoint(page_id: str, current_user: auth_schemas.
     response_model=List[content_schemas.Article], 
     dependencies=[Depends(get_current_user)]
 )
-async def get_pages_pending_review(current_user: auth_schemas.UserResponse = Depends(get_current_user)):
+async def get_pages_pending_review(current_user: auth_schemas.UserResponse = Depends(get_current_user), confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """Fetches submissions pending review visible to the current user."""
     return await confluence_service.get_pending_submissions(current_user)
 
@@ -248,7 +252,8 @@ async def get_pages_pending_review(current_user: auth_schemas.UserResponse = Dep
 )
 async def approve_page_endpoint(
     page_id: str,
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """Approves a page (Global Admin OR Group Admin)."""
     
@@ -276,7 +281,8 @@ async def approve_page_endpoint(
 async def reject_page_endpoint(
     page_id: str, 
     payload: cms_schemas.PageReject,
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """Rejects a page (Global Admin OR Group Admin)."""
     
@@ -298,7 +304,7 @@ async def reject_page_endpoint(
     response_model=List[cms_schemas.ArticleSubmissionResponse],
     dependencies=[Depends(get_current_user)]
 )
-async def get_my_submissions(current_user: auth_schemas.UserResponse = Depends(get_current_user)):
+async def get_my_submissions(current_user: auth_schemas.UserResponse = Depends(get_current_user), confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches all articles submitted by the currently authenticated user.
     """
@@ -311,7 +317,8 @@ async def get_my_submissions(current_user: auth_schemas.UserResponse = Depends(g
 )
 async def resubmit_page_endpoint(
     page_id: str,
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
     Allows an author to resubmit their own rejected article for review.
@@ -336,7 +343,8 @@ async def resubmit_page_endpoint(
 )
 async def delete_page_permanently_endpoint(
     page_id: str,
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
     Deletes a page from Confluence and its corresponding record from the local database.
@@ -363,11 +371,30 @@ async def delete_page_permanently_endpoint(
     # CHANGED: Allow Group Admins to search index
     dependencies=[Depends(get_current_user)]
 )
-async def search_content_index_endpoint(query: str = Query(..., min_length=2)):
+async def search_content_index_endpoint(
+    query: str = Query(..., min_length=2),
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
+):
     """
     Searches the content index for pages matching the query and returns a flat list.
     """
-    return await confluence_service.search_content_index(query)
+    return await confluence_service.search_content_index(query, current_user)
+
+@router.get(
+    "/admin/content-index/suggest",
+    response_model=List[content_schemas.TitleSuggestion],
+    dependencies=[Depends(get_current_user)]
+)
+async def suggest_content_index_titles(
+    query: str = Query(..., min_length=2),
+    limit: int = Query(10, ge=1, le=20),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
+):
+    """
+    Title typeahead over every page in the index, including unpublished ones.
+    """
+    return await confluence_service.suggest_titles(query, limit, public_only=False)
 
 @router.post(
     "/admin/pages/bulk-delete",
@@ -376,7 +403,8 @@ async def search_content_index_endpoint(query: str = Query(..., min_length=2)):
 )
 async def bulk_delete_pages_endpoint(
     payload: cms_schemas.BulkDeletePayload,
-    current_user: auth_schemas.UserResponse = Depends(get_current_user)
+    current_user: auth_schemas.UserResponse = Depends(get_current_user),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
     Deletes a list of pages, respecting permissions and the rule that pages with children cannot be deleted.
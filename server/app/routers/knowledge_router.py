@@ -1,26 +1,25 @@
 # server/app/routers/knowledge_router.py
-from fastapi import APIRouter, HTTPException, Query, Response, Depends
+from fastapi import APIRouter, HTTPException, Query, Response, Depends, Request
 from typing import List, Optional, Dict, Any
 
 from app.services.confluence_service import ConfluenceService
 from app.schemas import content_schemas, auth_schemas 
-from app.config import settings
+from app.dependencies import get_confluence_service
 from app.routers.auth_router import get_current_user_optional
 from app.services.permission_service import PermissionService
 
 router = APIRouter()
-confluence_service = ConfluenceService(settings)
 permission_service = PermissionService()
 
 @router.get("/groups", response_model=List[content_schemas.GroupInfo], tags=["Knowledge Hub"])
-def get_groups():
+def get_groups(confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Returns static information about the three main content groups.
     """
     return confluence_service.get_groups()
 
 @router.get("/subsections/{group_slug}", response_model=List[content_schemas.Subsection], tags=["Knowledge Hub"])
-async def get_subsections_by_group_slug(group_slug: str):
+async def get_subsections_by_group_slug(group_slug: str, confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches the top-level subsections for a given group (e.g., 'departments')
     by querying the local database.
@@ -36,7 +35,8 @@ async def get_subsections_by_group_slug(group_slug: str):
 async def get_page_contents(
     parent_id: str,
     page: int = Query(1, ge=1),
-    pageSize: int = Query(10, ge=1, le=100)
+    pageSize: int = Query(10, ge=1, le=100),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
     Fetches paginated contents (children) of a given parent page
@@ -51,7 +51,7 @@ async def get_page_contents(
         raise HTTPException(status_code=500, detail="Failed to fetch page contents.")
 
 @router.get("/article/{page_id}", response_model=content_schemas.Article, tags=["Knowledge Hub"])
-async def get_article(page_id: str, current_user: Optional[auth_schemas.UserResponse] = Depends(get_current_user_optional)):
+async def get_article(page_id: str, current_user: Optional[auth_schemas.UserResponse] = Depends(get_current_user_optional), confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     HYBRID FETCH: Fetches article metadata, live content, and checks edit permissions.
     """
@@ -66,7 +66,7 @@ async def get_article(page_id: str, current_user: Optional[auth_schemas.UserResp
     return article_data
 
 @router.get("/page/{page_id}", response_model=content_schemas.Subsection, tags=["Knowledge Hub"])
-async def get_page_by_id(page_id: str):
+async def get_page_by_id(page_id: str, confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     HYBRID FETCH: Fetches subsection metadata from the local DB and its
     live content from Confluence.
@@ -77,7 +77,7 @@ async def get_page_by_id(page_id: str):
     return page_data
 
 @router.get("/ancestors/{page_id}", response_model=List[content_schemas.Ancestor], tags=["Knowledge Hub"])
-async def get_ancestors(page_id: str):
+async def get_ancestors(page_id: str, confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches the ancestor hierarchy for a given page from the local DB.
     """
@@ -88,56 +88,78 @@ async def search_knowledge_hub(
     q: str = Query(..., min_length=2, description="Search query string"),
     mode: str = Query("all", description="Search mode: all, title, content, tags"),
     sort: str = Query("relevance", description="Sort order: relevance, date, views"),
+    match: str = Query("all", description="Tag mode only: match all or any of the tags"),
     page: int = Query(1, ge=1),
-    pageSize: int = Query(10, ge=1, le=50)
+    pageSize: int = Query(10, ge=1, le=50),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
 ):
     """
-    Directly searches Confluence, builds results from the API, and supports sorting.
+    Searches the local index. Tag searches also return facet counts per tag and per group.
     """
     try:
         # This now passes all parameters correctly to the service layer
-        return await confluence_service.search_content_hybrid(query=q, mode=mode, sort=sort, page=page, page_size=pageSize)
+        return await confluence_service.search_content_hybrid(query=q, mode=mode, sort=sort, page=page, page_size=pageSize, match=match)
     except HTTPException as e:
         raise e
     except Exception as e:
         print(f"Error in search_knowledge_hub router: {e}")
         raise HTTPException(status_code=500, detail="Search failed.")
 
+@router.get("/search/suggest", response_model=List[content_schemas.TitleSuggestion], tags=["Knowledge Hub"])
+async def suggest_titles(
+    q: str = Query(..., min_length=2, description="Title prefix or fragment"),
+    limit: int = Query(8, ge=1, le=20),
+    confluence_service: ConfluenceService = Depends(get_confluence_service)
+):
+    """
+    Title typeahead for the search bar, served from the local trigram index.
+    """
+    return await confluence_service.suggest_titles(q, limit)
+
 @router.get("/articles/popular", response_model=List[content_schemas.Article], tags=["Knowledge Hub"])
-async def get_popular_articles(limit: int = 6):
+async def get_popular_articles(limit: int = 6, confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches the most popular articles (by views) from the local DB.
     """
     return await confluence_service.get_popular_articles(limit=limit)
 
 @router.get("/articles/recent", response_model=List[content_schemas.Article], tags=["Knowledge Hub"])
-async def get_recent_articles(limit: int = 6):
+async def get_recent_articles(limit: int = 6, confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches the most recently updated articles from the local DB.
     """
     return await confluence_service.get_recent_articles(limit=limit)
 
 @router.get("/whats-new", response_model=List[content_schemas.Article], tags=["Knowledge Hub"])
-async def get_whats_new(limit: int = 20):
+async def get_whats_new(limit: int = 20, confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches the "what's new" feed (most recent articles) from the local DB.
     """
     return await confluence_service.get_whats_new(limit)
 
 @router.get("/tags", response_model=List[content_schemas.Tag], tags=["Knowledge Hub"])
-async def get_all_tags_endpoint():
+async def get_all_tags_endpoint(confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
     Fetches all unique tags from the local DB.
     """
     return await confluence_service.get_all_tags()
 
 @router.get("/attachment/{page_id}/{file_name}", tags=["Knowledge Hub"])
-def get_attachment(page_id: str, file_name: str):
+async def get_attachment(page_id: str, file_name: str, request: Request, confluence_service: ConfluenceService = Depends(get_confluence_service)):
     """
-    Streams an attachment file (like an image or PDF) directly from Confluence.
+    Serves an attachment file (like an image or PDF) from the local attachment
+    cache, fetching it from Confluence on a miss. Files too large for the cache
+    are streamed from Confluence asynchronously. Supports ETag revalidation
+    and Range requests.
     """
     try:
-        attachment_stream = confluence_service.get_attachment_data(page_id, file_name)
+        attachment_stream = await confluence_service.get_attachment_data(
+            page_id,
+            file_name,
+            if_none_match=request.headers.get("if-none-match"),
+            range_header=request.headers.get("range"),
+            request=request
+        )
         if not attachment_stream:
             raise HTTPException(status_code=404, detail="Attachment not found.")
         
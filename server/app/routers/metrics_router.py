@@ -0,0 +1,40 @@
+# server/app/routers/metrics_router.py
+from fastapi import APIRouter, Depends, Request
+from typing import Dict, Any
+
+from app.services.content_cache import page_body_cache
+from app.services.attachment_cache import attachment_cache
+from app.services.resilience import confluence_breaker, attachment_stream_limiter
+from app.services.single_flight import confluence_single_flight
+from app.services.outbound_scheduler import confluence_scheduler
+from app.services.search_cache import search_result_cache
+from app.services.bm25_index import bm25_index
+from app.services.html_pool import html_pool
+from app.services.page_tree import page_tree
+from app.config import settings
+from .auth_router import get_current_admin_user
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+    dependencies=[Depends(get_current_admin_user)]
+)
+
+@router.get("", response_model=Dict[str, Any])
+async def get_metrics(request: Request):
+    """
+    Returns in-process performance counters for this worker.
+    """
+    return {
+        "contentCache": page_body_cache.stats(),
+        "attachmentCache": attachment_cache.stats(),
+        "attachmentStreams": attachment_stream_limiter.stats(),
+        "searchCache": search_result_cache.stats(),
+        "searchIndex": bm25_index.stats() if settings.search_backend == "bm25" else {"backend": settings.search_backend},
+        "htmlPool": html_pool.stats(),
+        "pageTree": page_tree.stats(),
+        "confluenceCircuit": confluence_breaker.stats(),
+        "confluenceCoalescing": confluence_single_flight.stats(),
+        "confluenceScheduler": confluence_scheduler.stats(),
+        "confluenceRequests": request.app.state.confluence_service.confluence_repo.upstream_requests,
+    }
@@ -1,6 +1,6 @@
 # server/app/schemas/cms_schemas.py
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -13,6 +13,16 @@ class AttachmentInfo(BaseModel):
     temp_id: str
     file_name: str
 
+class AttachmentUploadResult(BaseModel):
+    temp_id: str
+    file_name: str
+    status: str # "uploaded", "failed" or "missing"
+    attempts: int = 0
+    attachment_id: Optional[str] = None
+    error: Optional[str] = None
+    # Raw Confluence metadata of the stored attachment, kept server-side for the attachment index
+    attachment: Optional[Dict[str, Any]] = Field(None, exclude=True)
+
 class PageCreate(BaseModel):
     title: str
     description: str
@@ -36,6 +46,7 @@ class PageCreateResponse(BaseModel):
     id: str
     title: str
     status: str
+    attachments: List[AttachmentUploadResult] = []
 
 class ArticleSubmissionResponse(BaseModel):
     id: int
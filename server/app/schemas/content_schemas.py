@@ -14,6 +14,12 @@ class GroupInfo(BaseModel):
     description: str
     icon: str
 
+class ContentFreshness(BaseModel):
+    status: Literal["fresh", "stale", "unavailable"] = "fresh"
+    fetchedAt: Optional[str] = None
+    ageSeconds: Optional[int] = None
+    revalidating: bool = False
+
 class Subsection(BaseModel):
     type: Literal["subsection"] = "subsection"
     id: str
@@ -25,6 +31,7 @@ class Subsection(BaseModel):
     tags: List[Tag]
     articleCount: int
     updatedAt: str
+    freshness: Optional[ContentFreshness] = None
 
 class Article(BaseModel):
     type: Literal["article"] = "article"
@@ -42,10 +49,18 @@ class Article(BaseModel):
     author: Optional[str] = None
     canEdit: bool = False
     parentId: Optional[str] = None
+    freshness: Optional[ContentFreshness] = None
+    highlights: Optional[List[str]] = None  # Search only: matching fragments, HTML-escaped with <mark> tags
 
     class Config:
         from_attributes = True
 
+class TitleSuggestion(BaseModel):
+    id: str
+    title: str
+    type: Literal["article", "subsection"]
+    path: List[str]  # Ancestor titles, root first
+
 # --- THIS IS THE FIX ---
 # Re-adding the PageContentItem type alias
 PageContentItem = Union[Article, Subsection]
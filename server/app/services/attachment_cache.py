@@ -0,0 +1,156 @@
+# server/app/services/attachment_cache.py
+import os
+import time
+import hashlib
+import threading
+import aiofiles
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional
+
+from app.config import settings
+
+
+class AttachmentCache:
+    """
+    Size-bounded, on-disk LRU cache of attachment files.
+
+    A Confluence attachment's bytes never change for a given (attachment id,
+    version), so files are stored under a hash of that pair and are never
+    rewritten in place. The same hash is used as the HTTP ETag. Recency is kept
+    in file mtimes, so the LRU order survives restarts.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_file_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def cache_key(attachment_id: str, version: int) -> str:
+        return hashlib.sha256(f"{attachment_id}:{version}".encode()).hexdigest()
+
+    def etag(self, attachment_id: str, version: int) -> str:
+        return f'"{self.cache_key(attachment_id, version)}"'
+
+    def _path_for_key(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _load_index(self):
+        """Rebuilds the LRU index from the files on disk, oldest first."""
+        found = []
+        for root, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if file_name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat_result.st_mtime, file_name, stat_result.st_size))
+        for _, key, size in sorted(found):
+            self._files[key] = size
+            self._total_bytes += size
+
+    def can_cache(self, size: Optional[int]) -> bool:
+        return size is not None and 0 <= size <= self.max_file_bytes
+
+    def get_path(self, attachment_id: str, version: int) -> Optional[str]:
+        """Returns the cached file path for an attachment version, or None on a miss."""
+        key = self.cache_key(attachment_id, version)
+        path = self._path_for_key(key)
+        with self._lock:
+            if key in self._files and os.path.exists(path):
+                self._files.move_to_end(key)
+                self.hits += 1
+            elif key not in self._files and os.path.exists(path):
+                # Written by another worker on this host.
+                self._files[key] = os.path.getsize(path)
+                self._total_bytes += self._files[key]
+                self.hits += 1
+            else:
+                if key in self._files:
+                    self._total_bytes -= self._files.pop(key)
+                self.misses += 1
+                return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    async def store(self, attachment_id: str, version: int, chunks: AsyncIterator[bytes]) -> str:
+        """
+        Writes an attachment to the cache from an async byte stream and returns
+        its path. The file only becomes visible once it is completely written.
+        """
+        key = self.cache_key(attachment_id, version)
+        path = self._path_for_key(key)
+        temp_path = f"{path}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        size = 0
+        try:
+            async with aiofiles.open(temp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    await f.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            if key in self._files:
+                self._total_bytes -= self._files[key]
+            self._files[key] = size
+            self._files.move_to_end(key)
+            self._total_bytes += size
+            self._evict_locked(keep=key)
+        return path
+
+    def _evict_locked(self, keep: str):
+        while self._total_bytes > self.max_bytes and len(self._files) > 1:
+            key, size = next(iter(self._files.items()))
+            if key == keep:
+                self._files.move_to_end(key)
+                continue
+            del self._files[key]
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path_for_key(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "files": len(self._files),
+                "bytes": self._total_bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global instance shared by every request in the process
+attachment_cache = AttachmentCache(
+    cache_dir=settings.attachment_cache_dir,
+    max_bytes=settings.attachment_cache_max_bytes,
+    max_file_bytes=settings.attachment_cache_max_file_bytes
+)
@@ -0,0 +1,59 @@
+# server/app/services/attachment_repository.py
+from typing import Any, Dict, List, Optional
+from app.db import db
+from prisma.models import Attachment
+
+
+class AttachmentRepository:
+    """
+    Handles all database operations related to the Attachment index, a local
+    copy of Confluence attachment metadata used to resolve downloads without
+    listing a page's attachments upstream.
+    """
+
+    def __init__(self):
+        self.db = db
+
+    def _to_record(self, page_confluence_id: str, attachment: Dict[str, Any]) -> Dict[str, Any]:
+        """Maps a Confluence attachment object onto Attachment columns."""
+        extensions = attachment.get('extensions', {})
+        return {
+            'pageConfluenceId': page_confluence_id,
+            'fileName': attachment['title'],
+            'attachmentId': attachment['id'],
+            'version': attachment.get('version', {}).get('number', 1),
+            'fileSize': extensions.get('fileSize'),
+            'mediaType': extensions.get('mediaType'),
+            'downloadPath': attachment.get('_links', {}).get('download'),
+        }
+
+    async def get_by_page_and_name(self, page_confluence_id: str, file_name: str) -> Optional[Attachment]:
+        """Resolves an attachment by page and file name with one indexed lookup."""
+        return await self.db.attachment.find_unique(
+            where={'pageConfluenceId_fileName': {'pageConfluenceId': page_confluence_id, 'fileName': file_name}}
+        )
+
+    async def upsert_from_confluence(self, page_confluence_id: str, attachment: Dict[str, Any]) -> Attachment:
+        """Creates or refreshes the index entry for one Confluence attachment."""
+        record = self._to_record(page_confluence_id, attachment)
+        # A renamed attachment keeps its ID, so drop any row still holding it under an old name.
+        await self.db.attachment.delete_many(
+            where={'attachmentId': record['attachmentId'], 'NOT': {'fileName': record['fileName']}}
+        )
+        return await self.db.attachment.upsert(
+            where={'pageConfluenceId_fileName': {'pageConfluenceId': page_confluence_id, 'fileName': record['fileName']}},
+            data={'create': record, 'update': record}
+        )
+
+    async def sync_page_attachments(self, page_confluence_id: str, attachments: List[Dict[str, Any]]):
+        """Replaces the index entries of a page with the given Confluence attachment list."""
+        current_ids = [att['id'] for att in attachments]
+        await self.db.attachment.delete_many(
+            where={'pageConfluenceId': page_confluence_id, 'attachmentId': {'not_in': current_ids}}
+        )
+        for attachment in attachments:
+            await self.upsert_from_confluence(page_confluence_id, attachment)
+
+    async def delete_by_page(self, page_confluence_id: str) -> int:
+        """Removes every index entry of a page."""
+        return await self.db.attachment.delete_many(where={'pageConfluenceId': page_confluence_id})
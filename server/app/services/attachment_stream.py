@@ -0,0 +1,66 @@
+# server/app/services/attachment_stream.py
+from typing import AsyncIterator, Optional
+import httpx
+from starlette.requests import Request
+
+from app.services.resilience import StreamLimiter
+
+
+class AttachmentStream:
+    """
+    Async body iterator that relays an upstream attachment download to the
+    client.
+
+    - Chunks start small, so the first bytes reach the client quickly, and
+      double up to `max_chunk` as the transfer proceeds.
+    - The transfer stops as soon as the client disconnects, instead of
+      draining the rest of the file from Confluence.
+    - The upstream response and the stream limiter slot are released exactly
+      once, whichever way the transfer ends.
+    """
+
+    def __init__(
+        self,
+        response: httpx.Response,
+        limiter: StreamLimiter,
+        min_chunk: int,
+        max_chunk: int,
+        request: Optional[Request] = None
+    ):
+        self.response = response
+        self.limiter = limiter
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.request = request
+        self.bytes_sent = 0
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        chunk_size = self.min_chunk
+        buffer = bytearray()
+        try:
+            # Raw bytes: any Content-Encoding is passed through, so the upstream Content-Length stays valid.
+            async for data in self.response.aiter_raw():
+                buffer += data
+                while len(buffer) >= chunk_size:
+                    if self.request is not None and await self.request.is_disconnected():
+                        return
+                    chunk = bytes(buffer[:chunk_size])
+                    del buffer[:chunk_size]
+                    self.bytes_sent += len(chunk)
+                    yield chunk
+                    chunk_size = min(chunk_size * 2, self.max_chunk)
+            if buffer:
+                self.bytes_sent += len(buffer)
+                yield bytes(buffer)
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self.response.aclose()
+        finally:
+            self.limiter.release()
@@ -0,0 +1,424 @@
+# server/app/services/bm25_index.py
+import os
+import re
+import json
+import math
+import mmap
+import time
+import fcntl
+import struct
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.config import settings
+
+# --- Analysis ---
+
+# Field weights folded into term frequencies (a simplified BM25F)
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "description": 1.5, "body": 1.0}
+# Title terms are also indexed under this marker so title-only searches can be answered.
+TITLE_MARKER = "~"
+MAX_PREFIX_EXPANSIONS = 50
+K1 = 1.2
+B = 0.75
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r'\w+', (text or "").lower()) if t not in _STOPWORDS]
+
+
+@dataclass
+class IndexDocument:
+    page_id: str
+    title: str
+    description: str
+    body: str
+    tags: str
+
+
+def analyze(doc: IndexDocument) -> Tuple[Dict[str, float], float]:
+    """Returns the weighted term frequencies and weighted length of a document."""
+    freqs: Dict[str, float] = Counter()
+    for field_name, text in (("title", doc.title), ("tags", doc.tags), ("description", doc.description), ("body", doc.body)):
+        weight = FIELD_WEIGHTS[field_name]
+        for token in tokenize(text):
+            freqs[token] += weight
+            if field_name == "title":
+                freqs[TITLE_MARKER + token] += 1.0
+    length = sum(v for k, v in freqs.items() if not k.startswith(TITLE_MARKER))
+    return freqs, length
+
+
+# --- Segment File Format ---
+#
+# A segment is one immutable file, read through mmap. All integers are
+# little-endian uint32 and all sections start on 4-byte boundaries:
+#
+#   header       MAGIC, format, doc count, term count, posting count
+#   doc offsets  uint32[docs + 1] into the doc id blob
+#   doc lengths  float32[docs]; a negative length marks a tombstone (deleted doc)
+#   term offsets uint32[terms + 1] into the term blob (terms sorted by UTF-8 bytes)
+#   post offsets uint32[terms + 1] into the posting arrays
+#   post docs    uint32[postings] doc index within this segment
+#   post tfs     float32[postings] weighted term frequency
+#   doc id blob, term blob (UTF-8, padded)
+
+MAGIC = b"KBM1"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sIIII")
+
+
+def _padded(blob: bytes) -> bytes:
+    return blob + b"\0" * (-len(blob) % 4)
+
+
+def write_segment(path: str, docs: Sequence[IndexDocument], tombstones: Iterable[str] = ()):
+    """Writes an immutable segment holding `docs` plus deletion markers for `tombstones`."""
+    doc_ids: List[str] = []
+    lengths = array("f")
+    postings: Dict[bytes, List[Tuple[int, float]]] = {}
+
+    for doc in docs:
+        freqs, length = analyze(doc)
+        doc_index = len(doc_ids)
+        doc_ids.append(doc.page_id)
+        lengths.append(length)
+        for term, tf in freqs.items():
+            postings.setdefault(term.encode("utf-8"), []).append((doc_index, tf))
+    for page_id in tombstones:
+        doc_ids.append(page_id)
+        lengths.append(-1.0)
+
+    doc_offsets, doc_blob = array("I", [0]), bytearray()
+    for page_id in doc_ids:
+        doc_blob += page_id.encode("utf-8")
+        doc_offsets.append(len(doc_blob))
+
+    terms = sorted(postings)
+    term_offsets, term_blob = array("I", [0]), bytearray()
+    post_offsets, post_docs, post_tfs = array("I", [0]), array("I"), array("f")
+    for term in terms:
+        term_blob += term
+        term_offsets.append(len(term_blob))
+        for doc_index, tf in postings[term]:
+            post_docs.append(doc_index)
+            post_tfs.append(tf)
+        post_offsets.append(len(post_docs))
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(doc_ids), len(terms), len(post_docs)))
+        for section in (doc_offsets, lengths, term_offsets, post_offsets, post_docs, post_tfs):
+            f.write(section.tobytes())
+        f.write(_padded(bytes(doc_blob)))
+        f.write(_padded(bytes(term_blob)))
+    os.replace(temp_path, path)
+
+
+class Segment:
+    """Read-only view of a segment file; the OS page cache shares it between workers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.doc_count, self.term_count, self.posting_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a search index segment")
+
+        view = self._view = memoryview(self._mmap)
+        offset = _HEADER.size
+
+        def take(count: int, fmt: str) -> memoryview:
+            nonlocal offset
+            section = view[offset:offset + count * 4].cast(fmt)
+            offset += count * 4
+            return section
+
+        self._doc_offsets = take(self.doc_count + 1, "I")
+        self.lengths = take(self.doc_count, "f")
+        self._term_offsets = take(self.term_count + 1, "I")
+        self._post_offsets = take(self.term_count + 1, "I")
+        self._post_docs = take(self.posting_count, "I")
+        self._post_tfs = take(self.posting_count, "f")
+        doc_blob_size = self._doc_offsets[self.doc_count]
+        self._doc_blob = view[offset:offset + doc_blob_size]
+        offset += doc_blob_size + (-doc_blob_size % 4)
+        self._term_blob = view[offset:offset + self._term_offsets[self.term_count]]
+
+        self.doc_ids = [bytes(self._doc_blob[self._doc_offsets[i]:self._doc_offsets[i + 1]]).decode("utf-8") for i in range(self.doc_count)]
+        self.index_of = {page_id: i for i, page_id in enumerate(self.doc_ids)}
+
+    def _term(self, i: int) -> bytes:
+        return bytes(self._term_blob[self._term_offsets[i]:self._term_offsets[i + 1]])
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def terms_with_prefix(self, prefix: str, limit: int) -> List[str]:
+        key = prefix.encode("utf-8")
+        found, i = [], self._lower_bound(key)
+        while i < self.term_count and len(found) < limit:
+            term = self._term(i)
+            if not term.startswith(key):
+                break
+            found.append(term.decode("utf-8"))
+            i += 1
+        return found
+
+    def postings(self, term: str) -> List[Tuple[int, float]]:
+        key = term.encode("utf-8")
+        i = self._lower_bound(key)
+        if i >= self.term_count or self._term(i) != key:
+            return []
+        start, end = self._post_offsets[i], self._post_offsets[i + 1]
+        return list(zip(self._post_docs[start:end], self._post_tfs[start:end]))
+
+
+
+class _IndexState(NamedTuple):
+    """One loaded manifest; searches take a reference and use it throughout."""
+    segments: List[Segment]
+    masked: List[set]
+    doc_count: int
+    avg_length: float
+    generation: int
+
+
+_EMPTY_STATE = _IndexState([], [], 0, 0.0, 0)
+
+
+# --- Index ---
+
+class BM25Index:
+    """
+    Embedded BM25 search index stored as immutable, memory-mapped segment files
+    plus a manifest listing them. Every worker maps the same files read-only, so
+    the index is held in memory once per host.
+
+    A full build writes a single base segment. Publishing a page appends a small
+    segment with its new version (or a tombstone), which shadows older copies of
+    the page; once `max_segments` is exceeded the caller rebuilds the base.
+    Workers notice a new manifest on their next search and remap.
+
+    Segments replaced by a rebuild are deleted only at the following rebuild,
+    so a worker that has just read the previous manifest can still open them.
+    Searches run in worker threads: each one works on the state it started
+    with, and replaced segments are unmapped once no search references them.
+    """
+
+    def __init__(self, index_dir: str, max_segments: int):
+        self.index_dir = index_dir
+        self.max_segments = max_segments
+        self._manifest_path = os.path.join(index_dir, "manifest.json")
+        self._lock_path = os.path.join(index_dir, ".lock")
+        self._thread_lock = threading.Lock()
+        self._manifest_stamp: Optional[Tuple[int, int]] = None
+        self._state = _EMPTY_STATE
+
+        self.searches = 0
+        self.reloads = 0
+        self.segments_written = 0
+        self.last_search_ms = 0.0
+
+    # --- Manifest & Loading ---
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"generation": 0, "segments": [], "retired": []}
+
+    def _write_manifest(self, manifest: Dict):
+        temp_path = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self._manifest_path)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._manifest_path)
+
+    @property
+    def generation(self) -> int:
+        return self._state.generation
+
+    def _maybe_reload(self):
+        try:
+            stat_result = os.stat(self._manifest_path)
+        except OSError:
+            return
+        stamp = (stat_result.st_mtime_ns, stat_result.st_ino)
+        if stamp == self._manifest_stamp:
+            return
+        with self._thread_lock:
+            if stamp == self._manifest_stamp:
+                return
+            for attempt in range(3):
+                manifest = self._read_manifest()
+                try:
+                    segments = [Segment(os.path.join(self.index_dir, name)) for name in manifest["segments"]]
+                    break
+                except FileNotFoundError:
+                    # A rebuild replaced the manifest between our read and the open; read it again
+                    continue
+            else:
+                print(f"WARNING: Search index in {self.index_dir} kept changing while loading; using generation {self.generation}.")
+                return
+
+            # A page in a newer segment shadows its copies in every older one.
+            masked: List[set] = []
+            seen: set = set()
+            for segment in reversed(segments):
+                masked.append({segment.index_of[p] for p in seen if p in segment.index_of})
+                seen.update(segment.doc_ids)
+            masked.reverse()
+
+            doc_count, total_length = 0, 0.0
+            for segment, hidden in zip(segments, masked):
+                for i in range(segment.doc_count):
+                    if i not in hidden and segment.lengths[i] >= 0:
+                        doc_count += 1
+                        total_length += segment.lengths[i]
+
+            # Replaced segments are unmapped when the last search using them drops its reference
+            self._state = _IndexState(
+                segments, masked, doc_count,
+                total_length / doc_count if doc_count else 0.0,
+                manifest["generation"]
+            )
+            self._manifest_stamp = stamp
+            self.reloads += 1
+
+    # --- Writing ---
+
+    def _commit(self, docs: Sequence[IndexDocument], tombstones: Iterable[str], replace: bool):
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self._lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            manifest = self._read_manifest()
+            generation = manifest["generation"] + 1
+            name = f"segment-{generation:08d}.kbm"
+            write_segment(os.path.join(self.index_dir, name), docs, tombstones)
+            retired = manifest.get("retired", [])
+            if replace:
+                # Keep the replaced generation on disk until the next rebuild
+                obsolete, retired = retired, manifest["segments"]
+                segments = [name]
+            else:
+                obsolete, segments = [], manifest["segments"] + [name]
+            self._write_manifest({"generation": generation, "segments": segments, "retired": retired})
+            self.segments_written += 1
+        # Mapped copies in other workers stay readable after the unlink.
+        for old_name in obsolete:
+            try:
+                os.remove(os.path.join(self.index_dir, old_name))
+            except OSError:
+                pass
+
+    def rebuild(self, docs: Sequence[IndexDocument]):
+        """Replaces the whole index with a single base segment."""
+        self._commit(docs, (), replace=True)
+
+    def apply_updates(self, docs: Sequence[IndexDocument], deleted_ids: Iterable[str]):
+        """Appends a segment with new page versions and deletions."""
+        self._commit(docs, deleted_ids, replace=False)
+
+    def needs_compaction(self) -> bool:
+        return len(self._read_manifest()["segments"]) > self.max_segments
+
+    # --- Searching ---
+
+    def _candidates(self, segments: List[Segment], token: str, is_last: bool) -> List[str]:
+        if not is_last:
+            return [token]
+        terms = {token}
+        for segment in segments:
+            terms.update(segment.terms_with_prefix(token, MAX_PREFIX_EXPANSIONS))
+        return sorted(terms)[:MAX_PREFIX_EXPANSIONS]
+
+    def search(self, query: str, title_only: bool = False) -> List[Tuple[str, float]]:
+        """
+        Returns (page ID, score) for every page matching all query words (the
+        last one as a prefix), best first.
+        """
+        started = time.perf_counter()
+        self._maybe_reload()
+        state = self._state
+        tokens = tokenize(query)
+        if not tokens or not state.doc_count:
+            return []
+        if title_only:
+            tokens = [TITLE_MARKER + t for t in tokens]
+
+        totals: Optional[Dict[Tuple[int, int], float]] = None
+        for position, token in enumerate(tokens):
+            token_scores: Dict[Tuple[int, int], float] = {}
+            for term in self._candidates(state.segments, token, position == len(tokens) - 1):
+                matches = []
+                for seg_index, (segment, hidden) in enumerate(zip(state.segments, state.masked)):
+                    for doc_index, tf in segment.postings(term):
+                        if doc_index not in hidden:
+                            matches.append((seg_index, doc_index, tf))
+                if not matches:
+                    continue
+                df = len(matches)
+                idf = math.log(1 + (state.doc_count - df + 0.5) / (df + 0.5))
+                for seg_index, doc_index, tf in matches:
+                    length = state.segments[seg_index].lengths[doc_index]
+                    norm = K1 * (1 - B + B * length / state.avg_length) if state.avg_length else K1
+                    score = idf * tf * (K1 + 1) / (tf + norm)
+                    key = (seg_index, doc_index)
+                    # Prefix expansions of one word count once, at their best.
+                    if score > token_scores.get(key, 0.0):
+                        token_scores[key] = score
+            if totals is None:
+                totals = token_scores
+            else:
+                totals = {key: totals[key] + score for key, score in token_scores.items() if key in totals}
+            if not totals:
+                break
+
+        results = [
+            (state.segments[seg_index].doc_ids[doc_index], score)
+            for (seg_index, doc_index), score in (totals or {}).items()
+        ]
+        results.sort(key=lambda item: (-item[1], item[0]))
+        self.searches += 1
+        self.last_search_ms = round((time.perf_counter() - started) * 1000, 2)
+        return results
+
+    def stats(self) -> Dict:
+        self._maybe_reload()
+        state = self._state
+        return {
+            "generation": state.generation,
+            "segments": len(state.segments),
+            "documents": state.doc_count,
+            "mappedBytes": sum(len(s._mmap) for s in state.segments),
+            "searches": self.searches,
+            "reloads": self.reloads,
+            "segmentsWritten": self.segments_written,
+            "lastSearchMs": self.last_search_ms,
+        }
+
+
+# Global instance shared by every ConfluenceService in the process
+bm25_index = BM25Index(
+    index_dir=settings.bm25_index_dir,
+    max_segments=settings.bm25_max_segments
+)
@@ -1,15 +1,27 @@
 import re
 import os
+import time
+import asyncio
+import uuid
 import mimetypes
-import requests
-from typing import List, Dict, Optional, Any
-from atlassian import Confluence
+import aiofiles
+import httpx
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Optional, Any, Union, Tuple, AsyncIterator, Iterable
 from fastapi import HTTPException, status
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.requests import Request
 
 from app.config import Settings
-from app.schemas.cms_schemas import AttachmentInfo
-from app.schemas.content_schemas import Tag
+from app.schemas.cms_schemas import AttachmentInfo, AttachmentUploadResult
+from app.schemas.content_schemas import Tag, ContentFreshness
+from app.services.content_cache import page_body_cache, CachedBody
+from app.services.resilience import confluence_breaker, CircuitOpenError, attachment_stream_limiter
+from app.services.attachment_stream import AttachmentStream
+from app.services.single_flight import confluence_single_flight
+from app.services.outbound_scheduler import confluence_scheduler, outbound_priority, Priority
 
 UPLOAD_DIR = "/tmp/uploads"
 
@@ -26,42 +38,80 @@ ROOT_PAGE_CONFIG = [
 class ConfluenceRepository:
     """
     Handles all raw API communication with the Atlassian Confluence service.
-    This is the only class that should import from 'atlassian' and make API calls.
+    This is the only class that should talk to the Confluence REST API.
+
+    All calls go through a single pooled, keep-alive `httpx.AsyncClient`, so a
+    slow Confluence round-trip only suspends the awaiting request instead of
+    blocking the event loop for every user on the worker. Identical concurrent
+    reads are coalesced into one upstream call.
     """
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.settings = settings
-        self.confluence = Confluence(
-            url=self.settings.confluence_url,
-            username=self.settings.confluence_username,
-            password=self.settings.confluence_api_token,
-            cloud=True
+        self.base_url = self.settings.confluence_url.rstrip('/')
+        self._auth = (self.settings.confluence_username, self.settings.confluence_api_token)
+        self._timeout = httpx.Timeout(
+            self.settings.confluence_timeout_seconds,
+            connect=self.settings.confluence_connect_timeout_seconds
+        )
+        self.client = self._build_client(transport)
+        self.body_cache = page_body_cache
+        self.breaker = confluence_breaker
+        self.single_flight = confluence_single_flight
+        self.scheduler = confluence_scheduler
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self.upstream_requests = 0
+
+        # Filled by set_root_page_ids(), from the DB cache or discover_root_pages().
+        # The dicts are updated in place so holders of a reference always see the latest mapping.
+        self.root_page_ids: Dict[str, str] = {}
+        self.id_to_group_slug_map: Dict[str, str] = {}
+
+    def _build_client(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        """Builds the shared connection-pooled client used for every Confluence call."""
+        pool_size = self.settings.confluence_pool_size
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            auth=self._auth,
+            timeout=self._timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            headers={"Accept": "application/json"},
+            transport=transport
         )
-        self.root_page_ids = self._discover_root_pages()
-        self.id_to_group_slug_map = {v: k for k, v in self.root_page_ids.items()}
 
-    def _discover_root_pages(self) -> Dict[str, str]:
-        """Dynamically discovers root pages based on the ROOT_PAGE_CONFIG."""
+    async def aclose(self):
+        """Closes the pooled HTTP client. Call this on application shutdown."""
+        await self.client.aclose()
+
+    async def discover_root_pages(self) -> Dict[str, str]:
+        """Discovers the root pages configured in ROOT_PAGE_CONFIG by title."""
         space_key = self.settings.confluence_space_key
         discovered_ids = {}
-        
+
         for config in ROOT_PAGE_CONFIG:
             title = config["confluence_title"]
             slug = config["slug"]
             try:
-                search_path = f'/rest/api/content?spaceKey={space_key}&title={title}&limit=1'
-                results = self.confluence.get(search_path).get('results', [])
+                data = await self._get_json('/rest/api/content', params={'spaceKey': space_key, 'title': title, 'limit': 1})
+                results = data.get('results', [])
                 if results and not results[0].get('parent'):
                     page_id = results[0]['id']
                     discovered_ids[slug] = page_id
             except Exception as e:
                 print(f"FATAL: Could not discover root page titled '{title}'. Error: {e}")
-        
+
         if not discovered_ids:
             print("CRITICAL: No root pages found in Confluence. Please check space key and page titles.")
-            
+
         return discovered_ids
 
+    def set_root_page_ids(self, mapping: Dict[str, str]):
+        """Installs a slug -> page ID mapping of the root pages."""
+        self.root_page_ids.clear()
+        self.root_page_ids.update(mapping)
+        self.id_to_group_slug_map.clear()
+        self.id_to_group_slug_map.update({v: k for k, v in mapping.items()})
+
     def _slugify(self, text: str) -> str:
         """Helper to create a URL-friendly slug."""
         text = text.lower()
@@ -73,15 +123,117 @@ class ConfluenceRepository:
         """Helper to create a Tag object from a name."""
         return Tag(id=0, name=name, slug=self._slugify(name))
 
+    # --- Low-level HTTP Helpers ---
+
+    def _call_priority(self, method: str) -> Priority:
+        """Writes run at least at CMS_WRITE priority; batch jobs stay at BACKGROUND."""
+        floor = Priority.INTERACTIVE if method == "GET" else Priority.CMS_WRITE
+        return max(outbound_priority.get(), floor)
+
+    def _retry_after_seconds(self, response: httpx.Response) -> float:
+        """Parses a Retry-After header (seconds or HTTP date), defaulting to one second."""
+        value = response.headers.get("Retry-After", "").strip()
+        seconds = 1.0
+        if value:
+            try:
+                seconds = float(value)
+            except ValueError:
+                try:
+                    seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    pass
+        return min(max(seconds, 0.0), self.settings.confluence_retry_after_max_seconds)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[Union[float, httpx.Timeout]] = None,
+        retry_rate_limited: bool = True,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Sends a request on the pooled client and raises for non-2xx responses.
+        `timeout` overrides the client-wide default for this call only.
+        Every call first takes a token from the outbound scheduler at the
+        caller's priority. A 429 pauses the scheduler for its Retry-After period
+        and the call is retried (unless `retry_rate_limited` is False, e.g. for
+        streamed bodies that cannot be replayed).
+        Calls fail fast with CircuitOpenError while the circuit breaker is open.
+        """
+        priority = self._call_priority(method)
+        max_retries = self.settings.confluence_rate_limit_max_retries if retry_rate_limited else 0
+        for attempt in range(max_retries + 1):
+            await self.scheduler.acquire(priority)
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(f"Confluence circuit is open; skipping {method} {path}")
+            self.upstream_requests += 1
+            try:
+                response = await self.client.request(
+                    method,
+                    path,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                    **kwargs
+                )
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                self.breaker.record_abandoned()
+                raise
+
+            if response.status_code == 429:
+                self.scheduler.pause(self._retry_after_seconds(response))
+                if attempt < max_retries:
+                    # Throttling is handled by the scheduler; it is not a breaker failure until retries run out.
+                    self.breaker.record_abandoned()
+                    continue
+
+            # Only upstream trouble counts against the breaker, not 4xx client errors.
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            response.raise_for_status()
+            return response
+
+    async def _get_json(self, path: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        response = await self._request("GET", path, params=params, timeout=timeout)
+        return response.json()
+
+    async def _get_all_results(self, path: str, params: Optional[Dict[str, Any]] = None, page_size: int = 200) -> List[Dict[str, Any]]:
+        """Follows Confluence's start/limit pagination until every result is collected."""
+        params = dict(params or {})
+        results: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            data = await self._get_json(path, params={**params, 'start': start, 'limit': page_size})
+            batch = data.get('results', [])
+            results.extend(batch)
+            if not batch or not data.get('_links', {}).get('next'):
+                return results
+            start += len(batch)
+
     # --- Page & Content Methods ---
 
-    def get_page_by_id(self, page_id: str, expand: str = "body.view,version,metadata.labels,ancestors") -> Optional[Dict[str, Any]]:
+    async def get_page_by_id(self, page_id: str, expand: str = "body.view,version,metadata.labels,ancestors") -> Optional[Dict[str, Any]]:
         """Fetches a full page object from Confluence by its ID."""
         try:
-            page_data = self.confluence.get_page_by_id(page_id, expand=expand)
+            page_data = await self.single_flight.do(
+                ("page", page_id, expand),
+                lambda: self._get_json(f'/rest/api/content/{page_id}', params={'expand': expand})
+            )
             if not page_data:
                 return None
             return page_data
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == status.HTTP_404_NOT_FOUND:
+                return None
+            print(f"Error fetching page ID {page_id}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Could not fetch page {page_id} from Confluence."
+            )
         except Exception as e:
             print(f"Error fetching page ID {page_id}: {e}")
             raise HTTPException(
@@ -89,43 +241,123 @@ class ConfluenceRepository:
                 detail=f"Could not fetch page {page_id} from Confluence."
             )
 
-    def get_page_content(self, page_id: str) -> str:
-        """Fetches only the 'body.view' content of a page."""
+    async def get_page_content(self, page_id: str) -> str:
+        """
+        Fetches only the 'body.view' content of a page. Bodies are served from the
+        version-keyed body cache and only fetched from Confluence on a miss.
+        """
+        cached_body = self.body_cache.get(page_id)
+        if cached_body is not None:
+            return cached_body
         try:
-            page_data = self.confluence.get_page_by_id(page_id, expand="body.view")
-            return page_data.get("body", {}).get("view", {}).get("value", "")
+            return await self._fetch_page_content(page_id)
         except Exception as e:
             print(f"Error fetching content for page {page_id}: {e}")
             raise HTTPException(status_code=503, detail=f"Could not fetch content for page {page_id}.")
 
-    def get_child_pages(self, page_id: str) -> List[Dict[str, Any]]:
+    async def get_page_content_with_freshness(self, page_id: str) -> Tuple[str, ContentFreshness]:
+        """
+        Stale-while-revalidate read of a page body for the hybrid read endpoints.
+
+        - A cached body younger than the TTL is served as 'fresh'.
+        - An expired body is served immediately as 'stale' while a background
+          task refreshes it.
+        - An invalidated or missing body is fetched with a short timeout; if that
+          fails (or the circuit is open) the last known good copy is served as
+          'stale'. With no copy at all the error is raised to the caller.
+        """
+        entry = self.body_cache.get_entry(page_id)
+
+        if entry and not entry.stale:
+            if time.time() - entry.fetched_at <= self.settings.content_cache_ttl_seconds:
+                return entry.body, self._freshness("fresh", entry)
+            revalidating = self._schedule_content_refresh(page_id)
+            return entry.body, self._freshness("stale", entry, revalidating=revalidating)
+
+        try:
+            body = await self._fetch_page_content(page_id, timeout=self.settings.content_fetch_timeout_seconds)
+            return body, ContentFreshness(status="fresh", fetchedAt=datetime.now(timezone.utc).isoformat(), ageSeconds=0)
+        except Exception as e:
+            if entry is None:
+                raise
+            print(f"Serving stale content for page {page_id}; live fetch failed: {e}")
+            return entry.body, self._freshness("stale", entry)
+
+    async def _fetch_page_content(self, page_id: str, timeout: Optional[float] = None) -> str:
+        """Fetches a page body from Confluence and stores it in the body cache."""
+        async def fetch() -> str:
+            page_data = await self._get_json(f'/rest/api/content/{page_id}', params={'expand': 'body.view,version'}, timeout=timeout)
+            body = page_data.get("body", {}).get("view", {}).get("value", "")
+            self.body_cache.put(page_id, page_data.get("version", {}).get("number", 0), body)
+            return body
+
+        return await self.single_flight.do(("page_content", page_id, "body.view,version"), fetch)
+
+    def _schedule_content_refresh(self, page_id: str) -> bool:
+        """Starts a background refresh of a page body unless one is already running."""
+        if page_id in self._refresh_tasks:
+            return True
+        if self.breaker.state == "open":
+            return False
+
+        async def refresh():
+            try:
+                await self._fetch_page_content(page_id)
+            except Exception as e:
+                print(f"Background refresh of page {page_id} failed: {e}")
+            finally:
+                self._refresh_tasks.pop(page_id, None)
+
+        self._refresh_tasks[page_id] = asyncio.create_task(refresh())
+        return True
+
+    def _freshness(self, status: str, entry: CachedBody, revalidating: bool = False) -> ContentFreshness:
+        return ContentFreshness(
+            status=status,
+            fetchedAt=datetime.fromtimestamp(entry.fetched_at, tz=timezone.utc).isoformat(),
+            ageSeconds=int(time.time() - entry.fetched_at),
+            revalidating=revalidating
+        )
+
+    def invalidate_page_content(self, page_id: str):
+        """Drops the cached body of a page after it has been changed or removed."""
+        self.body_cache.invalidate(page_id)
+
+    async def get_child_pages(self, page_id: str) -> List[Dict[str, Any]]:
         """Fetches the immediate children of a page."""
         try:
-            return list(self.confluence.get_child_pages(page_id))
+            return await self.single_flight.do(
+                ("child_pages", page_id, ""),
+                lambda: self._get_all_results(f'/rest/api/content/{page_id}/child/page')
+            )
         except Exception as e:
             print(f"Error fetching children for page {page_id}: {e}")
             return []
 
-    def check_has_children(self, page_id: str) -> bool:
+    async def check_has_children(self, page_id: str) -> bool:
         """Checks if a page has any children."""
         try:
-            child_pages_generator = self.confluence.get_child_pages(page_id)
-            first_child = next(child_pages_generator, None)
-            return first_child is not None
+            data = await self.single_flight.do(
+                ("has_children", page_id, ""),
+                lambda: self._get_json(f'/rest/api/content/{page_id}/child/page', params={'limit': 1})
+            )
+            return len(data.get('results', [])) > 0
         except Exception as e:
             print(f"Error checking children for page {page_id}: {e}")
             return False
 
-    def create_page(self, title: str, parent_id: str, content_storage_format: str, author_name: str) -> Dict[str, Any]:
+    async def create_page(self, title: str, parent_id: str, content_storage_format: str, author_name: str) -> Dict[str, Any]:
         """Creates a new page in Confluence."""
+        payload = {
+            'type': 'page',
+            'title': title,
+            'space': {'key': self.settings.confluence_space_key},
+            'ancestors': [{'id': parent_id}],
+            'body': {'storage': {'value': content_storage_format, 'representation': 'storage'}}
+        }
         try:
-            new_page = self.confluence.create_page(
-                space=self.settings.confluence_space_key,
-                title=title,
-                parent_id=parent_id,
-                body=content_storage_format,
-                representation='storage'
-            )
+            response = await self._request("POST", '/rest/api/content', json=payload)
+            new_page = response.json()
             if not new_page:
                 raise Exception("Page creation returned null")
             return new_page
@@ -133,17 +365,20 @@ class ConfluenceRepository:
             print(f"Error creating Confluence page: {e}")
             raise
 
-    def update_page(self, page_id: str, title: str, body: str, current_version_number: int, version_comment: str, parent_id: Optional[str] = None) -> Dict[str, Any]:
-        """Updates an existing page in Confluence."""
+    async def update_page(self, page_id: str, title: str, body: str, current_version_number: int, version_comment: str, parent_id: Optional[str] = None) -> Dict[str, Any]:
+        """Updates an existing page in Confluence. `current_version_number` is the version to write."""
+        payload = {
+            'id': page_id,
+            'type': 'page',
+            'title': title,
+            'body': {'storage': {'value': body, 'representation': 'storage'}},
+            'version': {'number': current_version_number, 'message': version_comment}
+        }
+        if parent_id:
+            payload['ancestors'] = [{'type': 'page', 'id': parent_id}]
         try:
-            updated_page = self.confluence.update_page(
-                page_id=page_id,
-                title=title,
-                body=body,
-                parent_id=parent_id,
-                version_comment=version_comment,
-                representation='storage'
-            )
+            response = await self._request("PUT", f'/rest/api/content/{page_id}', json=payload)
+            updated_page = response.json()
             if not updated_page:
                 raise Exception("Page update returned null")
             return updated_page
@@ -151,44 +386,75 @@ class ConfluenceRepository:
             print(f"Error updating Confluence page {page_id}: {e}")
             raise
 
-    def delete_page(self, page_id: str):
+    async def delete_page(self, page_id: str):
         """Deletes a page from Confluence."""
         try:
-            self.confluence.remove_page(page_id=page_id)
+            await self._request("DELETE", f'/rest/api/content/{page_id}')
         except Exception as e:
             print(f"Error deleting Confluence page {page_id}: {e}")
             raise
 
     # --- Label & Comment Methods ---
 
-    def add_label(self, page_id: str, label_name: str):
-        """Adds a label to a Confluence page."""
+    async def _add_labels(self, page_id: str, label_names: List[str]):
         try:
-            self.confluence.set_page_label(page_id, label_name)
+            await self._request("POST", f'/rest/api/content/{page_id}/label', json=[{'prefix': 'global', 'name': name} for name in label_names])
         except Exception as e:
-            print(f"Error adding label '{label_name}' to page {page_id}: {e}")
+            print(f"Error adding labels {label_names} to page {page_id}: {e}")
 
-    def remove_label(self, page_id: str, label_name: str):
-        """Removes a label from a Confluence page."""
+    async def _remove_label(self, page_id: str, label_name: str):
         try:
-            self.confluence.remove_page_label(page_id, label_name)
+            await self._request("DELETE", f'/rest/api/content/{page_id}/label', params={'name': label_name})
         except Exception as e:
             print(f"Error removing label '{label_name}' from page {page_id}: {e}")
 
-    def post_comment(self, page_id: str, comment_text: str):
+    async def update_labels(self, page_id: str, add: Iterable[str] = (), remove: Iterable[str] = ()):
+        """
+        Applies a label diff to a Confluence page in as few requests as possible:
+        all additions go in a single POST (the label endpoint accepts an array),
+        and each removal is one DELETE, since Confluence has no bulk delete.
+        All requests run concurrently. A label in both sets is kept.
+        """
+        to_add = sorted(set(add))
+        to_remove = sorted(set(remove) - set(to_add))
+        calls = [self._remove_label(page_id, name) for name in to_remove]
+        if to_add:
+            calls.append(self._add_labels(page_id, to_add))
+        if calls:
+            await asyncio.gather(*calls)
+
+    async def add_label(self, page_id: str, label_name: str):
+        """Adds a label to a Confluence page."""
+        await self.update_labels(page_id, add=[label_name])
+
+    async def remove_label(self, page_id: str, label_name: str):
+        """Removes a label from a Confluence page."""
+        await self.update_labels(page_id, remove=[label_name])
+
+    async def post_comment(self, page_id: str, comment_text: str):
         """Posts a comment to a Confluence page."""
+        payload = {
+            'type': 'comment',
+            'container': {'id': page_id, 'type': 'page', 'status': 'current'},
+            'body': {'storage': {'value': comment_text, 'representation': 'storage'}}
+        }
         try:
-            self.confluence.add_comment(page_id=page_id, text=comment_text)
+            await self._request("POST", '/rest/api/content', json=payload)
         except Exception as e:
             print(f"Error posting comment to page {page_id}: {e}")
 
     # --- Search & CQL Methods ---
 
-    def search_cql(self, cql: str, start: int = 0, limit: int = 25, expand: str = "") -> Dict[str, Any]:
+    async def search_cql(self, cql: str, start: int = 0, limit: int = 25, expand: str = "") -> Dict[str, Any]:
         """Runs a raw CQL search."""
         try:
-            search_path = f'/rest/api/content/search?cql={cql}&start={start}&limit={limit}&expand={expand}'
-            return self.confluence.get(search_path)
+            return await self.single_flight.do(
+                ("search", cql, start, limit, expand),
+                lambda: self._get_json(
+                    '/rest/api/content/search',
+                    params={'cql': cql, 'start': start, 'limit': limit, 'expand': expand}
+                )
+            )
         except Exception as e:
             print(f"Error during CQL search: {e}")
             raise HTTPException(
@@ -198,78 +464,237 @@ class ConfluenceRepository:
 
     # --- Attachment Methods ---
 
-    def upload_attachments(self, page_id: str, attachments: List[AttachmentInfo]):
-        """Uploads a list of temporary files to a Confluence page."""
-        attachment_url = f"{self.settings.confluence_url}/rest/api/content/{page_id}/child/attachment"
-        headers = {"X-Atlassian-Token": "no-check"}
-        
-        for attachment in attachments:
-            temp_file_path = os.path.join(UPLOAD_DIR, attachment.temp_id)
-            if os.path.exists(temp_file_path):
-                try:
-                    content_type, _ = mimetypes.guess_type(attachment.file_name)
-                    content_type = content_type or 'application/octet-stream'
-                    
-                    with open(temp_file_path, 'rb') as file_handle:
-                        files = {'file': (attachment.file_name, file_handle, content_type)}
-                        response = self.confluence.session.post(attachment_url, headers=headers, files=files)
-                        response.raise_for_status()
-                except Exception as e:
-                    print(f"Error uploading attachment {attachment.file_name}: {e}")
-                finally:
-                    os.remove(temp_file_path)
-
-    def get_attachment_data(self, page_id: str, file_name: str) -> Optional[StreamingResponse]:
-        """Gets the raw data for a single attachment to stream back to the client."""
+    async def _multipart_file_body(self, head: bytes, file_path: str, tail: bytes) -> AsyncIterator[bytes]:
+        """Yields a single-file multipart body, reading the file in chunks instead of buffering it."""
+        yield head
+        async with aiofiles.open(file_path, 'rb') as file_handle:
+            while True:
+                chunk = await file_handle.read(self.settings.attachment_upload_chunk_bytes)
+                if not chunk:
+                    break
+                yield chunk
+        yield tail
+
+    async def _upload_attachment(self, page_id: str, attachment: AttachmentInfo, semaphore: asyncio.Semaphore) -> AttachmentUploadResult:
+        """
+        Uploads one temporary file, retrying transient failures (network errors,
+        5xx and 429) with exponential backoff. The temporary file is removed once
+        the upload has either succeeded or run out of attempts.
+        """
+        temp_file_path = os.path.join(UPLOAD_DIR, attachment.temp_id)
+        result = AttachmentUploadResult(temp_id=attachment.temp_id, file_name=attachment.file_name, status="missing")
+        if not os.path.exists(temp_file_path):
+            return result
+
+        content_type, _ = mimetypes.guess_type(attachment.file_name)
+        content_type = content_type or 'application/octet-stream'
+        boundary = uuid.uuid4().hex
+        safe_name = attachment.file_name.replace('\\', '\\\\').replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+        head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{safe_name}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode('utf-8')
+        tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        headers = {
+            "X-Atlassian-Token": "no-check",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(len(head) + os.path.getsize(temp_file_path) + len(tail)),
+        }
+
         try:
-            # 1. Find the attachment metadata to get its ID
-            attachments = self.confluence.get_attachments_from_content(page_id=page_id, limit=200)
-            target_attachment = next((att for att in attachments['results'] if att['title'] == file_name), None)
-            
-            if not target_attachment:
-                print(f"Attachment '{file_name}' not found on page {page_id}")
-                return None
-            
-            attachment_id = target_attachment['id']
-            base_url = self.settings.confluence_url.rstrip('/')
-            
-            # 2. Construct the official REST API Download URL
-            # This endpoint is more reliable for API usage than the web UI download links
-            download_link = f"{base_url}/rest/api/content/{page_id}/child/attachment/{attachment_id}/download"
-            
-            # 3. Request the file using requests directly with explicit auth and headers
-            # 'X-Atlassian-Token: no-check' is often required for attachment operations
-            response = requests.get(
-                download_link, 
-                stream=True,
-                auth=(self.settings.confluence_username, self.settings.confluence_api_token),
-                headers={"X-Atlassian-Token": "no-check"}
-            )
-            
-            # 4. Fallback: If REST API fails (e.g., 404), try the web link from metadata
-            if response.status_code == 404:
+            async with semaphore:
+                for attempt in range(1, self.settings.attachment_upload_max_attempts + 1):
+                    result.attempts = attempt
+                    retry_after = None
+                    try:
+                        # PUT creates the attachment or adds a new version, so a retry after a
+                        # lost response cannot fail on a duplicate file name.
+                        response = await self._request(
+                            "PUT",
+                            f"/rest/api/content/{page_id}/child/attachment",
+                            headers=headers,
+                            content=self._multipart_file_body(head, temp_file_path, tail),
+                            timeout=self.settings.confluence_upload_timeout_seconds,
+                            retry_rate_limited=False
+                        )
+                        stored = response.json().get('results', [])
+                        result.status = "uploaded"
+                        result.error = None
+                        result.attachment = stored[0] if stored else None
+                        result.attachment_id = stored[0]['id'] if stored else None
+                        return result
+                    except httpx.HTTPStatusError as e:
+                        result.status, result.error = "failed", f"Confluence returned {e.response.status_code}"
+                        if e.response.status_code < 500 and e.response.status_code != 429:
+                            break
+                        if e.response.status_code == 429:
+                            retry_after = self._retry_after_seconds(e.response)
+                    except httpx.TransportError as e:
+                        result.status, result.error = "failed", f"{type(e).__name__}: {e}"
+                    except Exception as e:
+                        result.status, result.error = "failed", str(e)
+                        break
+
+                    if attempt < self.settings.attachment_upload_max_attempts:
+                        delay = retry_after if retry_after is not None else 0.5 * 2 ** (attempt - 1)
+                        print(f"Retrying upload of {attachment.file_name} in {delay}s (attempt {attempt} failed: {result.error})")
+                        await asyncio.sleep(min(delay, 30.0))
+        finally:
+            os.remove(temp_file_path)
+
+        print(f"Error uploading attachment {attachment.file_name}: {result.error}")
+        return result
+
+    async def upload_attachments(self, page_id: str, attachments: List[AttachmentInfo]) -> List[AttachmentUploadResult]:
+        """
+        Uploads a list of temporary files to a Confluence page in parallel, with at
+        most `attachment_upload_concurrency` uploads in flight. Returns one result
+        per file, in the order given; a failed file does not stop the others.
+        """
+        semaphore = asyncio.Semaphore(self.settings.attachment_upload_concurrency)
+        return list(await asyncio.gather(
+            *(self._upload_attachment(page_id, attachment, semaphore) for attachment in attachments)
+        ))
+
+    async def list_attachments(self, page_id: str) -> List[Dict[str, Any]]:
+        """Lists every attachment of a page (all result pages), including version metadata."""
+        return await self.single_flight.do(
+            ("attachments", page_id, "version"),
+            lambda: self._get_all_results(f'/rest/api/content/{page_id}/child/attachment', params={'expand': 'version'})
+        )
+
+    async def find_attachment(self, page_id: str, file_name: str) -> Optional[Dict[str, Any]]:
+        """Finds the metadata (id, version, size, media type) of an attachment by its file name."""
+        try:
+            attachments = await self.list_attachments(page_id)
+        except Exception as e:
+            print(f"Error listing attachments for page ID {page_id}: {e}")
+            raise HTTPException(status_code=503, detail="Could not retrieve attachment.")
+
+        target_attachment = next((att for att in attachments if att['title'] == file_name), None)
+        if not target_attachment:
+            print(f"Attachment '{file_name}' not found on page {page_id}")
+        return target_attachment
+
+    async def _send_stream(self, url: str, headers: Dict[str, str]) -> httpx.Response:
+        """
+        Sends a streamed GET through the scheduler and the circuit breaker, the
+        same way `_request` does. The response is returned unread and is not
+        raised for status; the caller owns it and must close it.
+        """
+        await self.scheduler.acquire(self._call_priority("GET"))
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Confluence circuit is open; skipping GET {url}")
+        self.upstream_requests += 1
+        try:
+            response = await self.client.send(self.client.build_request("GET", url, headers=headers), stream=True)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.record_abandoned()
+            raise
+
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def open_attachment_stream(
+        self,
+        page_id: str,
+        attachment_id: str,
+        download_path: Optional[str] = None,
+        range_header: Optional[str] = None
+    ) -> httpx.Response:
+        """
+        Opens a streamed download of an attachment on the pooled client.
+        The caller owns the returned response and must close it.
+        While the circuit breaker is open this fails fast with a 503 and a
+        Retry-After header instead of tying up a stream slot.
+        """
+        # The official REST API download URL is more reliable for API usage than the web UI links.
+        # 'X-Atlassian-Token: no-check' is often required for attachment operations
+        download_link = f"{self.base_url}/rest/api/content/{page_id}/child/attachment/{attachment_id}/download"
+        headers = {"X-Atlassian-Token": "no-check", "Accept": "*/*"}
+        if range_header:
+            headers["Range"] = range_header
+        try:
+            response = await self._send_stream(download_link, headers)
+
+            # Fallback: If REST API fails (e.g., 404), try the web link from metadata
+            if response.status_code == 404 and download_path:
+                await response.aclose()
                 print("REST API download 404, trying web link fallback...")
-                download_path = target_attachment['_links']['download']
                 clean_path = download_path.lstrip('/')
-                if base_url.endswith('/wiki') and clean_path.startswith('wiki/'):
+                if self.base_url.endswith('/wiki') and clean_path.startswith('wiki/'):
                     clean_path = clean_path[5:]
-                
-                web_download_link = f"{base_url}/{clean_path}"
-                response = requests.get(
-                    web_download_link,
-                    stream=True,
-                    auth=(self.settings.confluence_username, self.settings.confluence_api_token),
-                    headers={"X-Atlassian-Token": "no-check"}
-                )
+                download_link = f"{self.base_url}/{clean_path}"
+                response = await self._send_stream(download_link, headers)
 
-            response.raise_for_status()
-            
-            mimetype, _ = mimetypes.guess_type(file_name)
-            media_type = mimetype or 'application/octet-stream'
-            
-            return StreamingResponse(response.iter_content(chunk_size=8192), media_type=media_type)
+            if response.status_code == 429:
+                self.scheduler.pause(self._retry_after_seconds(response))
+            if response.is_error:
+                await response.aclose()
+                response.raise_for_status()
+            return response
+        except CircuitOpenError as e:
+            print(f"Skipping download of attachment {attachment_id} for page ID {page_id}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Confluence is temporarily unavailable. Please retry shortly.",
+                headers={"Retry-After": str(self.breaker.retry_after_seconds())}
+            )
         except Exception as e:
-            print(f"Error fetching attachment '{file_name}' for page ID {page_id}: {e}")
-            if 'download_link' in locals():
-                print(f"Attempted download URL: {download_link}")
-            raise HTTPException(status_code=503, detail="Could not retrieve attachment.")
\ No newline at end of file
+            print(f"Error downloading attachment {attachment_id} for page ID {page_id}: {e}")
+            print(f"Attempted download URL: {download_link}")
+            raise HTTPException(status_code=503, detail="Could not retrieve attachment.")
+
+    async def stream_attachment(
+        self,
+        page_id: str,
+        attachment_id: str,
+        download_path: Optional[str],
+        media_type: str,
+        headers: Optional[Dict[str, str]] = None,
+        range_header: Optional[str] = None,
+        request: Optional[Request] = None
+    ) -> StreamingResponse:
+        """
+        Proxies an attachment straight from Confluence without caching it.
+        Range requests are forwarded upstream, and the upstream status,
+        Content-Length and Content-Range are passed through to the client.
+        """
+        if not await attachment_stream_limiter.acquire():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many attachment downloads in progress. Please retry shortly.",
+                headers={"Retry-After": "5"}
+            )
+        try:
+            response = await self.open_attachment_stream(page_id, attachment_id, download_path, range_header)
+        except BaseException:
+            attachment_stream_limiter.release()
+            raise
+
+        stream = AttachmentStream(
+            response,
+            limiter=attachment_stream_limiter,
+            min_chunk=self.settings.attachment_stream_min_chunk_bytes,
+            max_chunk=self.settings.attachment_stream_max_chunk_bytes,
+            request=request
+        )
+        response_headers = dict(headers or {})
+        for name in ("Content-Length", "Content-Range", "Content-Encoding", "Accept-Ranges"):
+            if name in response.headers:
+                response_headers[name] = response.headers[name]
+
+        return StreamingResponse(
+            stream,
+            status_code=response.status_code,
+            media_type=media_type,
+            headers=response_headers,
+            background=BackgroundTask(stream.aclose)
+        )
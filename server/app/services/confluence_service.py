@@ -1,24 +1,36 @@
 # server/app/services/confluence_service.py
 import re
+import asyncio
+import mimetypes
 from typing import List, Dict, Optional, Any, Union
-from bs4 import BeautifulSoup
-from fastapi import HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import HTTPException, status, Request
+from fastapi.responses import Response, FileResponse
 
 from app.db import db
 from app.config import Settings
-from app.schemas.content_schemas import Article, Tag, Subsection, GroupInfo, PageContentItem, Ancestor, PageTreeNode, PageTreeNodeWithPermission
-from app.schemas.cms_schemas import PageCreate, PageUpdate, ContentNode, PageDetailResponse
+from app.schemas.content_schemas import Article, Tag, Subsection, GroupInfo, PageContentItem, Ancestor, PageTreeNode, PageTreeNodeWithPermission, ContentFreshness, TitleSuggestion
+from app.schemas.cms_schemas import PageCreate, PageUpdate, ContentNode, PageDetailResponse, AttachmentUploadResult
 from app.schemas.cms_schemas import ArticleSubmissionStatus
 from app.schemas.auth_schemas import UserResponse
-from app.utils.html_translator import html_to_storage_format
+from app.utils.page_text import PageText
+from app.services.html_pool import html_pool
+from app.utils.snippets import headline_options, parse_headline
 from prisma.enums import PageType
 
 # Import Repositories and Services
 from app.services.confluence_repository import ConfluenceRepository, ROOT_PAGE_CONFIG
 from app.services.page_repository import PageRepository
 from app.services.submission_repository import SubmissionRepository
+from app.services.attachment_repository import AttachmentRepository
+from app.services.root_page_repository import RootPageRepository
+from app.services.search_repository import SearchRepository
+from app.services.content_version_repository import ContentVersionRepository
 from app.services.notification_service import NotificationService
+from app.services.attachment_cache import attachment_cache
+from app.services.resilience import attachment_stream_limiter
+from app.services.search_cache import search_result_cache
+from app.services.bm25_index import bm25_index, IndexDocument
+from app.services.page_tree import page_tree
 
 class ConfluenceService:
     """
@@ -33,13 +45,61 @@ class ConfluenceService:
         self.confluence_repo = ConfluenceRepository(settings)
         self.page_repo = PageRepository()
         self.submission_repo = SubmissionRepository()
+        self.attachment_repo = AttachmentRepository()
+        self.root_page_repo = RootPageRepository()
+        self.search_repo = SearchRepository()
+        self.content_version_repo = ContentVersionRepository()
         self.notification_service = NotificationService()
         self.db = db
 
-        # Get startup data from the Confluence repository
+        # Root-page mapping, filled by load_root_pages() (updated in place by the repository)
         self.root_page_ids = self.confluence_repo.root_page_ids
         self.id_to_group_slug_map = self.confluence_repo.id_to_group_slug_map
 
+    async def close(self):
+        """Releases the pooled Confluence HTTP connections."""
+        await self.confluence_repo.aclose()
+
+    # --- Root Page Discovery ---
+
+    async def load_root_pages(self) -> str:
+        """
+        Installs the root-page mapping at startup. A mapping cached in the DB is
+        used as-is, without calling Confluence; only when nothing is cached are
+        the root pages discovered in Confluence (and then cached).
+        Returns where the mapping came from: "cache" or "confluence".
+        """
+        try:
+            cached = await self.root_page_repo.get_mapping()
+        except Exception as e:
+            print(f"Warning: could not read cached root pages: {e}")
+            cached = {}
+
+        if cached:
+            self.confluence_repo.set_root_page_ids(cached)
+            return "cache"
+        await self.refresh_root_pages()
+        return "confluence"
+
+    async def refresh_root_pages(self) -> bool:
+        """
+        Re-discovers the root pages in Confluence and updates both the in-memory
+        mapping and the DB cache. A failed discovery keeps the last known mapping.
+        """
+        discovered = await self.confluence_repo.discover_root_pages()
+        if not discovered:
+            return False
+
+        if discovered != self.root_page_ids:
+            print(f"Root pages updated: {discovered}")
+            self.confluence_repo.set_root_page_ids(discovered)
+        titles = {config["slug"]: config["confluence_title"] for config in ROOT_PAGE_CONFIG}
+        try:
+            await self.root_page_repo.save_mapping(discovered, titles)
+        except Exception as e:
+            print(f"Warning: could not cache root pages: {e}")
+        return True
+
     # --- Utility & Transformation Methods ---
 
     def _slugify(self, text: str) -> str:
@@ -49,12 +109,6 @@ class ConfluenceService:
         text = re.sub(r'[^\w\s-]', '', text)
         return text
 
-    def _get_plain_text(self, html_content: str) -> str:
-        """Strips all HTML tags to get plain text."""
-        if not html_content: return ""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        return soup.get_text(" ", strip=True)
-        
     def _get_group_from_ancestors(self, ancestors: List[Union[Ancestor, Dict[str, Any]]]) -> str:
         """
         Finds the root-level group from an ancestor list.
@@ -66,6 +120,99 @@ class ConfluenceService:
                 return self.id_to_group_slug_map[ancestor_id]
         return "unknown" # Fallback
 
+    async def _index_page_content(self, page_id: str, page_text: PageText, version: int):
+        """
+        Stores the derived text fields of a page body with its full-text search
+        entry. Called whenever the body changes, so read endpoints never parse
+        HTML. A failure only leaves the stored fields stale.
+        """
+        try:
+            await self.search_repo.index_page(page_id, page_text, version)
+        except Exception as e:
+            print(f"WARNING: Could not update the search index for page {page_id}: {e}")
+
+    async def _bump_content_version(self, page_ids: Optional[List[str]] = None):
+        """
+        Signals that published content changed, invalidating derived caches in
+        every worker, and updates the embedded search index for the given pages.
+        This worker's page tree is rebuilt on its next read.
+        """
+        try:
+            search_result_cache.set_content_version(await self.content_version_repo.bump())
+        except Exception as e:
+            print(f"WARNING: Could not bump the content version: {e}")
+        page_tree.invalidate()
+        if self.settings.search_backend == "bm25" and page_ids:
+            try:
+                await self._update_bm25_index(page_ids)
+            except Exception as e:
+                print(f"WARNING: Could not update the BM25 search index for {page_ids}: {e}")
+
+    def _to_index_document(self, row: Dict[str, Any]) -> IndexDocument:
+        return IndexDocument(
+            page_id=row['confluenceId'],
+            title=row['title'],
+            description=row['description'],
+            body=row['plainText'],
+            tags=row['tags']
+        )
+
+    async def rebuild_bm25_index(self):
+        """Rebuilds the embedded search index from every searchable page in the database."""
+        rows = await self.search_repo.get_index_documents()
+        await asyncio.to_thread(bm25_index.rebuild, [self._to_index_document(row) for row in rows])
+        print(f"Rebuilt the BM25 search index with {len(rows)} pages.")
+
+    async def _update_bm25_index(self, page_ids: List[str]):
+        """Writes a publish segment with the current state of the given pages."""
+        rows = await self.search_repo.get_index_documents(page_ids)
+        docs = [self._to_index_document(row) for row in rows if row['isPublic']]
+        live_ids = {doc.page_id for doc in docs}
+        deleted_ids = [page_id for page_id in page_ids if page_id not in live_ids]
+        await asyncio.to_thread(bm25_index.apply_updates, docs, deleted_ids)
+        if bm25_index.needs_compaction():
+            await self.rebuild_bm25_index()
+
+    async def backfill_page_content(self) -> int:
+        """
+        Indexes pages that have no PageContent row yet (pages synced before the
+        search index existed), so their stored excerpt, word count and reading
+        time are filled in without a full re-sync. Returns how many were indexed.
+        """
+        page_ids = await self.search_repo.get_unindexed_page_ids()
+        batch_size = self.settings.page_content_backfill_batch_size
+        indexed: List[str] = []
+        for start in range(0, len(page_ids), batch_size):
+            batch = page_ids[start:start + batch_size]
+            fetched = await asyncio.gather(
+                *(self.confluence_repo.get_page_by_id(page_id, expand="body.view,version") for page_id in batch),
+                return_exceptions=True
+            )
+            pages = []
+            for page_id, page_data in zip(batch, fetched):
+                if isinstance(page_data, Exception):
+                    print(f"WARNING: Could not fetch page {page_id} to index it: {page_data}")
+                elif page_data:
+                    pages.append(page_data)
+            texts = await html_pool.extract_texts(
+                [page.get("body", {}).get("view", {}).get("value", "") for page in pages]
+            )
+            for page, page_text in zip(pages, texts):
+                await self._index_page_content(page["id"], page_text, page["version"]["number"])
+                indexed.append(page["id"])
+        if indexed:
+            await self._bump_content_version(indexed)
+        return len(indexed)
+
+    async def _current_content_version(self) -> Optional[int]:
+        """Returns the content version, re-reading the shared counter at most every poll interval."""
+        if search_result_cache.version_check_due():
+            try:
+                search_result_cache.set_content_version(await self.content_version_repo.get_version())
+            except Exception as e:
+                print(f"WARNING: Could not read the content version: {e}")
+        return search_result_cache.content_version
+
     async def _transform_raw_page_to_article(self, page_data: dict, is_admin_view: bool = False) -> Optional[Article]:
         """
         Transforms a raw Confluence page dictionary into an Article schema.
@@ -88,10 +235,7 @@ class ConfluenceService:
         subsection_slug = self._slugify(ancestors[-1]['title']) if ancestors else ""
         
         html_content = page_data.get("body", {}).get("view", {}).get("value", "")
-        plain_text = self._get_plain_text(html_content)
-        word_count = len(plain_text.split())
-        read_minutes = max(1, round(word_count / 200))
-        excerpt = (plain_text[:150] + '...') if len(plain_text) > 150 else plain_text
+        page_text = await html_pool.extract_text(html_content)
         
         status_labels = {"status-unpublished", "status-rejected"}
         tags = [
@@ -107,15 +251,15 @@ class ConfluenceService:
             "id": page_data["id"],
             "slug": self._slugify(page_data["title"]),
             "title": page_data["title"],
-            "excerpt": excerpt,
-            "description": excerpt,
+            "excerpt": page_text.excerpt,
+            "description": page_text.excerpt,
             "html": html_content,
             "tags": tags,
             "group": group_slug,
             "subsection": subsection_slug,
             "updatedAt": page_data["version"]["when"],
             "views": 0,
-            "readMinutes": read_minutes,
+            "readMinutes": page_text.read_minutes,
             "author": author_name,
             "parentId": ancestors[-1]['id'] if ancestors else None
         }
@@ -206,15 +350,12 @@ class ConfluenceService:
         if not is_published and not is_global_admin and not is_author and not is_group_admin: return None
 
         html_content = ""
-        read_minutes = 1
         try:
-            html_content = self.confluence_repo.get_page_content(page_id)
-            plain_text = self._get_plain_text(html_content)
-            word_count = len(plain_text.split())
-            read_minutes = max(1, round(word_count / 200))
+            html_content, freshness = await self.confluence_repo.get_page_content_with_freshness(page_id)
         except Exception as e:
             print(f"CRITICAL: Could not fetch content for page {page_id} from Confluence. Error: {e}")
             html_content = "<p>Error: Could not load document content from the source.</p>"
+            freshness = ContentFreshness(status="unavailable")
         
         ancestors = await self.page_repo.get_ancestors_from_db(page_metadata)
         group_slug = self._get_group_from_ancestors(ancestors)
@@ -233,10 +374,11 @@ class ConfluenceService:
             subsection=self._slugify(subsection_slug),
             updatedAt=page_metadata.updatedAt.isoformat(),
             views=page_metadata.views,
-            readMinutes=read_minutes,
+            readMinutes=page_metadata.readMinutes,
             author=page_metadata.authorName,
             parentId=page_metadata.parentConfluenceId,
-            canEdit=is_global_admin or is_group_admin 
+            canEdit=is_global_admin or is_group_admin,
+            freshness=freshness
         )
 
     async def get_subsection_by_id_hybrid(self, page_id: str) -> Optional[Subsection]:
@@ -253,21 +395,24 @@ class ConfluenceService:
         # Step 2: Fetch live content from Confluence
         html_content = ""
         try:
-            html_content = self.confluence_repo.get_page_content(page_id)
+            html_content, freshness = await self.confluence_repo.get_page_content_with_freshness(page_id)
         except Exception as e:
             print(f"CRITICAL: Could not fetch content for page {page_id} from Confluence. Error: {e}")
             html_content = "<p>Error: Could not load document content from the source.</p>"
+            freshness = ContentFreshness(status="unavailable")
         
         # Step 3: Get ancestors to determine group slug
         ancestors = await self.page_repo.get_ancestors_from_db(page_metadata)
         group_slug = self._get_group_from_ancestors(ancestors)
 
         # Step 4: Merge and format into Subsection schema (includes child count)
-        return await self.page_repo._format_page_as_subsection(
+        subsection = await self.page_repo._format_page_as_subsection(
             page=page_metadata,
             group_slug=group_slug,
             html_content=html_content
         )
+        subsection.freshness = freshness
+        return subsection
 
     async def get_ancestors(self, page_id: str) -> List[Ancestor]:
         """Gets ancestors from the local DB."""
@@ -276,86 +421,229 @@ class ConfluenceService:
             return []
         return await self.page_repo.get_ancestors_from_db(page)
 
-    async def search_content_hybrid(self, query: str, mode: str, sort: str, page: int, page_size: int) -> dict:
+    async def search_content_hybrid(self, query: str, mode: str, sort: str, page: int, page_size: int, match: str = "all") -> dict:
         """
-        DIRECT CONFLUENCE SEARCH: Searches Confluence and fetches full page details
-        directly from the API, respecting the specified search mode and sort order.
+        Searches the knowledge hub, serving repeated searches from the result
+        cache until published content changes.
         """
-        import asyncio
+        version = await self._current_content_version()
+        key = search_result_cache.make_key(query, mode, sort, match, page, page_size)
+        cached = search_result_cache.get(key)
+        if cached is not None:
+            return cached
 
-        # 1. Build the Confluence Query Language (CQL) string based on the mode
-        base_cql = f'space = "{self.settings.confluence_space_key}" and type = page and label != "status-unpublished" and label != "status-rejected"'
-        
-        sanitized_query = query.replace('"', '\\"')
+        result = await self._search_uncached(query, mode, sort, page, page_size, match)
+        search_result_cache.put(key, result, version)
+        return result
 
-        if mode == "title":
-            specific_cql = f'title ~ "{sanitized_query}"'
-        elif mode == "tags":
-            # Split the query by commas, and clean up whitespace
-            tag_names_from_query = [name.strip() for name in sanitized_query.strip().split(',') if name.strip()]
-            
-            if not tag_names_from_query:
-                # If the query is empty after splitting, return no results
-                return {"items": [], "total": 0, "page": 1, "pageSize": page_size, "hasNext": False}
-            
-            # Find the corresponding tags in the database to get their slugs, ignoring case
-            tag_records = await self.db.tag.find_many(
-                where={'name': {'in': tag_names_from_query, 'mode': 'insensitive'}}
-            )
-            
-            # Use the slugs to build the CQL query
-            if not tag_records:
-                 # If no valid tags were found, return no results
-                return {"items": [], "total": 0, "page": 1, "pageSize": page_size, "hasNext": False}
-
-            label_clauses = [f'label = "{tag.slug}"' for tag in tag_records]
-            specific_cql = ' and '.join(label_clauses)
-        else:  # Default to 'all' or 'content'
-            specific_cql = f'text ~ "{sanitized_query}"'
-
-        # 2. Add sorting clause
-        order_by_clause = ""
-        if sort == "date":
-            order_by_clause = " order by lastModified desc"
-        
-        full_cql = f"{base_cql} and {specific_cql}{order_by_clause}"
-        
-        # 3. Search Confluence using the constructed CQL
-        limit = page_size + 1
-        start = (page - 1) * page_size
-        
-        search_result_data = self.confluence_repo.search_cql(full_cql, start=start, limit=limit, expand="body.view,version,metadata.labels,ancestors")
-        
-        # 4. Process the results and handle pagination
-        raw_results = search_result_data.get('results', [])
-        has_next_page = len(raw_results) > page_size
-        
-        if has_next_page:
-            raw_results = raw_results[:-1]
+    async def _search_uncached(self, query: str, mode: str, sort: str, page: int, page_size: int, match: str) -> dict:
+        """
+        Searches the knowledge hub from the local database: title and full-text
+        searches use the Postgres full-text index, tag searches the Page-Tag relation.
+        """
+        if mode == "tags":
+            return await self._search_by_tags(query, match, sort, page, page_size)
 
-        # 5. Asynchronously transform the raw results into the Article schema
-        article_promises = [self._transform_raw_page_to_article(result) for result in raw_results]
-        
-        articles_or_none = await asyncio.gather(*article_promises)
-        valid_articles = [article for article in articles_or_none if article is not None]
+        skip = (page - 1) * page_size
+        if self.settings.search_backend == "bm25":
+            rows, total = await self._search_bm25(query, mode=mode, sort=sort, limit=page_size, offset=skip)
+        else:
+            rows, total = await self.search_repo.search(query, mode=mode, sort=sort, limit=page_size, offset=skip)
+        articles = await self._search_rows_to_articles(rows, query=query)
+        return {
+            "items": articles,
+            "total": total,
+            "page": page,
+            "pageSize": page_size,
+            "hasNext": (skip + len(articles)) < total
+        }
 
-        print(f"DEBUG: Stripping HTML from {len(valid_articles)} articles...")
-        for article in valid_articles:
-            article.html = ""
+    async def _search_bm25(self, query: str, mode: str, sort: str, limit: int, offset: int) -> tuple:
+        """Ranks pages with the embedded BM25 index, then loads one page of result rows."""
+        # Scoring is pure Python; keep it off the event loop
+        hits = await asyncio.to_thread(bm25_index.search, query, mode == "title")
+        page_ids = [page_id for page_id, _ in hits]
+        if sort in ("date", "views"):
+            page_ids = await self.search_repo.order_page_ids(page_ids, sort)
+        rows = await self.search_repo.get_result_rows(page_ids[offset:offset + limit])
+        return rows, len(page_ids)
+
+    async def _search_by_tags(self, query: str, match: str, sort: str, page: int, page_size: int) -> dict:
+        """
+        Finds pages carrying all (match="all") or any (match="any") of the
+        comma-separated tag names in the query, with facet counts per tag and
+        per group for refinement.
+        """
+        empty = {"items": [], "total": 0, "page": page, "pageSize": page_size, "hasNext": False, "facets": {"tags": [], "groups": []}}
 
-        total_results = start + len(valid_articles) + (1 if has_next_page else 0)
+        # Split the query by commas, and clean up whitespace
+        tag_names_from_query = [name.strip() for name in query.strip().split(',') if name.strip()]
+        if not tag_names_from_query:
+            return empty
+
+        # Find the corresponding tags in the database, ignoring case
+        tag_records = await self.db.tag.find_many(
+            where={'name': {'in': tag_names_from_query, 'mode': 'insensitive'}}
+        )
+        if not tag_records:
+            return empty
+
+        tag_ids = [tag.id for tag in tag_records]
+        match_all = match != "any"
+        skip = (page - 1) * page_size
+        rows, facet_rows = await asyncio.gather(
+            self.search_repo.search_by_tags(tag_ids, match_all, sort=sort, limit=page_size, offset=skip),
+            self.search_repo.tag_facets(tag_ids, match_all)
+        )
+        articles = await self._search_rows_to_articles(rows)
+
+        total = next((row['count'] for row in facet_rows if row['kind'] == 'total'), 0)
+        tag_facets = sorted(
+            ({"slug": row['key'], "name": row['name'], "count": row['count']} for row in facet_rows if row['kind'] == 'tag'),
+            key=lambda facet: (-facet['count'], facet['name'])
+        )
+        group_facets = sorted(
+            ({"slug": self.id_to_group_slug_map.get(row['key'], "unknown"), "count": row['count']} for row in facet_rows if row['kind'] == 'group'),
+            key=lambda facet: -facet['count']
+        )
 
         return {
-            "items": valid_articles,
-            "total": total_results,
+            "items": articles,
+            "total": total,
             "page": page,
             "pageSize": page_size,
-            "hasNext": has_next_page
+            "hasNext": (skip + len(articles)) < total,
+            "facets": {"tags": tag_facets, "groups": group_facets}
         }
 
-    def get_attachment_data(self, page_id: str, file_name: str) -> Optional[StreamingResponse]:
-        """Pass-through to ConfluenceRepository to get attachment data."""
-        return self.confluence_repo.get_attachment_data(page_id, file_name)
+    async def _search_rows_to_articles(self, rows: List[Dict[str, Any]], query: Optional[str] = None) -> List[Article]:
+        """
+        Builds Article cards for search result rows with one tag and one ancestor
+        query. With a query, the excerpt is the best-matching window of the body
+        and `highlights` holds the marked-up matching fragments.
+        """
+        if not rows:
+            return []
+
+        page_ids = [row['confluenceId'] for row in rows]
+        pages_with_tags = await self.page_repo.get_pages_by_ids(page_ids)
+        tags_by_page = {p.confluenceId: p.tags for p in pages_with_tags}
+        ancestor_chains = await self.page_repo.get_ancestor_chains(page_ids)
+        headlines = await self.search_repo.get_headlines(
+            page_ids, query,
+            headline_options(self.settings.search_snippet_fragments, self.settings.search_snippet_window_words)
+        ) if query else {}
+
+        articles = []
+        for row in rows:
+            ancestors = ancestor_chains.get(row['confluenceId'], [])
+            fragments = parse_headline(headlines.get(row['confluenceId'], ""))
+            articles.append(Article(
+                id=row['confluenceId'],
+                slug=row['slug'],
+                title=row['title'],
+                excerpt=fragments[0].text if fragments else (row['excerpt'] or row['description']),
+                highlights=[fragment.highlighted for fragment in fragments] or None,
+                html="",
+                tags=[Tag.model_validate(t.model_dump()) for t in tags_by_page.get(row['confluenceId'], [])],
+                group=self._get_group_from_ancestors(ancestors),
+                subsection=self._slugify(ancestors[-1].title) if ancestors else "",
+                updatedAt=str(row['updatedAt']),
+                views=row['views'],
+                readMinutes=row['readMinutes'],
+                author=row['authorName'],
+                parentId=row['parentConfluenceId']
+            ))
+        return articles
+
+    async def get_attachment_data(
+        self,
+        page_id: str,
+        file_name: str,
+        if_none_match: Optional[str] = None,
+        range_header: Optional[str] = None,
+        request: Optional[Request] = None
+    ) -> Optional[Response]:
+        """
+        Serves an attachment from the local disk cache, downloading it once per
+        (attachment id, version). The attachment is resolved through the local
+        attachment index; Confluence is only asked to list the page's
+        attachments when the index has no entry for the file.
+        Cached files are served with ETag and Cache-Control headers and support
+        HTTP Range requests. Files too large for the cache are streamed straight
+        from Confluence, forwarding the Range header upstream.
+        """
+        record = await self.attachment_repo.get_by_page_and_name(page_id, file_name)
+        if not record:
+            attachment = await self.confluence_repo.find_attachment(page_id, file_name)
+            if not attachment:
+                return None
+            record = await self.attachment_repo.upsert_from_confluence(page_id, attachment)
+
+        attachment_id = record.attachmentId
+        version = record.version
+        mimetype, _ = mimetypes.guess_type(file_name)
+        media_type = mimetype or record.mediaType or 'application/octet-stream'
+
+        headers = {
+            "ETag": attachment_cache.etag(attachment_id, version),
+            "Cache-Control": f"public, max-age={self.settings.attachment_cache_max_age_seconds}"
+        }
+        if if_none_match and (if_none_match.strip() == "*" or headers["ETag"] in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        file_path = attachment_cache.get_path(attachment_id, version)
+        if file_path is None and attachment_cache.can_cache(record.fileSize):
+            file_path = await self.confluence_repo.single_flight.do(
+                ("attachment_download", attachment_id, version),
+                lambda: self._download_attachment_to_cache(page_id, attachment_id, version, record.downloadPath)
+            )
+
+        if file_path:
+            return FileResponse(file_path, media_type=media_type, headers=headers)
+        return await self.confluence_repo.stream_attachment(
+            page_id, attachment_id, record.downloadPath, media_type, headers,
+            range_header=range_header, request=request
+        )
+
+    async def _download_attachment_to_cache(self, page_id: str, attachment_id: str, version: int, download_path: Optional[str]) -> str:
+        # Cache fills hold an upstream connection just like proxied streams, so they share the same cap.
+        if not await attachment_stream_limiter.acquire():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many attachment downloads in progress. Please retry shortly.",
+                headers={"Retry-After": "5"}
+            )
+        try:
+            response = await self.confluence_repo.open_attachment_stream(page_id, attachment_id, download_path)
+            try:
+                return await attachment_cache.store(
+                    attachment_id, version,
+                    response.aiter_bytes(chunk_size=self.settings.attachment_stream_max_chunk_bytes)
+                )
+            finally:
+                await response.aclose()
+        finally:
+            attachment_stream_limiter.release()
+
+    async def _index_uploaded_attachments(self, page_id: str, uploaded: List[AttachmentUploadResult]):
+        """Records freshly uploaded attachments in the local attachment index."""
+        for result in uploaded:
+            if result.attachment is None:
+                continue
+            try:
+                await self.attachment_repo.upsert_from_confluence(page_id, result.attachment)
+            except Exception as e:
+                print(f"Warning: could not index attachment '{result.file_name}' on page {page_id}: {e}")
+
+    async def _sync_attachment_index(self, page_id: str):
+        """Replaces a page's attachment index entries with its current Confluence attachments."""
+        try:
+            attachments = await self.confluence_repo.list_attachments(page_id)
+            await self.attachment_repo.sync_page_attachments(page_id, attachments)
+        except Exception as e:
+            # Missing entries are filled lazily on the next download.
+            print(f"Warning: could not sync attachment index for page {page_id}: {e}")
 
     async def get_recent_articles(self, limit: int = 6) -> List[Article]:
         """Fetches recent articles directly from the local DB."""
@@ -383,10 +671,10 @@ class ConfluenceService:
         page_id = None
         try:
             # 1. Convert HTML to Confluence Storage Format
-            translated_content = html_to_storage_format(page_data.content)
+            translated_content = await html_pool.to_storage_format(page_data.content)
             
             # 2. Create page in Confluence
-            new_page_in_confluence = self.confluence_repo.create_page(
+            new_page_in_confluence = await self.confluence_repo.create_page(
                 title=page_data.title,
                 parent_id=page_data.parent_id,
                 content_storage_format=translated_content,
@@ -410,6 +698,7 @@ class ConfluenceService:
                 updated_at_str=updated_at,
                 tag_names=page_data.tags
             )
+            await self._index_page_content(page_id, await html_pool.extract_text(page_data.content), new_page_in_confluence['version']['number'])
             
             # 4. Create the ArticleSubmission record
             await self.submission_repo.create_submission(
@@ -417,14 +706,17 @@ class ConfluenceService:
                 title=page_data.title,
                 author_id=author_id
             )
+            # Lets every worker's page tree pick up the new page
+            await self._bump_content_version([page_id])
 
             # 5. Handle Attachments and Labels in Confluence
-            self.confluence_repo.upload_attachments(page_id, page_data.attachments)
-            self.confluence_repo.add_label(page_id, 'status-unpublished')
+            uploaded = await self.confluence_repo.upload_attachments(page_id, page_data.attachments)
+            await self._index_uploaded_attachments(page_id, uploaded)
+            labels_to_add = ['status-unpublished']
             if page_data.tags:
                 tag_records = await self.db.tag.find_many(where={'name': {'in': page_data.tags}})
-                for tag in tag_records:
-                    self.confluence_repo.add_label(page_id, tag.slug)
+                labels_to_add.extend(tag.slug for tag in tag_records)
+            await self.confluence_repo.update_labels(page_id, add=labels_to_add)
 
             # 6. Notify admins (UPDATED: pass page_id)
             await self.notification_service.notify_admins_of_submission(
@@ -433,13 +725,13 @@ class ConfluenceService:
                 page_id=page_id
             )
                 
-            return {"id": page_id, "title": page_data.title, "status": "unpublished"}
+            return {"id": page_id, "title": page_data.title, "status": "unpublished", "attachments": uploaded}
 
         except Exception as e:
             print(f"Failed to create page for review: {e}")
             if page_id:
                 try:
-                    self.confluence_repo.delete_page(page_id)
+                    await self.confluence_repo.delete_page(page_id)
                     print(f"Cleaned up draft page {page_id} in Confluence after DB error.")
                 except Exception as cleanup_e:
                     print(f"Failed to clean up draft page {page_id}: {cleanup_e}")
@@ -452,7 +744,7 @@ class ConfluenceService:
         - Fetches live content from Confluence.
         - Fetches metadata (tags, parent) from the local database.
         """
-        page_from_confluence = self.confluence_repo.get_page_by_id(page_id, expand="body.view")
+        page_from_confluence = await self.confluence_repo.get_page_by_id(page_id, expand="body.view")
         if not page_from_confluence:
             return None
         
@@ -478,13 +770,13 @@ class ConfluenceService:
             author_name = current_user.name # Get author name from the user object
 
             # 1. Convert HTML and update in Confluence
-            translated_content = html_to_storage_format(page_data.content)
+            translated_content = await html_pool.to_storage_format(page_data.content)
             
-            current_page_data = self.confluence_repo.get_page_by_id(page_id, expand="version,metadata.labels")
+            current_page_data = await self.confluence_repo.get_page_by_id(page_id, expand="version,metadata.labels")
             if not current_page_data:
                  raise HTTPException(status_code=404, detail="Page to update not found in Confluence.")
             
-            updated_page_data = self.confluence_repo.update_page(
+            updated_page_data = await self.confluence_repo.update_page(
                 page_id=page_id,
                 title=page_data.title,
                 body=translated_content,
@@ -509,8 +801,7 @@ class ConfluenceService:
                 print(f"Author {current_user.name} is resubmitting page {page_id}. Changing status to PENDING_REVIEW.")
                 
                 # Update labels in Confluence for resubmission
-                self.confluence_repo.remove_label(page_id, "status-rejected")
-                self.confluence_repo.add_label(page_id, "status-unpublished")
+                await self.confluence_repo.update_labels(page_id, add=["status-unpublished"], remove=["status-rejected"])
 
                 # Update the submission status in our DB (comment is not cleared)
                 await self.submission_repo.update_status(page_id, ArticleSubmissionStatus.PENDING_REVIEW)
@@ -531,6 +822,7 @@ class ConfluenceService:
                 parent_id=page_data.parent_id,
                 tag_names=page_data.tags
             )
+            await self._index_page_content(page_id, await html_pool.extract_text(page_data.content), updated_page_data["version"]["number"])
 
             # 4. Sync labels/tags in Confluence if a tag list was sent
             if page_data.tags is not None:
@@ -542,18 +834,20 @@ class ConfluenceService:
                 tags_to_add = new_slugs - existing_labels
                 tags_to_remove = existing_labels - new_slugs
 
-                for slug in tags_to_add:
-                    self.confluence_repo.add_label(page_id, slug)
-                for slug in tags_to_remove:
-                    self.confluence_repo.remove_label(page_id, slug)
+                await self.confluence_repo.update_labels(page_id, add=tags_to_add, remove=tags_to_remove)
             
             # 5. Handle any new attachments uploaded during the edit session
             if page_data.attachments:
                 print(f"Uploading {len(page_data.attachments)} new attachments to page {page_id}.")
-                self.confluence_repo.upload_attachments(page_id, page_data.attachments)
+                uploaded = await self.confluence_repo.upload_attachments(page_id, page_data.attachments)
+                await self._index_uploaded_attachments(page_id, uploaded)
+
+            # The rendered body changed, so drop the cached copy
+            self.confluence_repo.invalidate_page_content(page_id)
 
             # 6. Also update the submission record's title to keep it in sync
             await self.submission_repo.update_title(page_id, page_data.title)
+            await self._bump_content_version([page_id])
             
             return True
         except Exception as e:
@@ -566,7 +860,7 @@ class ConfluenceService:
         """
         Fetches a raw page from Confluence for admin preview, bypassing local DB.
         """
-        page_data = self.confluence_repo.get_page_by_id(page_id, expand="body.view,version,metadata.labels,ancestors")
+        page_data = await self.confluence_repo.get_page_by_id(page_id, expand="body.view,version,metadata.labels,ancestors")
         if not page_data:
             return None
         # Use await here because the transform method is now async
@@ -609,20 +903,26 @@ class ConfluenceService:
         """
         try:
             # 1. Update labels in Confluence
-            self.confluence_repo.remove_label(page_id, "status-unpublished")
-            self.confluence_repo.remove_label(page_id, "status-rejected") # Clean up just in case
+            await self.confluence_repo.update_labels(page_id, remove=["status-unpublished", "status-rejected"]) # "rejected" is cleaned up just in case
 
             # 2. Get latest data from Confluence for sync
-            page_data = self.confluence_repo.get_page_by_id(page_id, expand="body.view,version,metadata.labels,ancestors")
+            page_data = await self.confluence_repo.get_page_by_id(page_id, expand="body.view,version,metadata.labels,ancestors")
             if not page_data:
                 raise HTTPException(status_code=404, detail="Page not found in Confluence after approval.")
 
             # 3. Determine Page Type for the approved page itself
-            has_children = self.confluence_repo.check_has_children(page_id)
+            has_children = await self.confluence_repo.check_has_children(page_id)
             page_type = PageType.SUBSECTION if has_children else PageType.ARTICLE
             
             # 4. Sync all metadata (including tags) to our local DB
             await self.page_repo.sync_page_from_confluence_data(page_id, page_data, page_type)
+            await self._index_page_content(
+                page_id,
+                await html_pool.extract_text(page_data.get("body", {}).get("view", {}).get("value", "")),
+                page_data["version"]["number"]
+            )
+            self.confluence_repo.invalidate_page_content(page_id)
+            await self._sync_attachment_index(page_id)
 
             # --- THIS IS THE FIX ---
             # 5. Now that the child is approved, ensure its parent is a SUBSECTION
@@ -638,6 +938,7 @@ class ConfluenceService:
                 ArticleSubmissionStatus.PUBLISHED,
                 comment=None
             )
+            await self._bump_content_version([page_id])
             
             if submission:
                 await self.notification_service.notify_author_of_approval(
@@ -650,7 +951,7 @@ class ConfluenceService:
             # ... (error handling remains the same)
             print(f"Error approving page {page_id}: {e}")
             try:
-                self.confluence_repo.add_label(page_id, "status-unpublished")
+                await self.confluence_repo.add_label(page_id, "status-unpublished")
             except Exception as rollback_e:
                 print(f"Error during rollback of approval for page {page_id}: {rollback_e}")
             if isinstance(e, HTTPException): raise e
@@ -663,10 +964,11 @@ class ConfluenceService:
         """
         try:
             # 1. Add rejection comment and update labels in Confluence
+            label_update = self.confluence_repo.update_labels(page_id, add=["status-rejected"], remove=["status-unpublished"])
             if comment: 
-                self.confluence_repo.post_comment(page_id, comment)
-            self.confluence_repo.remove_label(page_id, "status-unpublished")
-            self.confluence_repo.add_label(page_id, "status-rejected")
+                await asyncio.gather(self.confluence_repo.post_comment(page_id, comment), label_update)
+            else:
+                await label_update
             
             # 2. Update the local submission status
             submission = await self.submission_repo.update_status(
@@ -694,8 +996,7 @@ class ConfluenceService:
         """
         try:
             # 1. Update labels in Confluence
-            self.confluence_repo.remove_label(page_id, "status-rejected")
-            self.confluence_repo.add_label(page_id, "status-unpublished")
+            await self.confluence_repo.update_labels(page_id, add=["status-unpublished"], remove=["status-rejected"])
             
             # 2. Update local submission status
             submission = await self.submission_repo.update_status(page_id, ArticleSubmissionStatus.PENDING_REVIEW)
@@ -731,9 +1032,12 @@ class ConfluenceService:
                 )
 
             # If the check passes, proceed with the original deletion logic.
-            self.confluence_repo.delete_page(page_id)
+            await self.confluence_repo.delete_page(page_id)
+            self.confluence_repo.invalidate_page_content(page_id)
+            await self.attachment_repo.delete_by_page(page_id)
             await self.submission_repo.delete_by_confluence_id(page_id)
             await self.page_repo.delete_by_confluence_id(page_id)
+            await self._bump_content_version([page_id])
             
             return True
         except Exception as e:
@@ -762,42 +1066,6 @@ class ConfluenceService:
 
         return {"deleted": deleted_ids, "failed": failed_items}
 
-    def get_page_tree(self, parent_id: Optional[str] = None) -> List[Dict]:
-        """
-        Fetches the page hierarchy for the CMS tree select.
-        This still queries Confluence directly as it's a CMS-only feature
-        and doesn't need to be hyper-fast.
-        """
-        nodes = []
-        try:
-            page_ids_to_fetch = []
-            if parent_id is None:
-                # Get root pages ("Departments", "Tools", etc.)
-                page_ids_to_fetch = list(self.root_page_ids.values())
-            else:
-                # Get children of the requested parent
-                child_pages = self.confluence_repo.get_child_pages(parent_id, limit=200)
-                page_ids_to_fetch = [child['id'] for child in child_pages]
-
-            # For each page, check if it has children
-            for page_id in page_ids_to_fetch:
-                page = self.confluence_repo.get_page_by_id(page_id, expand="")
-                if not page:
-                    continue
-                
-                # Check for grandchildren to set 'hasChildren'
-                grand_children = self.confluence_repo.get_child_pages(page_id, limit=1)
-                nodes.append({
-                    "id": page['id'], 
-                    "title": page['title'], 
-                    "hasChildren": len(grand_children) > 0
-                })
-            
-            return sorted(nodes, key=lambda x: x['title'])
-        except Exception as e:
-            print(f"Error fetching page tree for parent {parent_id}: {e}")
-            raise HTTPException(status_code=503, detail="Could not fetch page hierarchy.")
-        
     async def get_page_tree_with_permissions(self, user: UserResponse, parent_id: Optional[str] = None, allowed_only: bool = False) -> List[PageTreeNodeWithPermission]:
         """
         Fetches the page hierarchy, augmenting each node with an 'isAllowed' flag
@@ -807,25 +1075,10 @@ class ConfluenceService:
             # If filtering is requested for a non-admin, use the new repository method
             return await self.page_repo.get_filtered_tree_nodes_for_user(user, parent_id)
         
-        allowed_page_ids = await self.page_repo.get_all_managed_and_descendant_ids(user)
         is_admin = user.role == 'ADMIN'
+        allowed_page_ids = None if is_admin else await self.page_repo.get_all_managed_and_descendant_ids(user)
 
-        child_pages = await self.page_repo.get_child_pages_for_index(parent_id)
-        
-        nodes_to_return = []
-        for page in child_pages:
-            has_children = await self.page_repo.has_children(page.confluenceId)
-            is_node_allowed = is_admin or page.id in allowed_page_ids
-
-            nodes_to_return.append(
-                PageTreeNodeWithPermission(
-                    id=page.confluenceId,
-                    title=page.title,
-                    hasChildren=has_children,
-                    isAllowed=is_node_allowed
-                )
-            )
-        
+        nodes_to_return = await self.page_repo.get_tree_nodes_with_permissions(parent_id, allowed_page_ids)
         return sorted(nodes_to_return, key=lambda x: x.title)
 
     async def get_page_tree(self, parent_id: Optional[str] = None) -> List[PageTreeNode]:
@@ -837,80 +1090,73 @@ class ConfluenceService:
 
     async def get_content_index_nodes(self, parent_id: Optional[str] = None, current_user: UserResponse = None) -> List[ContentNode]:
         """
-        Fetches nodes for the admin content index page entirely from the local database.
+        Fetches nodes for the admin content index page entirely from the local
+        database, one query per tree level.
         """
-        nodes = []
-        
-        # 1. Determine permissions
-        is_global_admin = current_user and current_user.role == "ADMIN"
-        admin_page_ids = set()
-        if current_user and not is_global_admin:
-            admin_page_ids = await self.page_repo.get_admin_managed_page_ids(current_user.id)
-
-        # 2. Get the relevant pages from our database
-        child_pages_from_db = await self.page_repo.get_child_pages_for_index(parent_id)
+        is_global_admin = bool(current_user and current_user.role == "ADMIN")
+        rows = await self.page_repo.get_content_index_rows(
+            parent_id=parent_id,
+            manager_user_id=current_user.id if current_user else None,
+            manage_all=is_global_admin
+        )
+        return self._content_index_rows_to_nodes(rows)
 
-        for page in child_pages_from_db:
+    def _content_index_rows_to_nodes(self, rows: List[Dict[str, Any]]) -> List[ContentNode]:
+        nodes = []
+        for row in rows:
             try:
-                has_children = await self.page_repo.has_children(page.confluenceId)
-                submission = await self.submission_repo.get_by_confluence_id_with_author(page.confluenceId)
-                
-                author_name, status = page.authorName or "System", ArticleSubmissionStatus.PUBLISHED
-                if submission:
-                    if submission.author:
-                        author_name = submission.author.name
-                    status = submission.status
-                
-                can_manage = is_global_admin or (page.confluenceId in admin_page_ids)
-
                 nodes.append(ContentNode(
-                    id=page.confluenceId, 
-                    title=page.title, 
-                    author=author_name, 
-                    status=status, 
-                    updatedAt=page.updatedAt, 
-                    confluenceUrl=f"{self.settings.confluence_url}/spaces/{self.settings.confluence_space_key}/pages/{page.confluenceId}", 
+                    id=row['confluenceId'], 
+                    title=row['title'], 
+                    author=row['author'], 
+                    status=row['status'], 
+                    updatedAt=row['updatedAt'], 
+                    confluenceUrl=f"{self.settings.confluence_url}/spaces/{self.settings.confluence_space_key}/pages/{row['confluenceId']}", 
                     children=[], 
-                    hasChildren=has_children,
-                    canManage=can_manage
+                    hasChildren=row['hasChildren'],
+                    canManage=row['canManage']
                 ))
             except Exception as e:
-                print(f"Error processing DB node for page {page.confluenceId}: {e}")
-                
+                print(f"Error processing DB node for page {row['confluenceId']}: {e}")
         return nodes
     
-    async def search_content_index(self, search_term: str) -> List[ContentNode]:
+    async def suggest_titles(self, term: str, limit: int, public_only: bool = True) -> List[TitleSuggestion]:
         """
-        Searches for content index nodes by title from the local database
-        and returns a flattened list.
+        Title typeahead from the local trigram index: a short, ranked list of
+        pages with their ancestor path, without tags or content.
         """
-        if not search_term or len(search_term) < 2:
+        term = term.strip()
+        if len(term) < 2:
             return []
+        limit = min(limit, self.settings.typeahead_max_results)
+        rows = await self.search_repo.suggest_titles(term, limit, public_only=public_only)
+        chains = await self.page_repo.get_ancestor_chains([row['confluenceId'] for row in rows])
+        return [
+            TitleSuggestion(
+                id=row['confluenceId'],
+                title=row['title'],
+                type=row['pageType'].lower(),
+                path=[ancestor.title for ancestor in chains.get(row['confluenceId'], [])]
+            ) for row in rows
+        ]
 
-        nodes = []
-        searched_pages = await self.page_repo.search_pages_for_index(search_term)
+    async def search_content_index(self, search_term: str, current_user: UserResponse = None) -> List[ContentNode]:
+        """
+        Searches for content index nodes whose title contains the term from
+        the local database and returns a flattened list, with canManage set
+        for the current user as in get_content_index_nodes. Every match is
+        returned; ranked, capped matching is left to the suggest endpoints.
+        """
+        search_term = search_term.strip()
+        if not search_term or len(search_term) < 2:
+            return []
 
-        for page in searched_pages:
-            try:
-                has_children = await self.page_repo.has_children(page.confluenceId)
-                submission = await self.submission_repo.get_by_confluence_id_with_author(page.confluenceId)
-                
-                author_name, status = page.authorName or "System", ArticleSubmissionStatus.PUBLISHED
-                if submission:
-                    author_name = submission.author.name if submission.author else "Unknown"
-                    status = submission.status
-                
-                nodes.append(ContentNode(
-                    id=page.confluenceId, 
-                    title=page.title, 
-                    author=author_name, 
-                    status=status, 
-                    updatedAt=page.updatedAt, 
-                    confluenceUrl=f"{self.settings.confluence_url}/spaces/{self.settings.confluence_space_key}/pages/{page.confluenceId}", 
-                    children=[], 
-                    hasChildren=has_children
-                ))
-            except Exception as e:
-                print(f"Error processing searched DB node for page {page.confluenceId}: {e}")
-                
-        return nodes
\ No newline at end of file
+        # Search results have always shown "Unknown" for a submission without an author
+        is_global_admin = bool(current_user and current_user.role == "ADMIN")
+        index_rows = await self.page_repo.get_content_index_rows(
+            title_contains=search_term,
+            manager_user_id=current_user.id if current_user else None,
+            manage_all=is_global_admin,
+            missing_submitter="Unknown"
+        )
+        return self._content_index_rows_to_nodes(index_rows)
\ No newline at end of file
@@ -0,0 +1,226 @@
+# server/app/services/content_cache.py
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+@dataclass
+class CachedBody:
+    body: str
+    version: int
+    fetched_at: float
+    stale: bool = False
+
+
+class PageBodyCache:
+    """
+    Bounded LRU cache of rendered page bodies ('body.view'), keyed by the
+    Confluence page ID plus the Confluence version number of the body.
+
+    An optional on-disk tier keeps bodies across restarts and is shared by all
+    workers on the host. When it is enabled, a memory hit is only treated as
+    fresh while its disk file still exists, so an invalidation in one worker is
+    seen by every other worker on the next read.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[Tuple[str, int], CachedBody]" = OrderedDict()
+        self._latest_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    # --- Disk Tier Helpers ---
+
+    def _page_dir(self, page_id: str) -> Optional[str]:
+        # Page IDs arrive from URL paths; never let one escape the cache directory.
+        if not self.disk_dir or not page_id.isalnum():
+            return None
+        return os.path.join(self.disk_dir, page_id)
+
+    def _disk_path(self, page_id: str, version: int) -> Optional[str]:
+        page_dir = self._page_dir(page_id)
+        return os.path.join(page_dir, f"{version}.html") if page_dir else None
+
+    def _disk_versions(self, page_id: str) -> List[int]:
+        page_dir = self._page_dir(page_id)
+        if not page_dir:
+            return []
+        try:
+            file_names = os.listdir(page_dir)
+        except OSError:
+            return []
+        return [int(f[:-5]) for f in file_names if f.endswith(".html") and f[:-5].isdigit()]
+
+    def _load_disk_index(self):
+        """Rebuilds the page -> latest version map from the files already on disk."""
+        for page_id in os.listdir(self.disk_dir):
+            versions = self._disk_versions(page_id)
+            if versions:
+                self._latest_versions[page_id] = max(versions)
+
+    def _read_disk(self, page_id: str, version: int) -> Optional[str]:
+        path = self._disk_path(page_id, version)
+        if not path:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, page_id: str, version: int, body: str):
+        path = self._disk_path(page_id, version)
+        if not path:
+            return
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write page body cache file {path}: {e}")
+
+    def _remove_disk(self, page_id: str):
+        page_dir = self._page_dir(page_id)
+        if page_dir:
+            shutil.rmtree(page_dir, ignore_errors=True)
+
+    # --- Public API ---
+
+    def get_entry(self, page_id: str) -> Optional[CachedBody]:
+        """
+        Returns the cached entry for the latest known version of a page, if any.
+        Invalidated entries are still returned (marked stale) so callers can use
+        them as a last known good copy when Confluence is unavailable.
+        """
+        with self._lock:
+            version = self._latest_versions.get(page_id)
+            if version is not None:
+                key = (page_id, version)
+                entry = self._entries.get(key)
+                if entry is not None:
+                    disk_path = self._disk_path(page_id, version)
+                    if not entry.stale and disk_path and not os.path.exists(disk_path):
+                        # Another worker invalidated this page.
+                        entry.stale = True
+                    self._entries.move_to_end(key)
+                    if entry.stale:
+                        self.stale_hits += 1
+                    else:
+                        self.hits += 1
+                    return entry
+
+        if self.disk_dir:
+            if version is None:
+                # The page may have been cached by another worker since startup.
+                self._refresh_version_from_disk(page_id)
+                version = self._latest_versions.get(page_id)
+            if version is not None:
+                body = self._read_disk(page_id, version)
+                if body is not None:
+                    entry = CachedBody(body=body, version=version, fetched_at=os.path.getmtime(self._disk_path(page_id, version)))
+                    with self._lock:
+                        self.disk_hits += 1
+                        self._store_in_memory(page_id, entry)
+                    return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get(self, page_id: str) -> Optional[str]:
+        """Returns the cached body of a page if it has not been invalidated."""
+        entry = self.get_entry(page_id)
+        if entry is None or entry.stale:
+            return None
+        return entry.body
+
+    def put(self, page_id: str, version: int, body: str):
+        """Stores the body of a specific page version, replacing older versions."""
+        with self._lock:
+            previous_version = self._latest_versions.get(page_id)
+            if previous_version is not None and previous_version > version:
+                return
+            if previous_version is not None and previous_version != version:
+                self._entries.pop((page_id, previous_version), None)
+            self._store_in_memory(page_id, CachedBody(body=body, version=version, fetched_at=time.time()))
+
+        if self.disk_dir:
+            if previous_version is not None and previous_version != version:
+                self._remove_disk(page_id)
+            self._write_disk(page_id, version, body)
+
+    def invalidate(self, page_id: str):
+        """
+        Marks every cached version of a page as stale and removes it from disk.
+        The in-memory copy is kept only as a fallback for Confluence outages.
+        """
+        with self._lock:
+            version = self._latest_versions.get(page_id)
+            entry = self._entries.get((page_id, version)) if version is not None else None
+            if entry is not None:
+                entry.stale = True
+            self.invalidations += 1
+        if self.disk_dir:
+            self._remove_disk(page_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "staleHits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hitRatio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+    # --- Internal Helpers (call with the lock held) ---
+
+    def _store_in_memory(self, page_id: str, entry: CachedBody):
+        key = (page_id, entry.version)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._latest_versions[page_id] = entry.version
+        while len(self._entries) > self.max_entries:
+            (evicted_id, evicted_version), _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            # Without a disk tier there is nothing left to point at.
+            if not self.disk_dir and self._latest_versions.get(evicted_id) == evicted_version:
+                del self._latest_versions[evicted_id]
+
+    def _refresh_version_from_disk(self, page_id: str):
+        versions = self._disk_versions(page_id)
+        if versions:
+            with self._lock:
+                self._latest_versions[page_id] = max(versions)
+
+
+# Global instance shared by every ConfluenceRepository in the process
+page_body_cache = PageBodyCache(
+    max_entries=settings.content_cache_max_entries,
+    disk_dir=settings.content_cache_dir
+)
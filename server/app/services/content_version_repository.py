@@ -0,0 +1,27 @@
+# server/app/services/content_version_repository.py
+from app.db import db
+
+
+class ContentVersionRepository:
+    """
+    Handles the ContentVersion counter, a single row bumped whenever published
+    content changes so that derived caches in every worker can be invalidated.
+    """
+
+    def __init__(self):
+        self.db = db
+
+    async def get_version(self) -> int:
+        row = await self.db.contentversion.find_unique(where={'id': 1})
+        return row.version if row else 0
+
+    async def bump(self) -> int:
+        """Atomically increments the counter and returns the new version."""
+        rows = await self.db.query_raw(
+            """
+            INSERT INTO "ContentVersion" ("id", "version", "updatedAt") VALUES (1, 1, NOW())
+            ON CONFLICT ("id") DO UPDATE SET "version" = "ContentVersion"."version" + 1, "updatedAt" = NOW()
+            RETURNING "version"
+            """
+        )
+        return rows[0]['version']
@@ -0,0 +1,114 @@
+# server/app/services/html_pool.py
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.utils.html_translator import html_to_storage_format
+from app.utils.page_text import PageText, extract_page_text, extract_page_texts
+
+
+class HtmlProcessPool:
+    """
+    Bounded process pool for CPU-bound HTML work (BeautifulSoup parsing, text
+    extraction, storage-format conversion), so large documents do not stall
+    the event loop for every other request.
+
+    Small documents are handled inline because the round trip to a worker
+    costs more than the parse. Batches are split into chunks of `chunk_size`
+    documents, one task per chunk, to amortize that round trip. At most
+    `workers * 2` tasks are queued at once; further callers wait their turn.
+    """
+
+    def __init__(self, workers: int, chunk_size: int, inline_max_bytes: int):
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.inline_max_bytes = inline_max_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.inline_documents = 0
+        self.offloaded_documents = 0
+        self.tasks = 0
+        self.total_task_ms = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers import only the parsing modules, not the running app.
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            self._slots = asyncio.Semaphore(self.workers * 2)
+        return self._executor
+
+    def _is_inline(self, html_content: str) -> bool:
+        return self.workers <= 0 or len(html_content or "") <= self.inline_max_bytes
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        executor = self._get_executor()
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            finally:
+                self.tasks += 1
+                self.total_task_ms += (time.perf_counter() - started) * 1000
+
+    # --- Public API ---
+
+    async def extract_text(self, html_content: str) -> PageText:
+        if self._is_inline(html_content):
+            self.inline_documents += 1
+            return extract_page_text(html_content)
+        self.offloaded_documents += 1
+        return await self._submit(extract_page_text, html_content)
+
+    async def extract_texts(self, html_contents: List[str]) -> List[PageText]:
+        """Extracts many documents, sending the large ones to the workers in chunks."""
+        results: List[Optional[PageText]] = [None] * len(html_contents)
+        offloaded = []
+        for i, html_content in enumerate(html_contents):
+            if self._is_inline(html_content):
+                self.inline_documents += 1
+                results[i] = extract_page_text(html_content)
+            else:
+                offloaded.append(i)
+        if offloaded:
+            self.offloaded_documents += len(offloaded)
+            chunks = [offloaded[i:i + self.chunk_size] for i in range(0, len(offloaded), self.chunk_size)]
+            chunk_results = await asyncio.gather(*(
+                self._submit(extract_page_texts, [html_contents[i] for i in chunk]) for chunk in chunks
+            ))
+            for chunk, texts in zip(chunks, chunk_results):
+                for i, page_text in zip(chunk, texts):
+                    results[i] = page_text
+        return results
+
+    async def to_storage_format(self, html_content: str) -> str:
+        if self._is_inline(html_content):
+            self.inline_documents += 1
+            return html_to_storage_format(html_content)
+        self.offloaded_documents += 1
+        return await self._submit(html_to_storage_format, html_content)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "inlineDocuments": self.inline_documents,
+            "offloadedDocuments": self.offloaded_documents,
+            "tasks": self.tasks,
+            "avgTaskMs": round(self.total_task_ms / self.tasks, 1) if self.tasks else 0.0,
+        }
+
+
+# Global instance shared by every ConfluenceService in the process
+html_pool = HtmlProcessPool(
+    workers=settings.html_pool_workers,
+    chunk_size=settings.html_pool_chunk_size,
+    inline_max_bytes=settings.html_pool_inline_max_bytes
+)
@@ -0,0 +1,180 @@
+# server/app/services/outbound_scheduler.py
+import time
+import asyncio
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from app.config import settings
+
+
+class Priority(IntEnum):
+    """Outbound call classes; lower values are served first."""
+    INTERACTIVE = 0
+    CMS_WRITE = 1
+    BACKGROUND = 2
+
+
+# Priority of the outbound calls made by the current task. Web requests run as
+# INTERACTIVE; batch jobs such as one_time_import.py switch to BACKGROUND.
+outbound_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar("outbound_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def priority_scope(priority: Priority) -> Iterator[None]:
+    """Runs the enclosed block with the given outbound call priority."""
+    token = outbound_priority.set(priority)
+    try:
+        yield
+    finally:
+        outbound_priority.reset(token)
+
+
+class OutboundScheduler:
+    """
+    Token-bucket governor for every call made to the Confluence tenant.
+
+    Calls take one token each. The bucket holds up to `burst` tokens and
+    refills at `rate` tokens per second. When tokens run out, callers queue
+    per priority and are released strictly in priority order, so a bulk sync
+    can never delay user-facing reads. Background calls additionally leave
+    `background_reserve` tokens in the bucket for interactive bursts.
+
+    A 429 from Confluence pauses all grants for its Retry-After period, so the
+    whole process backs off together instead of every caller retrying at once.
+    """
+
+    def __init__(self, rate: float, burst: int, background_reserve: int):
+        self.rate = rate
+        self.burst = burst
+        self.background_reserve = min(background_reserve, max(burst - 1, 0))
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._queues: Dict[Priority, Deque[asyncio.Future]] = {p: deque() for p in Priority}
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.throttled = 0
+        self._counters: Dict[Priority, Dict[str, float]] = {
+            p: {"granted": 0, "queued": 0, "totalWaitMs": 0.0, "maxWaitMs": 0.0} for p in Priority
+        }
+
+    # --- Token Bucket ---
+
+    def _refill(self):
+        now = time.monotonic()
+        # Nothing accrues while paused after a 429.
+        elapsed = now - max(self._last_refill, self._paused_until)
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def _tokens_needed(self, priority: Priority) -> float:
+        return 1.0 + (self.background_reserve if priority == Priority.BACKGROUND else 0)
+
+    def _has_waiters_ahead(self, priority: Priority) -> bool:
+        return any(self._queues[p] for p in Priority if p <= priority)
+
+    # --- Public API ---
+
+    async def acquire(self, priority: Optional[Priority] = None):
+        """Waits until the caller may send one request to Confluence."""
+        priority = outbound_priority.get() if priority is None else priority
+        counters = self._counters[priority]
+        self._refill()
+        if (
+            time.monotonic() >= self._paused_until
+            and not self._has_waiters_ahead(priority)
+            and self._tokens >= self._tokens_needed(priority)
+        ):
+            self._tokens -= 1
+            counters["granted"] += 1
+            return
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(waiter)
+        counters["queued"] += 1
+        self._ensure_dispatcher()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The token was granted just as the caller gave up; put it back.
+                self._tokens = min(float(self.burst), self._tokens + 1)
+            raise
+        waited_ms = (time.monotonic() - started) * 1000
+        counters["granted"] += 1
+        counters["totalWaitMs"] += waited_ms
+        counters["maxWaitMs"] = max(counters["maxWaitMs"], waited_ms)
+
+    def pause(self, seconds: float):
+        """Stops granting tokens for `seconds`, e.g. after a 429 with Retry-After."""
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        print(f"WARNING: Confluence rate limit hit; pausing outbound calls for {seconds:.1f}s.")
+
+    # --- Dispatcher ---
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def _next_waiter(self) -> Optional[Priority]:
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue and queue[0].done():
+                queue.popleft()  # cancelled while waiting
+            if queue:
+                return priority
+        return None
+
+    async def _dispatch(self):
+        while True:
+            priority = self._next_waiter()
+            if priority is None:
+                return
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill()
+            needed = self._tokens_needed(priority)
+            if self._tokens < needed:
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+                continue
+            self._tokens -= 1
+            self._queues[priority].popleft().set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        by_priority = {}
+        for priority, counters in self._counters.items():
+            waited = counters["queued"]
+            by_priority[priority.name.lower()] = {
+                "queueDepth": sum(1 for f in self._queues[priority] if not f.done()),
+                "granted": int(counters["granted"]),
+                "queued": int(waited),
+                "avgWaitMs": round(counters["totalWaitMs"] / waited, 1) if waited else 0.0,
+                "maxWaitMs": round(counters["maxWaitMs"], 1),
+            }
+        return {
+            "ratePerSecond": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "pausedForSeconds": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "throttled": self.throttled,
+            "byPriority": by_priority,
+        }
+
+
+# Global instance shared by every ConfluenceRepository in the process
+confluence_scheduler = OutboundScheduler(
+    rate=settings.confluence_rate_limit_per_second,
+    burst=settings.confluence_rate_limit_burst,
+    background_reserve=settings.confluence_background_reserve_tokens
+)
@@ -0,0 +1,49 @@
+# server/app/services/page_path_sql.py
+"""
+SQL maintaining the materialized ancestor path on Page (`ancestorIds`, root
+first, and `depth`). Kept free of the Prisma client so the statements can be
+exercised against a plain Postgres connection.
+"""
+
+# Recomputes the path of the page $1 from its parent's and shifts the paths of
+# its whole subtree to match. A page whose parent is not in the table is a root.
+# The CASE matters: `NULL::int[] || NULL::int` is `{NULL}`, not NULL.
+# Descendants keep whatever follows the page's id in their path, so the shift
+# does not depend on the page's old path (which may be NULL: the column is
+# nullable, as Prisma generates it).
+REFRESH_ANCESTOR_PATH_SQL = """
+WITH moved AS (
+    SELECT p.id, p."ancestorIds" AS old_path,
+           CASE WHEN parent.id IS NULL THEN ARRAY[]::int[]
+                ELSE parent."ancestorIds" || parent.id END AS new_path
+    FROM "Page" p
+    LEFT JOIN "Page" parent ON parent."confluenceId" = p."parentConfluenceId"
+    WHERE p."confluenceId" = $1
+)
+UPDATE "Page" d SET
+    "ancestorIds" = CASE WHEN d.id = m.id THEN m.new_path
+                         ELSE m.new_path || m.id || d."ancestorIds"[array_position(d."ancestorIds", m.id) + 1:] END,
+    depth = CASE WHEN d.id = m.id THEN cardinality(m.new_path)
+                 ELSE cardinality(m.new_path) + 1 + cardinality(d."ancestorIds") - array_position(d."ancestorIds", m.id) END
+FROM moved m
+WHERE m.new_path IS DISTINCT FROM m.old_path
+  AND (d.id = m.id OR d."ancestorIds" @> ARRAY[m.id]);
+"""
+
+# Recomputes every materialized ancestor path from parentConfluenceId, touching
+# only rows whose stored path is wrong. Pages whose parent is missing are roots.
+REBUILD_ANCESTOR_PATHS_SQL = """
+WITH RECURSIVE paths AS (
+    SELECT r.id, r."confluenceId", ARRAY[]::int[] AS path
+    FROM "Page" r
+    WHERE r."parentConfluenceId" IS NULL
+       OR NOT EXISTS (SELECT 1 FROM "Page" x WHERE x."confluenceId" = r."parentConfluenceId")
+    UNION ALL
+    SELECT c.id, c."confluenceId", p.path || p.id
+    FROM "Page" c
+    JOIN paths p ON c."parentConfluenceId" = p."confluenceId"
+)
+UPDATE "Page" pg SET "ancestorIds" = paths.path, depth = cardinality(paths.path)
+FROM paths
+WHERE pg.id = paths.id AND pg."ancestorIds" IS DISTINCT FROM paths.path;
+"""
@@ -1,15 +1,38 @@
 # server/app/services/page_repository.py
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup 
 
 from app.db import db
+from app.services.page_tree import page_tree
+from app.services.page_path_sql import REFRESH_ANCESTOR_PATH_SQL, REBUILD_ANCESTOR_PATHS_SQL
 from app.schemas.content_schemas import Tag, Article, Subsection, Ancestor, PageTreeNode, PageTreeNodeWithPermission
 from app.schemas.cms_schemas import ArticleSubmissionStatus
 from prisma.enums import PageType
 from prisma.models import Page as PageModel, User
 from prisma.types import PageInclude
 
+# Recomputes childCount/publicChildCount for every page, touching only rows
+# that drifted from what the triggers should have kept.
+RECONCILE_CHILD_COUNTS_SQL = """
+WITH counts AS (
+    SELECT c."parentConfluenceId" AS "parentId",
+           COUNT(*)::int AS total,
+           COUNT(*) FILTER (WHERE s.id IS NULL OR s.status = 'PUBLISHED')::int AS public
+    FROM "Page" c
+    LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = c."confluenceId"
+    WHERE c."parentConfluenceId" IS NOT NULL
+    GROUP BY c."parentConfluenceId"
+),
+expected AS (
+    SELECT p.id, COALESCE(counts.total, 0) AS total, COALESCE(counts.public, 0) AS public
+    FROM "Page" p
+    LEFT JOIN counts ON counts."parentId" = p."confluenceId"
+)
+UPDATE "Page" pg SET "childCount" = e.total, "publicChildCount" = e.public
+FROM expected e
+WHERE pg.id = e.id AND (pg."childCount", pg."publicChildCount") IS DISTINCT FROM (e.total, e.public);
+"""
+
 class PageRepository:
     """
     Handles all database operations related to the Page and Tag models.
@@ -43,12 +66,6 @@ class PageRepository:
         text = re.sub(r'[^\w\s-]', '', text)
         return text
 
-    def _get_plain_text(self, html: str) -> str:
-        """Helper to extract plain text from HTML."""
-        if not html: return ""
-        soup = BeautifulSoup(html, 'html.parser')
-        return soup.get_text(" ", strip=True)
-
     # --- THIS IS THE MISSING FUNCTION ---
     async def get_all_managed_and_descendant_ids(self, user: User) -> set[int]:
         """
@@ -78,21 +95,10 @@ class PageRepository:
         if not root_managed_page_ids:
             return set()
 
-        # Use a recursive raw SQL query (Common Table Expression) to find all descendants.
-        # This is far more efficient than looping in Python.
-        query = f"""
-        WITH RECURSIVE descendants AS (
-            SELECT id, "confluenceId" FROM "Page" WHERE id IN ({','.join(map(str, root_managed_page_ids))})
-            UNION ALL
-            SELECT p.id, p."confluenceId" FROM "Page" p
-            INNER JOIN descendants d ON p."parentConfluenceId" = d."confluenceId"
-        )
-        SELECT id FROM descendants;
-        """
-        
-        results = await self.db.query_raw(query)
-        
-        return {item['id'] for item in results}
+        # Walk the managed subtrees in the in-memory page tree
+        tree = await page_tree.get()
+        roots = [i for i in map(tree.index_of_db_id, root_managed_page_ids) if i is not None]
+        return {tree.db_ids[i] for i in tree.subtree(roots)}
     # --- END OF THE MISSING FUNCTION ---
 
     async def _format_page_as_article(self, page: PageModel, group_slug: str, subsection_slug: str) -> Article:
@@ -110,21 +116,12 @@ class PageRepository:
             subsection=subsection_slug,
             updatedAt=page.updatedAt.isoformat(),
             views=page.views,
-            readMinutes=1, # Read minutes is calculated dynamically from live content
+            readMinutes=page.readMinutes, # Stored when the body changes
             author=page.authorName
         )
 
     async def _format_page_as_subsection(self, page: PageModel, group_slug: str, html_content: str = "") -> Subsection:
         """Formats a Prisma Page model into a Subsection schema."""
-        article_count = await self.db.page.count(
-            where={
-                'AND': [
-                    {'parentConfluenceId': page.confluenceId},
-                    self._public_facing_filter
-                ]
-            }
-        )
-        
         return Subsection(
             type='subsection',
             id=page.confluenceId,
@@ -134,7 +131,7 @@ class PageRepository:
             html=html_content, # HTML is only added when fetching a single page
             group=group_slug,
             tags=[Tag.model_validate(t.model_dump()) for t in page.tags],
-            articleCount=article_count,
+            articleCount=page.publicChildCount, # Maintained by DB triggers
             updatedAt=page.updatedAt.isoformat()
         )
         
@@ -208,11 +205,12 @@ class PageRepository:
             ]
         )
         
-        total_items = await self.db.page.count(where=where_clause)
-        
-        formatted_items = []
+        # The parent's public child count is exactly the size of the filtered listing
         parent_page = await self.db.page.find_unique(where={'confluenceId': parent_confluence_id})
         parent_slug = parent_page.slug if parent_page else "unknown"
+        total_items = parent_page.publicChildCount if parent_page else 0
+        
+        formatted_items = []
         
         for item in child_pages:
             if item.pageType == PageType.SUBSECTION:
@@ -238,21 +236,65 @@ class PageRepository:
         )
 
     async def get_ancestors_from_db(self, page: PageModel) -> List[Ancestor]:
-        """Recursively fetches all ancestors for a given page from the DB."""
-        ancestors = []
-        current_page = page
-        while current_page and current_page.parentConfluenceId:
-            parent = await self.db.page.find_unique(
-                where={'confluenceId': current_page.parentConfluenceId}
-            )
-            
-            if parent:
-                ancestors.append(Ancestor(id=parent.confluenceId, title=parent.title, slug=parent.slug))
-                current_page = parent
-            else:
-                break
-        ancestors.reverse()
-        return ancestors
+        """
+        Returns all ancestors (root first) of a page from the in-memory page
+        tree, or from its materialized path when the tree has not seen it yet.
+        """
+        tree = await page_tree.get()
+        i = tree.index_of(page.confluenceId)
+        if i is not None:
+            return [
+                Ancestor(id=tree.confluence_ids[a], title=tree.titles[a], slug=tree.slugs[a])
+                for a in tree.ancestors(i)
+            ]
+        if not page.ancestorIds:
+            return []
+        parents = await self.db.page.find_many(where={'id': {'in': page.ancestorIds}})
+        by_id = {parent.id: parent for parent in parents}
+        return [
+            Ancestor(id=by_id[db_id].confluenceId, title=by_id[db_id].title, slug=by_id[db_id].slug)
+            for db_id in page.ancestorIds if db_id in by_id
+        ]
+
+    async def get_ancestor_chains(self, confluence_ids: List[str]) -> Dict[str, List[Ancestor]]:
+        """
+        Returns the ancestors (root first) of several pages, keyed by page
+        Confluence ID, from the in-memory page tree. Pages it has not seen yet
+        are looked up in one query over their materialized paths.
+        """
+        tree = await page_tree.get()
+        chains: Dict[str, List[Ancestor]] = {}
+        missing = []
+        for confluence_id in confluence_ids:
+            i = tree.index_of(confluence_id)
+            if i is None:
+                missing.append(confluence_id)
+                continue
+            chains[confluence_id] = [
+                Ancestor(id=tree.confluence_ids[a], title=tree.titles[a], slug=tree.slugs[a])
+                for a in tree.ancestors(i)
+            ]
+        chains.update(await self._get_ancestor_chains_from_db(missing))
+        return chains
+
+    async def _get_ancestor_chains_from_db(self, confluence_ids: List[str]) -> Dict[str, List[Ancestor]]:
+        if not confluence_ids:
+            return {}
+        placeholders = ', '.join(f'${i}' for i in range(1, len(confluence_ids) + 1))
+        query = f"""
+        SELECT p."confluenceId" AS "pageId", path.position, a."confluenceId", a.title, a.slug
+        FROM "Page" p
+        CROSS JOIN LATERAL unnest(p."ancestorIds") WITH ORDINALITY AS path(id, position)
+        INNER JOIN "Page" a ON a.id = path.id
+        WHERE p."confluenceId" IN ({placeholders})
+        ORDER BY p."confluenceId", path.position;
+        """
+        results = await self.db.query_raw(query, *confluence_ids)
+
+        chains: Dict[str, List[Ancestor]] = {confluence_id: [] for confluence_id in confluence_ids}
+        for row in results:
+            chains[row['pageId']].append(Ancestor(id=row['confluenceId'], title=row['title'], slug=row['slug']))
+        return chains
 
     async def get_recent_articles(self, limit: int = 6) -> List[Article]:
         """Fetches the most recently updated articles."""
@@ -292,19 +334,31 @@ class PageRepository:
         return [Tag.model_validate(t.model_dump()) for t in tags]
 
     async def get_ancestor_db_ids(self, page: PageModel) -> List[int]:
-        """Recursively fetches all ancestor internal DB IDs for a given page."""
-        ancestor_ids = []
-        current_page = page
-        while current_page and current_page.parentConfluenceId:
-            parent = await self.db.page.find_unique(
-                where={'confluenceId': current_page.parentConfluenceId}
-            )
-            if parent:
-                ancestor_ids.append(parent.id)
-                current_page = parent
-            else:
-                break
-        return ancestor_ids
+        """Returns the internal DB IDs of a page's ancestors, nearest parent first."""
+        tree = await page_tree.get()
+        i = tree.index_of(page.confluenceId)
+        if i is None:
+            return list(reversed(page.ancestorIds or []))
+        return [tree.db_ids[a] for a in reversed(tree.ancestors(i))]
+
+    async def refresh_ancestor_path(self, confluence_id: str) -> int:
+        """
+        Recomputes the materialized path of a page from its parent's, and
+        rewrites the paths of all its descendants to match. Call after a page
+        is created or reparented. Returns the number of rows changed.
+        """
+        return await self.db.execute_raw(
+            REFRESH_ANCESTOR_PATH_SQL,
+            confluence_id
+        )
+
+    async def reconcile_child_counts(self) -> int:
+        """Repairs childCount/publicChildCount wherever they drifted. Returns rows fixed."""
+        return await self.db.execute_raw(RECONCILE_CHILD_COUNTS_SQL)
+
+    async def rebuild_ancestor_paths(self) -> int:
+        """Repairs every materialized path that drifted from the parent links. Returns rows fixed."""
+        return await self.db.execute_raw(REBUILD_ANCESTOR_PATHS_SQL)
 
     async def create_page(
         self,
@@ -330,6 +384,10 @@ class PageRepository:
 
             tag_connect_ops = [{'id': tag.id} for tag in existing_tags]
         
+        # A new page has no descendants, so its path is simply its parent's plus the parent
+        parent = await self.db.page.find_unique(where={'confluenceId': parent_confluence_id}) if parent_confluence_id else None
+        ancestor_ids = (parent.ancestorIds or []) + [parent.id] if parent else []
+
         return await self.db.page.create(data={
             'confluenceId': confluence_id,
             'title': title,
@@ -339,6 +397,8 @@ class PageRepository:
             'parentConfluenceId': parent_confluence_id,
             'authorName': author_name,
             'updatedAt': updated_at_str,
+            'ancestorIds': ancestor_ids,
+            'depth': len(ancestor_ids),
             'tags': {'connect': tag_connect_ops}
         })
 
@@ -379,10 +439,14 @@ class PageRepository:
             # Use 'set' to replace all existing tags with the new list.
             update_data['tags'] = {'set': tag_connect_ops}
 
-        return await self.db.page.update(
+        page = await self.db.page.update(
             where={'confluenceId': confluence_id},
             data=update_data
         )
+        # A no-op unless the parent changed; then the page and its subtree are re-pathed
+        if await self.refresh_ancestor_path(confluence_id):
+            page = await self.db.page.find_unique(where={'confluenceId': confluence_id})
+        return page
 
     async def sync_page_from_confluence_data(
         self, 
@@ -419,32 +483,42 @@ class PageRepository:
         )
     
     async def get_tree_nodes_by_parent_id(self, parent_id: Optional[str]) -> List[PageTreeNode]:
-        nodes_to_return = []
-        child_pages = await self.db.page.find_many(
-            where={'parentConfluenceId': parent_id},
-            order={'title': 'asc'}
-        )
-        for page in child_pages:
-            child_count = await self.db.page.count(
-                where={'parentConfluenceId': page.confluenceId}
+        tree = await page_tree.get()
+        parent = tree.index_of(parent_id) if parent_id else None
+        if parent_id and parent is None:
+            return []
+        return [
+            PageTreeNode(
+                id=tree.confluence_ids[i],
+                title=tree.titles[i],
+                hasChildren=tree.has_children(i),
+                isAllowed=False # Default value, will be overridden by service
             )
-            nodes_to_return.append(
-                PageTreeNode(
-                    id=page.confluenceId,
-                    title=page.title,
-                    hasChildren=child_count > 0,
-                    isAllowed=False # Default value, will be overridden by service
-                )
+            for i in tree.children(parent)
+        ]
+
+    async def get_tree_nodes_with_permissions(self, parent_id: Optional[str], allowed_db_ids: Optional[set[int]]) -> List[PageTreeNodeWithPermission]:
+        """Children of a node from the page tree; every node is allowed when `allowed_db_ids` is None."""
+        tree = await page_tree.get()
+        parent = tree.index_of(parent_id) if parent_id else None
+        if parent_id and parent is None:
+            return []
+        return [
+            PageTreeNodeWithPermission(
+                id=tree.confluence_ids[i],
+                title=tree.titles[i],
+                hasChildren=tree.has_children(i),
+                isAllowed=allowed_db_ids is None or tree.db_ids[i] in allowed_db_ids
             )
-        return nodes_to_return
+            for i in tree.children(parent)
+        ]
     
-    async def get_child_pages_for_index(self, parent_id: Optional[str]) -> List[PageModel]:
-        return await self.db.page.find_many(
-            where={'parentConfluenceId': parent_id},
-            order={'title': 'asc'}
-        )
 
     async def has_children(self, page_id: str) -> bool:
+        tree = await page_tree.get()
+        i = tree.index_of(page_id)
+        if i is not None:
+            return tree.has_children(i)
         count = await self.db.page.count(
             where={'parentConfluenceId': page_id}
         )
@@ -456,18 +530,74 @@ class PageRepository:
             return await self.db.page.delete(where={'confluenceId': confluence_id})
         return None
     
-    async def search_pages_for_index(self, search_term: str) -> List[PageModel]:
-        return await self.db.page.find_many(
-            where={
-                'title': {
-                    'contains': search_term,
-                    'mode': 'insensitive'
-                }
-            },
-            include=self._page_include,
-            order={'title': 'asc'}
+    async def get_content_index_rows(
+        self,
+        parent_id: Optional[str] = None,
+        title_contains: Optional[str] = None,
+        manager_user_id: Optional[int] = None,
+        manage_all: bool = False,
+        missing_submitter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns content index rows in one query, sorted by title: either the
+        children of `parent_id` (the root pages when None), or every page whose
+        title contains `title_contains` (case-insensitive). Each row carries the author (the
+        submitter, else the page author, else "System"), submission status,
+        hasChildren and canManage, which is true for every row when
+        `manage_all` is set, or when a group the given user administers manages
+        the page or one of its ancestors. When `missing_submitter` is given, it
+        is the author shown for a submission whose user no longer exists,
+        instead of the page author.
+        """
+        params: List[Any] = []
+        if title_contains is not None:
+            escaped = title_contains.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+            where = 'p.title ILIKE $1'
+        elif parent_id is None:
+            where = 'p."parentConfluenceId" IS NULL'
+        else:
+            params.append(parent_id)
+            where = 'p."parentConfluenceId" = $1'
+
+        if manage_all:
+            can_manage = 'TRUE'
+        elif manager_user_id is not None:
+            params.append(manager_user_id)
+            can_manage = f"""EXISTS (
+                SELECT 1 FROM "GroupMember" gm
+                JOIN "Group" g ON g.id = gm."groupId"
+                WHERE gm."userId" = ${len(params)} AND gm.role = 'ADMIN'
+                  AND g."managedPageId" = ANY(p."ancestorIds" || p.id)
+            )"""
+        else:
+            can_manage = 'FALSE'
+
+        page_author = """COALESCE(NULLIF(p."authorName", ''), 'System')"""
+        if missing_submitter is None:
+            author = f'COALESCE(u.name, {page_author})'
+        else:
+            params.append(missing_submitter)
+            author = f'CASE WHEN s.id IS NULL THEN {page_author} ELSE COALESCE(u.name, ${len(params)}) END'
+
+        return await self.db.query_raw(
+            f"""
+            SELECT
+                p."confluenceId", p.title, p."updatedAt",
+                {author} AS author,
+                COALESCE(s.status, 'PUBLISHED') AS status,
+                p."childCount" > 0 AS "hasChildren",
+                {can_manage} AS "canManage"
+            FROM "Page" p
+            LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = p."confluenceId"
+            LEFT JOIN "User" u ON u.id = s."authorId"
+            WHERE {where}
+            ORDER BY p.title
+            """,
+            *params
         )
-    
+
+
     async def ensure_parent_is_subsection(self, parent_confluence_id: str):
         """
         Finds the parent page and updates its type to SUBSECTION if it's currently an ARTICLE.
@@ -495,102 +625,25 @@ class PageRepository:
         if not truly_allowed_db_ids:
             return []
 
-        # 2. This powerful query finds the set of all VISIBLE nodes:
-        #    - All pages the user can edit.
-        #    - All ancestors of those pages, so the user can see the path.
-        query = f"""
-        WITH RECURSIVE allowed_and_ancestors AS (
-            SELECT id, "confluenceId", "parentConfluenceId" FROM "Page" WHERE id IN ({','.join(map(str, truly_allowed_db_ids))})
-            UNION
-            SELECT p.id, p."confluenceId", p."parentConfluenceId"
-            FROM "Page" p
-            INNER JOIN allowed_and_ancestors aa ON p."confluenceId" = aa."parentConfluenceId"
-        )
-        SELECT DISTINCT "confluenceId" FROM allowed_and_ancestors;
-        """
-        results = await self.db.query_raw(query)
-        visible_confluence_ids = {item['confluenceId'] for item in results}
+        # 2. The VISIBLE nodes are the pages the user can edit plus all their
+        #    ancestors, so the user can see the path. Both come from the page tree.
+        tree = await page_tree.get()
+        allowed = [i for i in map(tree.index_of_db_id, truly_allowed_db_ids) if i is not None]
+        visible = set(allowed)
+        for i in allowed:
+            visible.update(tree.ancestors(i))
 
-        if not visible_confluence_ids:
+        parent = tree.index_of(parent_id) if parent_id else None
+        if parent_id and parent is None:
             return []
-        
-        # 3. Fetch the specific child pages for the current level of the tree that are in our visible set.
-        child_pages = await self.db.page.find_many(
-            where={
-                'parentConfluenceId': parent_id,
-                'confluenceId': {'in': list(visible_confluence_ids)}
-            },
-            order={'title': 'asc'}
-        )
-        
-        # 4. Efficiently check which of these children have children themselves
-        child_confluence_ids = [p.confluenceId for p in child_pages]
-        parents_with_children_query = await self.db.page.find_many(
-            where={'parentConfluenceId': {'in': child_confluence_ids}},
-            distinct=['parentConfluenceId']
-        )
-        parent_ids_with_children_set = {p.parentConfluenceId for p in parents_with_children_query}
 
-        # 5. Build the final response, now with correct permissions.
-        nodes_to_return = []
-        for page in child_pages:
-            # The 'isAllowed' flag is now correctly determined by checking against our ground-truth set.
-            is_node_allowed = page.id in truly_allowed_db_ids
-            has_children = page.confluenceId in parent_ids_with_children_set
-            
-            nodes_to_return.append(
-                PageTreeNodeWithPermission(
-                    id=page.confluenceId,
-                    title=page.title,
-                    hasChildren=has_children,
-                    isAllowed=is_node_allowed 
-                )
+        # 3. Build the current level, with 'isAllowed' checked against the ground-truth set.
+        return [
+            PageTreeNodeWithPermission(
+                id=tree.confluence_ids[i],
+                title=tree.titles[i],
+                hasChildren=tree.has_children(i),
+                isAllowed=tree.db_ids[i] in truly_allowed_db_ids
             )
-        return nodes_to_return
-    
-    async def get_admin_managed_page_ids(self, user_id: int) -> set[str]:
-        """
-        Returns a set of Confluence IDs for pages where the user is a Group Admin.
-        Includes the root managed pages and all their descendants.
-        """
-        # 1. Fetch groups where user is ADMIN and they have a managed page
-        user_with_admin_groups = await self.db.user.find_unique(
-            where={'id': user_id},
-            include={
-                'groupMemberships': {
-                    'where': {'role': 'ADMIN'},
-                    'include': {
-                        'group': {
-                            'include': {'managedPage': True}
-                        }
-                    }
-                }
-            }
-        )
-
-        if not user_with_admin_groups or not user_with_admin_groups.groupMemberships:
-            return set()
-
-        root_managed_db_ids = [
-            m.group.managedPage.id 
-            for m in user_with_admin_groups.groupMemberships 
-            if m.group.managedPage
+            for i in tree.children(parent) if i in visible
         ]
-
-        if not root_managed_db_ids:
-            return set()
-
-        # 2. Recursive query to get all descendant Page IDs (internal DB IDs)
-        # FIX: Corrected variable name here (root_managed_db_ids)
-        query = f"""
-        WITH RECURSIVE descendants AS (
-            SELECT id, "confluenceId" FROM "Page" WHERE id IN ({','.join(map(str, root_managed_db_ids))})
-            UNION ALL
-            SELECT p.id, p."confluenceId" FROM "Page" p
-            INNER JOIN descendants d ON p."parentConfluenceId" = d."confluenceId"
-        )
-        SELECT "confluenceId" FROM descendants;
-        """
-        
-        results = await self.db.query_raw(query)
-        return {item['confluenceId'] for item in results}
\ No newline at end of file
@@ -0,0 +1,178 @@
+# server/app/services/page_tree.py
+import time
+import asyncio
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.db import db
+from app.config import settings
+from app.services.content_version_repository import ContentVersionRepository
+
+
+class PageTreeSnapshot:
+    """
+    Immutable view of the page hierarchy, built from a single scan of the Page
+    table. Nodes are addressed by position; parent, depth and children are kept
+    in compact int arrays (children in CSR form: the children of node i are
+    `child_index[child_offsets[i]:child_offsets[i + 1]]`, sorted by title), so
+    lookups are O(1) and walks touch no Python objects per node.
+    """
+
+    def __init__(self, pages: Iterable[Any], version: Optional[int]):
+        pages = list(pages)
+        self.version = version
+        self.built_at = time.monotonic()
+
+        self.db_ids = array('i', (p.id for p in pages))
+        self.confluence_ids: List[str] = [p.confluenceId for p in pages]
+        self.titles: List[str] = [p.title for p in pages]
+        self.slugs: List[str] = [p.slug for p in pages]
+        self.page_types: List[str] = [str(getattr(p.pageType, 'value', p.pageType)) for p in pages]
+
+        self._by_confluence_id: Dict[str, int] = {cid: i for i, cid in enumerate(self.confluence_ids)}
+        self._by_db_id: Dict[int, int] = {db_id: i for i, db_id in enumerate(self.db_ids)}
+
+        # A parent that is not in the table makes the page a root, as in the DB paths
+        self.parent = array('i', (self._by_confluence_id.get(p.parentConfluenceId, -1) for p in pages))
+
+        child_lists: List[List[int]] = [[] for _ in pages]
+        roots: List[int] = []
+        for i, parent in enumerate(self.parent):
+            (child_lists[parent] if parent >= 0 else roots).append(i)
+        by_title = lambda i: self.titles[i].lower()
+        self.roots = array('i', sorted(roots, key=by_title))
+        self.child_offsets = array('i', [0])
+        self.child_index = array('i')
+        for children in child_lists:
+            self.child_index.extend(sorted(children, key=by_title))
+            self.child_offsets.append(len(self.child_index))
+
+        self.depth = array('i', [0]) * len(pages)
+        stack = list(self.roots)
+        while stack:
+            i = stack.pop()
+            for child in self.children(i):
+                self.depth[child] = self.depth[i] + 1
+                stack.append(child)
+
+    def __len__(self) -> int:
+        return len(self.db_ids)
+
+    # --- Lookups by position ---
+
+    def index_of(self, confluence_id: Optional[str]) -> Optional[int]:
+        return self._by_confluence_id.get(confluence_id)
+
+    def index_of_db_id(self, db_id: int) -> Optional[int]:
+        return self._by_db_id.get(db_id)
+
+    def children(self, i: Optional[int]) -> array:
+        """Children of node i sorted by title; the root pages when i is None."""
+        if i is None:
+            return self.roots
+        return self.child_index[self.child_offsets[i]:self.child_offsets[i + 1]]
+
+    def has_children(self, i: int) -> bool:
+        return self.child_offsets[i + 1] > self.child_offsets[i]
+
+    def ancestors(self, i: int) -> List[int]:
+        """Ancestors of node i, root first."""
+        chain = []
+        parent = self.parent[i]
+        while parent >= 0:
+            chain.append(parent)
+            parent = self.parent[parent]
+        chain.reverse()
+        return chain
+
+    def subtree(self, roots: Iterable[int]) -> set:
+        """The given nodes and all their descendants."""
+        seen = set()
+        stack = list(roots)
+        while stack:
+            i = stack.pop()
+            if i in seen:
+                continue
+            seen.add(i)
+            stack.extend(self.children(i))
+        return seen
+
+
+class PageTreeCache:
+    """
+    Holds the current PageTreeSnapshot for the process.
+
+    The snapshot follows the shared ContentVersion counter and is only ever
+    rebuilt from get(). A local content change bumps the counter and calls
+    invalidate(), so the next get() rebuilds once however many page writes
+    the change made. Changes made by other workers (or the sync script) are
+    picked up when the counter moves, which is checked at most every
+    `version_poll_seconds`. A rebuild replaces the snapshot reference in one
+    assignment, so readers always see a complete tree.
+    """
+
+    def __init__(self, version_poll_seconds: float):
+        self.version_poll_seconds = version_poll_seconds
+        self.snapshot: Optional[PageTreeSnapshot] = None
+        self._version_repo = ContentVersionRepository()
+        self._rebuild_lock = asyncio.Lock()
+        self._version_checked_at = 0.0
+        self._builds_started = 0
+        self._stale = False
+
+        self.rebuilds = 0
+        self.last_build_ms = 0.0
+
+    async def get(self) -> PageTreeSnapshot:
+        snapshot = self.snapshot
+        if snapshot is None or self._stale:
+            return await self.rebuild()
+        if time.monotonic() - self._version_checked_at >= self.version_poll_seconds:
+            self._version_checked_at = time.monotonic()
+            try:
+                version = await self._version_repo.get_version()
+            except Exception as e:
+                print(f"WARNING: Could not read the content version for the page tree: {e}")
+                return snapshot
+            if version != snapshot.version:
+                return await self.rebuild()
+        return snapshot
+
+    def invalidate(self):
+        """Marks the snapshot out of date after a local content change; the next get() rebuilds it."""
+        self._stale = True
+
+    async def rebuild(self) -> PageTreeSnapshot:
+        """Loads the whole Page table and swaps in a new snapshot."""
+        requested_after = self._builds_started
+        async with self._rebuild_lock:
+            if self._builds_started > requested_after and self.snapshot is not None:
+                # A build that began after this request already reflects it
+                return self.snapshot
+            self._builds_started += 1
+            # Cleared before the scan, so a change landing during it marks the new snapshot stale again
+            self._stale = False
+            started = time.perf_counter()
+            # Read the version first: a write racing the scan bumps it again and triggers another rebuild
+            version = await self._version_repo.get_version()
+            pages = await db.page.find_many()
+            snapshot = PageTreeSnapshot(pages, version)
+            self.snapshot = snapshot
+            self._version_checked_at = time.monotonic()
+            self.rebuilds += 1
+            self.last_build_ms = (time.perf_counter() - started) * 1000
+            return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.snapshot
+        return {
+            "nodes": len(snapshot) if snapshot else 0,
+            "contentVersion": snapshot.version if snapshot else None,
+            "snapshotAgeSeconds": round(time.monotonic() - snapshot.built_at, 1) if snapshot else None,
+            "rebuilds": self.rebuilds,
+            "lastBuildMs": round(self.last_build_ms, 1),
+        }
+
+
+# Global instance shared by every PageRepository in the process
+page_tree = PageTreeCache(version_poll_seconds=settings.page_tree_version_poll_seconds)
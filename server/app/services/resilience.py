@@ -0,0 +1,148 @@
+# server/app/services/resilience.py
+import time
+import asyncio
+from typing import Dict, Any
+
+from app.config import settings
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Confluence while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    A classic three-state circuit breaker for outbound calls.
+
+    - closed:    calls flow normally; consecutive failures are counted.
+    - open:      calls fail fast with CircuitOpenError until `reset_timeout` passes.
+    - half_open: a single trial call is let through; its outcome closes or
+                 re-opens the circuit.
+
+    The breaker is only touched from the event loop, so it needs no locking.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+        self.trips = 0
+        self.rejected_calls = 0
+
+    def allow_request(self) -> bool:
+        """Returns True if a call may be attempted right now."""
+        if self.state == "closed":
+            return True
+
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+
+        self.rejected_calls += 1
+        return False
+
+    def retry_after_seconds(self) -> int:
+        """Whole seconds until an open circuit lets a trial call through (at least one)."""
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+                print(f"WARNING: Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failures.")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        """Releases a half-open trial slot when the call was cancelled without an outcome."""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutiveFailures": self.consecutive_failures,
+            "trips": self.trips,
+            "rejectedCalls": self.rejected_calls,
+        }
+
+
+class StreamLimiter:
+    """
+    Caps the number of long-running transfers (attachment streams) that may
+    hold an upstream connection at the same time. Callers wait up to
+    `queue_timeout` seconds for a slot and are turned away after that, so a
+    burst of large downloads cannot starve the shared connection pool.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+        self.active = 0
+        self.waiting = 0
+        self.peak_active = 0
+        self.started = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        """Waits for a free slot. Returns False if none frees up in time."""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.started += 1
+        self.peak_active = max(self.peak_active, self.active)
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "maxConcurrent": self.max_concurrent,
+            "peakActive": self.peak_active,
+            "started": self.started,
+            "rejected": self.rejected,
+        }
+
+
+# Global instance guarding every call to the Confluence tenant
+confluence_breaker = CircuitBreaker(
+    name="confluence",
+    failure_threshold=settings.confluence_breaker_failure_threshold,
+    reset_timeout=settings.confluence_breaker_reset_seconds
+)
+
+# Global instance bounding concurrent attachment transfers from Confluence
+attachment_stream_limiter = StreamLimiter(
+    name="attachment_streams",
+    max_concurrent=settings.attachment_stream_max_concurrent,
+    queue_timeout=settings.attachment_stream_queue_timeout_seconds
+)
@@ -0,0 +1,29 @@
+# server/app/services/root_page_repository.py
+from typing import Dict
+from app.db import db
+
+
+class RootPageRepository:
+    """
+    Handles all database operations for the cached root-page mapping
+    (group slug -> Confluence page ID).
+    """
+
+    def __init__(self):
+        self.db = db
+
+    async def get_mapping(self) -> Dict[str, str]:
+        """Returns the cached slug -> Confluence ID mapping, empty if nothing is cached."""
+        rows = await self.db.rootpage.find_many()
+        return {row.slug: row.confluenceId for row in rows}
+
+    async def save_mapping(self, mapping: Dict[str, str], titles: Dict[str, str]):
+        """Replaces the cached mapping with a freshly discovered one."""
+        async with self.db.tx() as transaction:
+            await transaction.rootpage.delete_many(where={'slug': {'not_in': list(mapping.keys())}})
+            for slug, confluence_id in mapping.items():
+                data = {'slug': slug, 'confluenceId': confluence_id, 'title': titles.get(slug, slug)}
+                await transaction.rootpage.upsert(
+                    where={'slug': slug},
+                    data={'create': data, 'update': data}
+                )
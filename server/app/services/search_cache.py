@@ -0,0 +1,114 @@
+# server/app/services/search_cache.py
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+
+SearchKey = Tuple[str, str, str, str, int, int]
+
+
+class SearchResultCache:
+    """
+    Bounded LRU cache of /search responses with a TTL, keyed by the normalized
+    search parameters.
+
+    Entries belong to one content version, a counter in the database that is
+    bumped whenever published content changes (approve, update, delete, sync).
+    When a newer version is observed every entry is dropped, so a publish is
+    reflected on the next search. Other workers' bumps are picked up when the
+    counter is re-read, at most every `version_poll_seconds`.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, version_poll_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_poll_seconds = version_poll_seconds
+        self._entries: "OrderedDict[SearchKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.content_version: Optional[int] = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query: str, mode: str, sort: str, match: str, page: int, page_size: int) -> SearchKey:
+        """Normalizes case and whitespace; tag lists are order-insensitive."""
+        if mode == "tags":
+            names = sorted({name.strip().lower() for name in query.split(',') if name.strip()})
+            normalized = ','.join(re.sub(r'\s+', ' ', name) for name in names)
+        else:
+            normalized = re.sub(r'\s+', ' ', query.strip().lower())
+            match = ""  # only meaningful for tag searches
+        return (normalized, mode, sort, match, page, page_size)
+
+    def version_check_due(self) -> bool:
+        return time.monotonic() - self._version_checked_at >= self.version_poll_seconds
+
+    def set_content_version(self, version: int):
+        """Records the current content version, dropping every entry if it changed."""
+        with self._lock:
+            self._version_checked_at = time.monotonic()
+            if version == self.content_version:
+                return
+            if self.content_version is not None:
+                self.invalidations += 1
+            self.content_version = version
+            self._entries.clear()
+
+    def get(self, key: SearchKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, result = item
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: SearchKey, result: Dict[str, Any], version: Optional[int]):
+        """Stores a result computed at `version`; results for an outdated version are dropped."""
+        with self._lock:
+            if version is None or version != self.content_version:
+                return
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "contentVersion": self.content_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global instance shared by every ConfluenceService in the process
+search_result_cache = SearchResultCache(
+    max_entries=settings.search_cache_max_entries,
+    ttl_seconds=settings.search_cache_ttl_seconds,
+    version_poll_seconds=settings.search_cache_version_poll_seconds
+)
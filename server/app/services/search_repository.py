@@ -0,0 +1,340 @@
+# server/app/services/search_repository.py
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from app.db import db
+from app.utils.page_text import PageText
+
+
+# Weighted document: title (A) > tag names (B) > description (C) > body (D).
+# Expects the page as `p`, its tags as `t` and the plain-text body as `body_text`.
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce(p.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(string_agg(t.name, ' '), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(p.description, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce(body_text, '')), 'D')
+"""
+
+PUBLIC_FACING_SQL = """(s.id IS NULL OR s.status = 'PUBLISHED')"""
+
+
+class SearchRepository:
+    """
+    Handles all database operations for the local full-text search index
+    (the PageContent table and its GIN-indexed tsvector column).
+    """
+
+    def __init__(self):
+        self.db = db
+        self._trigram_support: Optional[bool] = None
+
+    def _to_tsquery(self, query: str) -> Optional[str]:
+        """
+        Turns free text into a to_tsquery expression that matches every word,
+        the last one as a prefix so results show up while the user is typing.
+        """
+        words = re.findall(r'\w+', query.lower())
+        if not words:
+            return None
+        words[-1] = f"{words[-1]}:*"
+        return ' & '.join(words)
+
+    async def index_page(self, confluence_id: str, page_text: PageText, version: int):
+        """
+        Stores the derived text fields of a page on its Page row and creates or
+        refreshes its search entry, in one statement.
+        """
+        await self.db.execute_raw(
+            f"""
+            WITH derived AS (
+                UPDATE "Page" SET "excerpt" = $4, "wordCount" = $5::int, "readMinutes" = $6::int
+                WHERE "confluenceId" = $1
+            )
+            INSERT INTO "PageContent" ("pageConfluenceId", "plainText", "version", "searchVector", "updatedAt")
+            SELECT p."confluenceId", body_text, $3::int, {SEARCH_VECTOR_SQL}, NOW()
+            FROM "Page" p
+            CROSS JOIN (SELECT $2::text AS body_text) body
+            LEFT JOIN "_PageToTag" pt ON pt."A" = p.id
+            LEFT JOIN "Tag" t ON t.id = pt."B"
+            WHERE p."confluenceId" = $1
+            GROUP BY p.id, body_text
+            ON CONFLICT ("pageConfluenceId") DO UPDATE SET
+                "plainText" = EXCLUDED."plainText",
+                "version" = EXCLUDED."version",
+                "searchVector" = EXCLUDED."searchVector",
+                "updatedAt" = NOW()
+            """,
+            confluence_id, page_text.plain_text, version,
+            page_text.excerpt, page_text.word_count, page_text.read_minutes
+        )
+
+    async def get_headlines(self, confluence_ids: List[str], query: str, options: str) -> Dict[str, str]:
+        """
+        Runs ts_headline over the stored bodies of the given pages (one page of
+        results) with the same tsquery as the search, so stemmed and prefix
+        matches are highlighted. Returns the raw headline per page ID.
+        """
+        ts_query = self._to_tsquery(query)
+        if ts_query is None or not confluence_ids:
+            return {}
+        placeholders = ', '.join(f'${i}' for i in range(3, len(confluence_ids) + 3))
+        rows = await self.db.query_raw(
+            f"""
+            SELECT pc."pageConfluenceId", ts_headline('english', pc."plainText", to_tsquery('english', $1), $2) AS headline
+            FROM "PageContent" pc
+            WHERE pc."pageConfluenceId" IN ({placeholders})
+            """,
+            ts_query, options, *confluence_ids
+        )
+        return {row['pageConfluenceId']: row['headline'] for row in rows}
+
+    async def get_indexed_versions(self) -> Dict[str, int]:
+        """Returns the Confluence version each indexed page was indexed at."""
+        rows = await self.db.pagecontent.find_many()
+        return {row.pageConfluenceId: row.version for row in rows}
+
+    async def get_unindexed_page_ids(self) -> List[str]:
+        """Returns the pages that have no search entry yet, oldest first."""
+        rows = await self.db.query_raw(
+            """
+            SELECT p."confluenceId"
+            FROM "Page" p
+            LEFT JOIN "PageContent" pc ON pc."pageConfluenceId" = p."confluenceId"
+            WHERE pc.id IS NULL
+            ORDER BY p.id
+            """
+        )
+        return [row['confluenceId'] for row in rows]
+
+    async def _has_trigram_support(self) -> bool:
+        """Whether pg_trgm is installed; it is optional, so this is checked once and remembered."""
+        if self._trigram_support is None:
+            rows = await self.db.query_raw(
+                "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS installed"
+            )
+            self._trigram_support = bool(rows and rows[0]['installed'])
+            if not self._trigram_support:
+                print("WARNING: pg_trgm is not installed; title typeahead uses prefix matching only.")
+        return self._trigram_support
+
+    async def suggest_titles(self, term: str, limit: int, public_only: bool = True) -> List[Dict[str, Any]]:
+        """
+        Returns up to `limit` pages whose title matches the term, using the
+        trigram index on Page.title. Titles starting with the term rank first,
+        then titles with a word starting with it, then the closest fuzzy matches.
+        Without pg_trgm only the first two kinds of match are returned.
+        """
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        public_conditions = ['p."parentConfluenceId" IS NOT NULL', PUBLIC_FACING_SQL] if public_only else []
+
+        if not await self._has_trigram_support():
+            conditions = ['(p.title ILIKE $1 OR p.title ILIKE $2)'] + public_conditions
+            return await self.db.query_raw(
+                f"""
+                SELECT p."confluenceId", p.title, p."pageType"
+                FROM "Page" p
+                LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = p."confluenceId"
+                WHERE {' AND '.join(conditions)}
+                ORDER BY
+                    CASE WHEN p.title ILIKE $1 THEN 0 ELSE 1 END,
+                    length(p.title),
+                    p.title
+                LIMIT $3
+                """,
+                f"{escaped}%", f"% {escaped}%", limit
+            )
+
+        conditions = ['(p.title ILIKE $1 OR p.title % $2)'] + public_conditions
+
+        return await self.db.query_raw(
+            f"""
+            SELECT p."confluenceId", p.title, p."pageType"
+            FROM "Page" p
+            LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = p."confluenceId"
+            WHERE {' AND '.join(conditions)}
+            ORDER BY
+                CASE
+                    WHEN p.title ILIKE $3 THEN 0
+                    WHEN p.title ILIKE $4 THEN 1
+                    ELSE 2
+                END,
+                similarity(p.title, $2) DESC,
+                length(p.title),
+                p.title
+            LIMIT $5
+            """,
+            f"%{escaped}%", term, f"{escaped}%", f"% {escaped}%", limit
+        )
+
+    async def search(self, query: str, mode: str, sort: str, limit: int, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Returns one page of public pages matching the query, ranked by weighted
+        relevance or sorted by date or views, together with the exact number of
+        matches counted by the same query.
+        """
+        ts_query = self._to_tsquery(query)
+        if ts_query is None:
+            return [], 0
+
+        conditions = [
+            'pc."searchVector" @@ q.query',
+            'p."parentConfluenceId" IS NOT NULL',  # root pages are groups, not results
+            PUBLIC_FACING_SQL,
+        ]
+        if mode == "title":
+            conditions.append("to_tsvector('english', p.title) @@ q.query")
+
+        from_clause = f"""
+            FROM "PageContent" pc
+            JOIN "Page" p ON p."confluenceId" = pc."pageConfluenceId"
+            CROSS JOIN (SELECT to_tsquery('english', $1) AS query) q
+            LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = p."confluenceId"
+            WHERE {' AND '.join(conditions)}
+        """
+        order_by = {
+            "date": 'p."updatedAt" DESC, p.id',
+            "views": 'p.views DESC, rank DESC, p.id',
+        }.get(sort, 'rank DESC, p."updatedAt" DESC, p.id')
+
+        rows = await self.db.query_raw(
+            f"""
+            SELECT
+                p."confluenceId", p.title, p.slug, p.views, p."authorName",
+                p."parentConfluenceId", p."updatedAt",
+                p."excerpt", p."description", p."readMinutes",
+                ts_rank_cd(pc."searchVector", q.query) AS rank,
+                COUNT(*) OVER ()::int AS total
+            {from_clause}
+            ORDER BY {order_by}
+            LIMIT $2 OFFSET $3
+            """,
+            ts_query, limit, offset
+        )
+        if rows:
+            return rows, rows[0]['total']
+        if offset == 0:
+            return rows, 0
+        # Past the last page the window has no rows to report the total on.
+        count_rows = await self.db.query_raw(f'SELECT COUNT(*)::int AS total {from_clause}', ts_query)
+        return rows, count_rows[0]['total'] if count_rows else 0
+
+    def _tag_match_sql(self, tag_ids: List[int], match_all: bool) -> str:
+        """Public, non-root pages carrying all (or any) of the given tags, as a CTE body."""
+        having = f'HAVING COUNT(DISTINCT pt."B") = {len(tag_ids)}' if match_all else ''
+        return f"""
+            SELECT p.id, p."parentConfluenceId", p."ancestorIds"[1] AS "rootId", COUNT(DISTINCT pt."B") AS "matchedTags"
+            FROM "Page" p
+            JOIN "_PageToTag" pt ON pt."A" = p.id AND pt."B" IN ({','.join(map(str, tag_ids))})
+            LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = p."confluenceId"
+            WHERE p."parentConfluenceId" IS NOT NULL AND {PUBLIC_FACING_SQL}
+            GROUP BY p.id
+            {having}
+        """
+
+    async def search_by_tags(self, tag_ids: List[int], match_all: bool, sort: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Returns one page of public pages carrying all (or any) of the given tags."""
+        order_by = {
+            "date": 'p."updatedAt" DESC, p.id',
+            "views": 'p.views DESC, m."matchedTags" DESC, p.id',
+        }.get(sort, 'm."matchedTags" DESC, p."updatedAt" DESC, p.id')
+        return await self.db.query_raw(
+            f"""
+            WITH matched AS ({self._tag_match_sql(tag_ids, match_all)})
+            SELECT
+                p."confluenceId", p.title, p.slug, p.views, p."authorName",
+                p."parentConfluenceId", p."updatedAt",
+                p."excerpt", p."description", p."readMinutes"
+            FROM matched m
+            JOIN "Page" p ON p.id = m.id
+            ORDER BY {order_by}
+            LIMIT $1 OFFSET $2
+            """,
+            limit, offset
+        )
+
+    async def tag_facets(self, tag_ids: List[int], match_all: bool) -> List[Dict[str, Any]]:
+        """
+        Aggregates the pages matching a tag search in one query: the total, the
+        count per tag carried by the matches (refinement chips) and the count
+        per root page (group), taken from the first entry of each materialized
+        path. Rows are tagged by `kind`: total, tag or group.
+        """
+        return await self.db.query_raw(
+            f"""
+            WITH matched AS ({self._tag_match_sql(tag_ids, match_all)})
+            SELECT 'total' AS kind, NULL AS key, NULL AS name, COUNT(*)::int AS count FROM matched
+            UNION ALL
+            SELECT 'tag', t.slug, t.name, COUNT(*)::int
+            FROM matched m
+            JOIN "_PageToTag" pt ON pt."A" = m.id
+            JOIN "Tag" t ON t.id = pt."B"
+            GROUP BY t.id
+            UNION ALL
+            SELECT 'group', r."confluenceId", NULL, COUNT(*)::int
+            FROM matched m
+            JOIN "Page" r ON r.id = m."rootId" AND r."parentConfluenceId" IS NULL
+            GROUP BY r."confluenceId"
+            """
+        )
+
+    async def get_index_documents(self, confluence_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the searchable fields of pages for the embedded BM25 index, with
+        whether each page is publicly searchable. Without IDs, returns every
+        searchable page.
+        """
+        if confluence_ids is not None and not confluence_ids:
+            return []
+        is_public = f'(p."parentConfluenceId" IS NOT NULL AND {PUBLIC_FACING_SQL})'
+        if confluence_ids is None:
+            where, args = f'WHERE {is_public}', []
+        else:
+            placeholders = ', '.join(f'${i}' for i in range(1, len(confluence_ids) + 1))
+            where, args = f'WHERE p."confluenceId" IN ({placeholders})', confluence_ids
+        return await self.db.query_raw(
+            f"""
+            SELECT
+                p."confluenceId", p.title, p.description,
+                coalesce(pc."plainText", '') AS "plainText",
+                coalesce(string_agg(t.name, ' '), '') AS tags,
+                {is_public} AS "isPublic"
+            FROM "Page" p
+            LEFT JOIN "PageContent" pc ON pc."pageConfluenceId" = p."confluenceId"
+            LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = p."confluenceId"
+            LEFT JOIN "_PageToTag" pt ON pt."A" = p.id
+            LEFT JOIN "Tag" t ON t.id = pt."B"
+            {where}
+            GROUP BY p.id, pc.id, s.id
+            """,
+            *args
+        )
+
+    async def order_page_ids(self, confluence_ids: List[str], sort: str) -> List[str]:
+        """Orders page IDs by date or views, for result sets ranked outside the database."""
+        if not confluence_ids:
+            return []
+        order_by = 'views DESC, id' if sort == "views" else '"updatedAt" DESC, id'
+        placeholders = ', '.join(f'${i}' for i in range(1, len(confluence_ids) + 1))
+        rows = await self.db.query_raw(
+            f'SELECT "confluenceId" FROM "Page" WHERE "confluenceId" IN ({placeholders}) ORDER BY {order_by}',
+            *confluence_ids
+        )
+        return [row['confluenceId'] for row in rows]
+
+    async def get_result_rows(self, confluence_ids: List[str]) -> List[Dict[str, Any]]:
+        """Returns search result rows for the given pages, in the given order."""
+        if not confluence_ids:
+            return []
+        placeholders = ', '.join(f'${i}' for i in range(1, len(confluence_ids) + 1))
+        rows = await self.db.query_raw(
+            f"""
+            SELECT
+                p."confluenceId", p.title, p.slug, p.views, p."authorName",
+                p."parentConfluenceId", p."updatedAt",
+                p."excerpt", p."description", p."readMinutes"
+            FROM "Page" p
+            WHERE p."confluenceId" IN ({placeholders})
+            """,
+            *confluence_ids
+        )
+        by_id = {row['confluenceId']: row for row in rows}
+        return [by_id[page_id] for page_id in confluence_ids if page_id in by_id]
@@ -0,0 +1,48 @@
+# server/app/services/single_flight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls. The first caller for a key starts the
+    upstream call; every caller that arrives while it is in flight awaits the
+    same result (or exception) instead of issuing its own request.
+
+    Keys are tuples whose first element names the operation, which is used to
+    break the counters down per operation. Results are shared between callers,
+    so they must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    async def do(self, key: Tuple[Any, ...], fn: Callable[[], Awaitable[T]]) -> T:
+        counters = self._counters.setdefault(str(key[0]), {"calls": 0, "deduplicated": 0})
+        task = self._in_flight.get(key)
+        if task is not None:
+            counters["deduplicated"] += 1
+        else:
+            counters["calls"] += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield the shared call so one cancelled caller cannot cancel it for the others.
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = sum(c["calls"] for c in self._counters.values())
+        deduplicated = sum(c["deduplicated"] for c in self._counters.values())
+        return {
+            "upstreamCalls": calls,
+            "deduplicated": deduplicated,
+            "inFlight": len(self._in_flight),
+            "byOperation": {op: dict(c) for op, c in self._counters.items()},
+        }
+
+
+# Global instance shared by every ConfluenceRepository in the process
+confluence_single_flight = SingleFlight()
@@ -0,0 +1,40 @@
+# server/app/utils/page_text.py
+from dataclasses import dataclass
+from typing import List
+from bs4 import BeautifulSoup
+
+# lxml is optional; when installed it is several times faster at text extraction.
+try:
+    import lxml  # noqa: F401
+    TEXT_PARSER = 'lxml'
+except ImportError:
+    TEXT_PARSER = 'html.parser'
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 150
+
+
+@dataclass
+class PageText:
+    """Text fields derived from a page body, computed once whenever the body changes."""
+    plain_text: str
+    word_count: int
+    read_minutes: int
+    excerpt: str
+
+
+def extract_page_text(html_content: str) -> PageText:
+    """Strips the HTML of a page body and derives its word count, reading time and excerpt."""
+    plain_text = BeautifulSoup(html_content, TEXT_PARSER).get_text(" ", strip=True) if html_content else ""
+    word_count = len(plain_text.split())
+    return PageText(
+        plain_text=plain_text,
+        word_count=word_count,
+        read_minutes=max(1, round(word_count / WORDS_PER_MINUTE)),
+        excerpt=(plain_text[:EXCERPT_LENGTH] + '...') if len(plain_text) > EXCERPT_LENGTH else plain_text
+    )
+
+
+def extract_page_texts(html_contents: List[str]) -> List[PageText]:
+    """Batch form of extract_page_text, so a worker process can take a whole chunk per task."""
+    return [extract_page_text(html_content) for html_content in html_contents]
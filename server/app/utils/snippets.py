@@ -0,0 +1,44 @@
+# server/app/utils/snippets.py
+import html
+from dataclasses import dataclass
+from typing import List
+
+# Control characters never appear in extracted page text, so they can mark
+# ts_headline's output unambiguously before it is HTML-escaped.
+HEADLINE_START = "\x02"
+HEADLINE_STOP = "\x03"
+HEADLINE_DELIMITER = "\x1f"
+
+
+@dataclass
+class Fragment:
+    text: str         # plain text of the fragment
+    highlighted: str  # HTML-escaped text with matched words wrapped in markers
+
+
+def headline_options(max_fragments: int, max_words: int) -> str:
+    """ts_headline options producing up to `max_fragments` fragments of at most `max_words` words."""
+    return (
+        f"StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, FragmentDelimiter={HEADLINE_DELIMITER}, "
+        f"MaxFragments={max_fragments}, MaxWords={max_words}, MinWords={max(1, max_words // 2)}"
+    )
+
+
+def parse_headline(headline: str, pre: str = "<mark>", post: str = "</mark>") -> List[Fragment]:
+    """
+    Splits a ts_headline result built with `headline_options` into fragments.
+    Returns nothing when no word was highlighted (the match was in the title
+    or tags only, and Postgres fell back to the start of the body).
+    """
+    if not headline or HEADLINE_START not in headline:
+        return []
+    fragments = []
+    for part in headline.split(HEADLINE_DELIMITER):
+        part = part.strip()
+        if not part:
+            continue
+        fragments.append(Fragment(
+            text=part.replace(HEADLINE_START, "").replace(HEADLINE_STOP, ""),
+            highlighted=html.escape(part).replace(HEADLINE_START, pre).replace(HEADLINE_STOP, post)
+        ))
+    return fragments
@@ -0,0 +1,117 @@
+# server/benchmark_article_throughput.py
+"""
+Measures concurrent `/article/{id}` throughput against a fake Confluence that
+injects a fixed latency into every call.
+
+The fake is plugged into the pooled client of the ConfluenceRepository, so the
+real router, service and database code paths are exercised. Two modes are
+available:
+
+  async     - the fake awaits its latency, as a real network call on the
+              async client does.
+  blocking  - the fake sleeps synchronously, reproducing the old behaviour of
+              calling the synchronous Confluence client inside `async def`.
+
+Usage (from the server/ directory, with a populated database):
+    python benchmark_article_throughput.py --requests 200 --concurrency 50 --latency-ms 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+
+import httpx
+
+from app.db import db
+from app.config import settings
+from app.main import app
+from app.services.confluence_service import ConfluenceService
+from prisma.enums import PageType
+
+
+def build_fake_confluence(latency_s: float, blocking: bool) -> httpx.MockTransport:
+    """Returns a transport that answers every content request after `latency_s`."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if blocking:
+            time.sleep(latency_s)
+        else:
+            await asyncio.sleep(latency_s)
+        page_id = request.url.path.rstrip('/').split('/')[-1]
+        return httpx.Response(200, json={
+            "id": page_id,
+            "type": "page",
+            "title": f"Benchmark page {page_id}",
+            "version": {"number": 1, "when": "2025-01-01T00:00:00.000Z"},
+            "body": {"view": {"value": "<p>" + "lorem ipsum " * 400 + "</p>"}}
+        })
+    return httpx.MockTransport(handler)
+
+
+async def pick_article_id() -> Optional[str]:
+    page = await db.page.find_first(where={'pageType': PageType.ARTICLE, 'submission': {'is': None}})
+    return page.confluenceId if page else None
+
+
+async def run(total_requests: int, concurrency: int, page_id: str) -> List[float]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        async def one_request():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(f"/article/{page_id}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(one_request() for _ in range(total_requests)))
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--page-id", type=str, default=None, help="Confluence ID of a published article (default: first found in the DB)")
+    parser.add_argument("--mode", choices=["async", "blocking", "both"], default="both")
+    args = parser.parse_args()
+
+    await db.connect()
+    # ASGITransport does not run the app lifespan, so install the shared service here
+    confluence_service = ConfluenceService(settings)
+    app.state.confluence_service = confluence_service
+    try:
+        page_id = args.page_id or await pick_article_id()
+        if not page_id:
+            print("No published article found in the database. Pass --page-id explicitly.")
+            return
+
+        repo = confluence_service.confluence_repo
+        modes = ["blocking", "async"] if args.mode == "both" else [args.mode]
+
+        for mode in modes:
+            await repo.aclose()
+            repo.client = repo._build_client(build_fake_confluence(args.latency_ms / 1000, blocking=(mode == "blocking")))
+
+            started = time.perf_counter()
+            latencies = await run(args.requests, args.concurrency, page_id)
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            p50 = statistics.median(latencies)
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(
+                f"[{mode:>8}] {args.requests} requests, concurrency {args.concurrency}, "
+                f"{args.latency_ms:.0f}ms upstream latency -> {args.requests / elapsed:8.1f} req/s, "
+                f"p50 {p50 * 1000:7.1f}ms, p99 {p99 * 1000:7.1f}ms"
+            )
+    finally:
+        await confluence_service.close()
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,190 @@
+# server/benchmark_content_index.py
+"""
+Regression benchmark for the admin content index (`/admin/content-index`).
+
+Generates a page tree with the fake Confluence generator, writes it to the
+database under a `bench-` ID prefix (pages, submissions from a benchmark user,
+and a group the user administers), then expands the largest folders with:
+
+  legacy  - the previous per-row implementation: one query for the level,
+            then a child count and a submission lookup for every page.
+  single  - ConfluenceService.get_content_index_nodes, one query per level.
+
+Everything the benchmark created is deleted afterwards.
+
+Usage (from the server/ directory, against a development database):
+    python benchmark_content_index.py --pages 5000 --fanout 100 --folders 10 --repeat 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from typing import List, Optional
+
+from app.db import db
+from app.config import settings
+from app.schemas.auth_schemas import UserResponse
+from app.schemas.cms_schemas import ArticleSubmissionStatus, ContentNode
+from app.services.confluence_service import ConfluenceService
+from app.services.page_tree import page_tree
+from fake_confluence import FakeConfluence
+from prisma.enums import PageType
+
+PREFIX = "bench-"
+
+
+async def seed(service: ConfluenceService, pages: int, fanout: int, seed_value: int, submission_share: float) -> int:
+    """Writes the generated tree to the database and returns the benchmark user's ID."""
+    fake = FakeConfluence(seed=seed_value, pages=pages, fanout=fanout, attachments_per_page=0)
+    rng = random.Random(seed_value)
+
+    user = await db.user.create(data={
+        'username': f'{PREFIX}user', 'name': 'Benchmark Author', 'hashed_password': '!', 'role': 'EDITOR'
+    })
+    # Pages are generated breadth-first, so parents are always inserted before their children
+    await db.page.create_many(data=[
+        {
+            'confluenceId': PREFIX + page.id,
+            'title': page.title,
+            'slug': f'{PREFIX}{page.id}',
+            'description': '',
+            'pageType': PageType.SUBSECTION if fake.children.get(page.id) else PageType.ARTICLE,
+            'parentConfluenceId': PREFIX + page.parent_id if page.parent_id else None,
+            'authorName': page.author,
+            'updatedAt': page.when,
+        }
+        for page in fake.pages.values()
+    ])
+    statuses = list(ArticleSubmissionStatus)
+    await db.articlesubmission.create_many(data=[
+        {
+            'confluencePageId': PREFIX + page.id,
+            'title': page.title,
+            'status': rng.choice(statuses).value,
+            'authorId': user.id,
+        }
+        for page in fake.pages.values() if page.parent_id and rng.random() < submission_share
+    ])
+
+    # The user administers the group managing the first top-level folder
+    await service.page_repo.rebuild_ancestor_paths()
+    await service.page_repo.reconcile_child_counts()
+    root = next(iter(fake.pages.values()))
+    managed = await db.page.find_unique(where={'confluenceId': PREFIX + fake.children[root.id][0]})
+    group = await db.group.create(data={'name': f'{PREFIX}group', 'managedPageId': managed.id})
+    await db.groupmember.create(data={'userId': user.id, 'groupId': group.id, 'role': 'ADMIN'})
+    # Bulk inserts bypass PageRepository, so load the new pages into the page tree explicitly
+    await page_tree.rebuild()
+    return user.id
+
+
+async def cleanup():
+    await db.groupmember.delete_many(where={'group': {'is': {'name': f'{PREFIX}group'}}})
+    await db.group.delete_many(where={'name': f'{PREFIX}group'})
+    await db.articlesubmission.delete_many(where={'confluencePageId': {'startswith': PREFIX}})
+    await db.page.delete_many(where={'confluenceId': {'startswith': PREFIX}})
+    await db.user.delete_many(where={'username': f'{PREFIX}user'})
+
+
+async def legacy_admin_managed_page_ids(user_id: int) -> set:
+    """Confluence IDs of the pages a user administers through a group, and all their descendants."""
+    user = await db.user.find_unique(
+        where={'id': user_id},
+        include={'groupMemberships': {'where': {'role': 'ADMIN'}, 'include': {'group': {'include': {'managedPage': True}}}}}
+    )
+    if not user or not user.groupMemberships:
+        return set()
+    tree = await page_tree.get()
+    roots = [
+        i for m in user.groupMemberships if m.group.managedPage
+        for i in [tree.index_of_db_id(m.group.managedPage.id)] if i is not None
+    ]
+    return {tree.confluence_ids[i] for i in tree.subtree(roots)}
+
+
+async def legacy_content_index(service: ConfluenceService, parent_id: Optional[str], user: UserResponse) -> List[ContentNode]:
+    """The previous per-row implementation, kept here as the baseline."""
+    admin_page_ids = await legacy_admin_managed_page_ids(user.id)
+    nodes = []
+    for page in await db.page.find_many(where={'parentConfluenceId': parent_id}, order={'title': 'asc'}):
+        has_children = await db.page.count(where={'parentConfluenceId': page.confluenceId}) > 0
+        submission = await service.submission_repo.get_by_confluence_id_with_author(page.confluenceId)
+        author_name, status = page.authorName or "System", ArticleSubmissionStatus.PUBLISHED
+        if submission:
+            if submission.author:
+                author_name = submission.author.name
+            status = submission.status
+        nodes.append(ContentNode(
+            id=page.confluenceId, title=page.title, author=author_name, status=status,
+            updatedAt=page.updatedAt, confluenceUrl="", children=[], hasChildren=has_children,
+            canManage=page.confluenceId in admin_page_ids
+        ))
+    return nodes
+
+
+def summarize(name: str, latencies: List[float], rows: int):
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"[{name:>6}] {len(latencies)} expansions, {rows} rows -> "
+        f"p50 {statistics.median(latencies) * 1000:8.1f}ms, p99 {p99 * 1000:8.1f}ms, "
+        f"total {sum(latencies):6.2f}s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--fanout", type=int, default=100, help="Maximum children per generated folder")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--submission-share", type=float, default=0.3)
+    parser.add_argument("--folders", type=int, default=10, help="How many of the largest folders to expand")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    await db.connect()
+    service = ConfluenceService(settings)
+    try:
+        await cleanup()
+        started = time.perf_counter()
+        user_id = await seed(service, args.pages, args.fanout, args.seed, args.submission_share)
+        print(f"Seeded {args.pages} pages in {time.perf_counter() - started:.1f}s")
+        user = UserResponse(id=user_id, username=f'{PREFIX}user', name='Benchmark Author', role='EDITOR')
+
+        folders = await db.page.find_many(
+            where={'confluenceId': {'startswith': PREFIX}},
+            order={'childCount': 'desc'},
+            take=args.folders
+        )
+        print(f"Expanding {len(folders)} folders of {folders[-1].childCount}-{folders[0].childCount} children")
+
+        implementations = (
+            ("legacy", lambda parent_id: legacy_content_index(service, parent_id, user)),
+            ("single", lambda parent_id: service.get_content_index_nodes(parent_id, user)),
+        )
+        for name, expand in implementations:
+            latencies, rows = [], 0
+            for _ in range(args.repeat):
+                for folder in folders:
+                    t = time.perf_counter()
+                    nodes = await expand(folder.confluenceId)
+                    latencies.append(time.perf_counter() - t)
+                    rows += len(nodes)
+            summarize(name, latencies, rows)
+
+        # Both implementations must agree on every field the admin UI shows
+        for folder in folders:
+            legacy = await legacy_content_index(service, folder.confluenceId, user)
+            single = await service.get_content_index_nodes(folder.confluenceId, user)
+            fields = lambda n: (n.id, n.title, n.author, n.status, n.hasChildren, n.canManage)
+            assert [fields(n) for n in legacy] == [fields(n) for n in single], f"Mismatch under {folder.confluenceId}"
+        print("Legacy and single-query results match.")
+    finally:
+        await cleanup()
+        await service.close()
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
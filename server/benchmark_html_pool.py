@@ -0,0 +1,118 @@
+# server/benchmark_html_pool.py
+"""
+Measures how much CPU-bound HTML work stalls the event loop, with and without
+the process pool.
+
+Mixed load: a stream of "heavy" requests each parse and convert a large
+generated Confluence body, while a stream of "light" requests (a coroutine
+that does no real work) is fired every few milliseconds. The light request
+latency is effectively the event-loop lag every other request would see.
+
+No database or Confluence instance is needed.
+
+Usage (from the server/ directory):
+    python benchmark_html_pool.py --documents 200 --concurrency 8 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from app.services.html_pool import HtmlProcessPool
+
+
+def build_document(index: int, sections: int) -> str:
+    """Returns a Confluence-like body with headings, paragraphs, tables and images."""
+    parts = []
+    for s in range(sections):
+        parts.append(f"<h2>Section {s} of document {index}</h2>")
+        parts.append(
+            "<p>" + " ".join(f"word{(index * 31 + s * 7 + w) % 997}" for w in range(80)) + "</p>"
+        )
+        parts.append(
+            "<table><tbody>"
+            + "".join(f"<tr><td>Row {r}</td><td><strong>value {r * s}</strong></td></tr>" for r in range(6))
+            + "</tbody></table>"
+        )
+        parts.append(f'<p><img src="/attachments/{index}/image{s}.png" alt="figure {s}"></p>')
+    return "".join(parts)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(pool: HtmlProcessPool, documents: List[str], concurrency: int, tick_ms: float):
+    lags: List[float] = []
+    heavy_latencies: List[float] = []
+    done = asyncio.Event()
+
+    async def light_requests():
+        # Each tick asks to wake up after tick_ms; any extra delay is time the loop was blocked
+        while not done.is_set():
+            expected = time.perf_counter() + tick_ms / 1000
+            await asyncio.sleep(tick_ms / 1000)
+            lags.append(max(0.0, time.perf_counter() - expected))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def heavy_request(html: str):
+        async with semaphore:
+            started = time.perf_counter()
+            await pool.extract_text(html)
+            await pool.to_storage_format(html)
+            heavy_latencies.append(time.perf_counter() - started)
+
+    ticker = asyncio.create_task(light_requests())
+    started = time.perf_counter()
+    await asyncio.gather(*(heavy_request(html) for html in documents))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+    return elapsed, lags, heavy_latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=40, help="Sections per generated document (controls its size)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument("--tick-ms", type=float, default=5.0)
+    parser.add_argument("--mode", choices=["inline", "pool", "both"], default="both")
+    args = parser.parse_args()
+
+    documents = [build_document(i, args.sections) for i in range(args.documents)]
+    avg_kb = sum(len(d) for d in documents) / len(documents) / 1024
+    print(f"{args.documents} documents, avg {avg_kb:.0f} KB, concurrency {args.concurrency}")
+
+    modes = ["inline", "pool"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        pool = HtmlProcessPool(
+            workers=args.workers if mode == "pool" else 0,
+            chunk_size=args.chunk_size,
+            inline_max_bytes=0
+        )
+        try:
+            if mode == "pool":
+                # Start the workers before measuring so spawn cost is not counted
+                await pool.extract_texts(documents[:args.workers])
+            elapsed, lags, heavy = await run(pool, documents, args.concurrency, args.tick_ms)
+            batch_started = time.perf_counter()
+            await pool.extract_texts(documents)
+            batch_elapsed = time.perf_counter() - batch_started
+        finally:
+            pool.shutdown()
+
+        print(
+            f"[{mode:>6}] {args.documents / elapsed:7.1f} docs/s | loop lag p50 {statistics.median(lags) * 1000:6.1f}ms "
+            f"p99 {percentile(lags, 0.99) * 1000:6.1f}ms max {max(lags) * 1000:6.1f}ms | "
+            f"heavy p99 {percentile(heavy, 0.99) * 1000:7.1f}ms | batch extract {batch_elapsed:5.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
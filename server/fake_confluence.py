@@ -0,0 +1,483 @@
+# server/fake_confluence.py
+"""
+A local stand-in for the Confluence Cloud REST API, for load tests, profiling
+and offline development.
+
+It implements the endpoints ConfluenceRepository uses:
+  - content by id (with expand), create, update and delete
+  - child pages, root-page discovery by title
+  - CQL search (the subset the Knowledge Hub generates)
+  - labels, comments
+  - attachments: list, upload (POST/PUT multipart) and download (with Range)
+
+The page tree is generated deterministically from a seed. Every response can
+be delayed by a configurable latency, and a share of requests can be failed
+with 503 or throttled with 429 to exercise the retry, breaker and scheduler
+paths. The knobs can be changed at runtime through `/__fake/config`, and
+`/__fake/stats` reports how many calls each endpoint received.
+
+Usage (from the server/ directory):
+    python fake_confluence.py --port 8090 --pages 500 --latency-ms 80 --error-rate 0.01
+
+Then point the app at it, either with CONFLUENCE_URL=http://127.0.0.1:8090 or
+with FAKE_CONFLUENCE_URL=http://127.0.0.1:8090 (which also fills in dummy
+credentials and the space key).
+
+The app can also be used in-process, e.g. as an httpx.ASGITransport for the
+ConfluenceRepository:
+    fake = FakeConfluence(seed=1, pages=5000)
+    transport = httpx.ASGITransport(app=create_app(fake))
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import FastAPI, Request, Response, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+ROOT_TITLE = "Resource Centre"
+SPACE_KEY = "KB"
+
+WORDS = (
+    "policy process onboarding network security laptop printer vpn access request "
+    "approval leave travel expense invoice vendor contract safety training guide "
+    "manual handbook report template checklist incident backup server account "
+    "password email calendar meeting project budget review audit compliance"
+).split()
+
+
+@dataclass
+class FakeAttachment:
+    id: str
+    title: str
+    data: bytes
+    media_type: str
+    version: int = 1
+
+
+@dataclass
+class FakePage:
+    id: str
+    title: str
+    parent_id: Optional[str]
+    body: str
+    author: str
+    when: str
+    version: int = 1
+    labels: Set[str] = field(default_factory=set)
+    comments: List[Dict[str, Any]] = field(default_factory=list)
+    attachments: Dict[str, FakeAttachment] = field(default_factory=dict)
+
+
+class FakeConfluence:
+    """In-memory Confluence space with a generated page tree."""
+
+    def __init__(
+        self,
+        seed: int = 42,
+        pages: int = 200,
+        fanout: int = 8,
+        attachments_per_page: float = 0.3,
+        attachment_bytes: int = 64 * 1024,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        space_key: str = SPACE_KEY
+    ):
+        self.space_key = space_key
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.pages: Dict[str, FakePage] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.calls: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._next_id = 100000
+        self._seed_tree(pages, fanout, attachments_per_page, attachment_bytes)
+
+    # --- Seeding ---
+
+    def _new_id(self) -> str:
+        self._next_id += 1
+        return str(self._next_id)
+
+    def _sentence(self, words: int) -> str:
+        return " ".join(self._rng.choice(WORDS) for _ in range(words))
+
+    def _seed_tree(self, total: int, fanout: int, attachments_per_page: float, attachment_bytes: int):
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        root = self.add_page(ROOT_TITLE, None, "<p>Knowledge Hub root.</p>", when=start)
+        queue = [root.id]
+        created = 1
+        while created < total and queue:
+            parent_id = queue.pop(0)
+            for _ in range(self._rng.randint(1, fanout)):
+                if created >= total:
+                    break
+                title = f"{self._sentence(3).title()} {created}"
+                paragraphs = "".join(f"<p>{self._sentence(self._rng.randint(20, 60))}</p>" for _ in range(self._rng.randint(2, 8)))
+                body = f"<h2>{title}</h2>{paragraphs}"
+                page = self.add_page(title, parent_id, body, when=start + timedelta(minutes=created))
+                page.labels.update(self._rng.sample(WORDS, self._rng.randint(0, 4)))
+                if self._rng.random() < attachments_per_page:
+                    self.add_attachment(page.id, f"figure-{created}.png", self._rng.randbytes(attachment_bytes), "image/png")
+                queue.append(page.id)
+                created += 1
+
+    def add_page(self, title: str, parent_id: Optional[str], body: str, when: Optional[datetime] = None, author: str = "Fake Author") -> FakePage:
+        page = FakePage(
+            id=self._new_id(),
+            title=title,
+            parent_id=parent_id,
+            body=body,
+            author=author,
+            when=(when or datetime.now(timezone.utc)).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        )
+        self.pages[page.id] = page
+        self.children.setdefault(page.id, [])
+        if parent_id:
+            self.children.setdefault(parent_id, []).append(page.id)
+        return page
+
+    def add_attachment(self, page_id: str, title: str, data: bytes, media_type: str) -> FakeAttachment:
+        page = self.pages[page_id]
+        existing = page.attachments.get(title)
+        if existing:
+            existing.data, existing.media_type = data, media_type
+            existing.version += 1
+            return existing
+        attachment = FakeAttachment(id=f"att{self._new_id()}", title=title, data=data, media_type=media_type)
+        page.attachments[title] = attachment
+        return attachment
+
+    def delete_page(self, page_id: str):
+        page = self.pages.pop(page_id)
+        if page.parent_id in self.children:
+            self.children[page.parent_id].remove(page_id)
+        self.children.pop(page_id, None)
+
+    # --- Serialisation ---
+
+    def ancestors(self, page: FakePage) -> List[FakePage]:
+        chain = []
+        parent_id = page.parent_id
+        while parent_id and parent_id in self.pages:
+            chain.append(self.pages[parent_id])
+            parent_id = self.pages[parent_id].parent_id
+        return list(reversed(chain))
+
+    def page_json(self, page: FakePage, expand: str = "") -> Dict[str, Any]:
+        expands = {e.strip() for e in expand.split(",") if e.strip()}
+        data: Dict[str, Any] = {
+            "id": page.id,
+            "type": "page",
+            "status": "current",
+            "title": page.title,
+            "version": {"number": page.version, "when": page.when, "by": {"displayName": page.author}},
+            "_links": {"webui": f"/spaces/{self.space_key}/pages/{page.id}"},
+        }
+        if "body.view" in expands or "body.storage" in expands:
+            data["body"] = {
+                "view": {"value": page.body, "representation": "view"},
+                "storage": {"value": page.body, "representation": "storage"},
+            }
+        if "metadata.labels" in expands:
+            labels = [{"prefix": "global", "name": name} for name in sorted(page.labels)]
+            data["metadata"] = {"labels": {"results": labels, "size": len(labels)}}
+        if "ancestors" in expands:
+            data["ancestors"] = [{"id": a.id, "type": "page", "title": a.title} for a in self.ancestors(page)]
+        return data
+
+    def attachment_json(self, page: FakePage, attachment: FakeAttachment) -> Dict[str, Any]:
+        return {
+            "id": attachment.id,
+            "type": "attachment",
+            "title": attachment.title,
+            "version": {"number": attachment.version},
+            "extensions": {"fileSize": len(attachment.data), "mediaType": attachment.media_type},
+            "_links": {"download": f"/download/attachments/{page.id}/{attachment.title}?version={attachment.version}"},
+        }
+
+    # --- CQL ---
+
+    def search(self, cql: str) -> List[FakePage]:
+        """Evaluates the `clause and clause ... [order by ...]` subset of CQL."""
+        order = None
+        match = re.search(r"\s+order\s+by\s+(\w+)(\s+(asc|desc))?\s*$", cql, re.IGNORECASE)
+        if match:
+            order = (match.group(1), (match.group(3) or "asc").lower())
+            cql = cql[:match.start()]
+
+        clauses = re.findall(r'(\w+)\s*(!=|=|~)\s*("(?:[^"\\]|\\.)*"|\S+)', cql)
+        results = []
+        for page in self.pages.values():
+            if all(self._matches(page, key.lower(), op, value.strip('"').replace('\\"', '"')) for key, op, value in clauses):
+                results.append(page)
+
+        if order and order[0].lower() == "lastmodified":
+            results.sort(key=lambda p: p.when, reverse=order[1] == "desc")
+        return results
+
+    def _matches(self, page: FakePage, key: str, op: str, value: str) -> bool:
+        if key == "space":
+            hit = value == self.space_key
+        elif key == "type":
+            hit = value == "page"
+        elif key == "label":
+            hit = value in page.labels
+        elif key == "title":
+            hit = value.lower() in page.title.lower() if op == "~" else value == page.title
+        elif key == "text":
+            hit = value.lower() in page.title.lower() or value.lower() in page.body.lower()
+        elif key == "ancestor":
+            hit = any(a.id == value for a in self.ancestors(page))
+        elif key in ("id", "content"):
+            hit = value == page.id
+        else:
+            hit = True
+        return not hit if op == "!=" else hit
+
+
+def _paged(results: List[Dict[str, Any]], start: int, limit: int, path: str) -> Dict[str, Any]:
+    batch = results[start:start + limit]
+    links: Dict[str, str] = {}
+    if start + limit < len(results):
+        links["next"] = f"{path}?start={start + limit}&limit={limit}"
+    return {"results": batch, "start": start, "limit": limit, "size": len(batch), "_links": links}
+
+
+def create_app(fake: FakeConfluence) -> FastAPI:
+    app = FastAPI(title="Fake Confluence")
+    app.state.fake = fake
+
+    @app.middleware("http")
+    async def inject_latency_and_errors(request: Request, call_next):
+        if request.url.path.startswith("/__fake"):
+            return await call_next(request)
+        route = re.sub(r"/(att)?\d+", "/{id}", request.url.path)
+        fake.calls[f"{request.method} {route}"] += 1
+        delay = fake.latency_ms + (fake._rng.uniform(0, fake.jitter_ms) if fake.jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        roll = fake._rng.random()
+        if roll < fake.throttle_rate:
+            return JSONResponse({"message": "Rate limit exceeded"}, status_code=429, headers={"Retry-After": "1"})
+        if roll < fake.throttle_rate + fake.error_rate:
+            return JSONResponse({"message": "Injected failure"}, status_code=503)
+        return await call_next(request)
+
+    def get_page(page_id: str) -> FakePage:
+        page = fake.pages.get(page_id)
+        if page is None:
+            raise HTTPException(status_code=404, detail=f"No content found with id: {page_id}")
+        return page
+
+    # --- Content ---
+
+    @app.get("/rest/api/content")
+    async def find_content(title: Optional[str] = None, spaceKey: Optional[str] = None, start: int = 0, limit: int = 25, expand: str = ""):
+        pages = [p for p in fake.pages.values() if title is None or p.title == title]
+        return _paged([fake.page_json(p, expand) for p in pages], start, limit, "/rest/api/content")
+
+    @app.get("/rest/api/content/search")
+    async def search(cql: str, start: int = 0, limit: int = 25, expand: str = ""):
+        results = fake.search(cql)
+        batch = [fake.page_json(p, expand) for p in results[start:start + limit]]
+        links = {"next": f"/rest/api/content/search?start={start + limit}&limit={limit}"} if start + limit < len(results) else {}
+        return {"results": batch, "start": start, "limit": limit, "size": len(batch), "totalSize": len(results), "_links": links}
+
+    @app.get("/rest/api/content/{page_id}")
+    async def get_content(page_id: str, expand: str = ""):
+        return fake.page_json(get_page(page_id), expand)
+
+    @app.post("/rest/api/content")
+    async def create_content(payload: Dict[str, Any]):
+        body = payload.get("body", {}).get("storage", {}).get("value", "")
+        if payload.get("type") == "comment":
+            page = get_page(payload["container"]["id"])
+            comment = {"id": fake._new_id(), "type": "comment", "body": {"storage": {"value": body}}}
+            page.comments.append(comment)
+            return comment
+        ancestors = payload.get("ancestors") or []
+        parent_id = ancestors[-1]["id"] if ancestors else None
+        if parent_id:
+            get_page(parent_id)
+        page = fake.add_page(payload["title"], parent_id, body)
+        return fake.page_json(page, "version")
+
+    @app.put("/rest/api/content/{page_id}")
+    async def update_content(page_id: str, payload: Dict[str, Any]):
+        page = get_page(page_id)
+        new_version = payload.get("version", {}).get("number")
+        if new_version != page.version + 1:
+            raise HTTPException(status_code=409, detail=f"Version must be incremented when updating a page. Current Version is: {page.version}")
+        page.title = payload.get("title", page.title)
+        page.body = payload.get("body", {}).get("storage", {}).get("value", page.body)
+        page.version = new_version
+        page.when = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+        ancestors = payload.get("ancestors")
+        if ancestors and ancestors[-1]["id"] != page.parent_id:
+            if page.parent_id in fake.children:
+                fake.children[page.parent_id].remove(page.id)
+            page.parent_id = ancestors[-1]["id"]
+            fake.children.setdefault(page.parent_id, []).append(page.id)
+        return fake.page_json(page, "version")
+
+    @app.delete("/rest/api/content/{page_id}", status_code=204)
+    async def delete_content(page_id: str):
+        get_page(page_id)
+        fake.delete_page(page_id)
+        return Response(status_code=204)
+
+    @app.get("/rest/api/content/{page_id}/child/page")
+    async def child_pages(page_id: str, start: int = 0, limit: int = 25, expand: str = ""):
+        get_page(page_id)
+        children = [fake.page_json(fake.pages[c], expand) for c in fake.children.get(page_id, [])]
+        return _paged(children, start, limit, f"/rest/api/content/{page_id}/child/page")
+
+    @app.get("/rest/api/content/{page_id}/child/comment")
+    async def child_comments(page_id: str, start: int = 0, limit: int = 25):
+        return _paged(get_page(page_id).comments, start, limit, f"/rest/api/content/{page_id}/child/comment")
+
+    # --- Labels ---
+
+    @app.get("/rest/api/content/{page_id}/label")
+    async def get_labels(page_id: str):
+        labels = [{"prefix": "global", "name": name} for name in sorted(get_page(page_id).labels)]
+        return {"results": labels, "size": len(labels)}
+
+    @app.post("/rest/api/content/{page_id}/label")
+    async def add_labels(page_id: str, payload: List[Dict[str, str]]):
+        page = get_page(page_id)
+        page.labels.update(label["name"] for label in payload)
+        return await get_labels(page_id)
+
+    @app.delete("/rest/api/content/{page_id}/label", status_code=204)
+    async def remove_label(page_id: str, name: str):
+        page = get_page(page_id)
+        if name not in page.labels:
+            raise HTTPException(status_code=404, detail=f"Label '{name}' not found")
+        page.labels.discard(name)
+        return Response(status_code=204)
+
+    # --- Attachments ---
+
+    @app.get("/rest/api/content/{page_id}/child/attachment")
+    async def list_attachments(page_id: str, start: int = 0, limit: int = 25, expand: str = ""):
+        page = get_page(page_id)
+        items = [fake.attachment_json(page, a) for a in page.attachments.values()]
+        return _paged(items, start, limit, f"/rest/api/content/{page_id}/child/attachment")
+
+    @app.api_route("/rest/api/content/{page_id}/child/attachment", methods=["POST", "PUT"])
+    async def upload_attachment(page_id: str, request: Request):
+        page = get_page(page_id)
+        form = await request.form()
+        upload = form.get("file")
+        if not isinstance(upload, UploadFile) and not hasattr(upload, "read"):
+            raise HTTPException(status_code=400, detail="Missing 'file' part")
+        if request.method == "POST" and upload.filename in page.attachments:
+            raise HTTPException(status_code=400, detail="Cannot add a new attachment with same file name as an existing attachment")
+        attachment = fake.add_attachment(page.id, upload.filename, await upload.read(), upload.content_type or "application/octet-stream")
+        return {"results": [fake.attachment_json(page, attachment)], "size": 1}
+
+    def serve_bytes(attachment: FakeAttachment, request: Request) -> Response:
+        data = attachment.data
+        range_header = request.headers.get("range", "")
+        match = re.match(r"bytes=(\d*)-(\d*)$", range_header)
+        if match and (match.group(1) or match.group(2)):
+            first = int(match.group(1)) if match.group(1) else max(len(data) - int(match.group(2)), 0)
+            last = int(match.group(2)) if match.group(1) and match.group(2) else len(data) - 1
+            last = min(last, len(data) - 1)
+            if first > last:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{len(data)}"})
+            return Response(
+                data[first:last + 1],
+                status_code=206,
+                media_type=attachment.media_type,
+                headers={"Content-Range": f"bytes {first}-{last}/{len(data)}", "Accept-Ranges": "bytes"}
+            )
+        return Response(data, media_type=attachment.media_type, headers={"Accept-Ranges": "bytes"})
+
+    @app.get("/rest/api/content/{page_id}/child/attachment/{attachment_id}/download")
+    async def download_attachment(page_id: str, attachment_id: str, request: Request):
+        page = get_page(page_id)
+        attachment = next((a for a in page.attachments.values() if a.id == attachment_id), None)
+        if attachment is None:
+            raise HTTPException(status_code=404, detail="Attachment not found")
+        return serve_bytes(attachment, request)
+
+    @app.get("/download/attachments/{page_id}/{file_name}")
+    async def download_attachment_web(page_id: str, file_name: str, request: Request):
+        attachment = get_page(page_id).attachments.get(file_name)
+        if attachment is None:
+            raise HTTPException(status_code=404, detail="Attachment not found")
+        return serve_bytes(attachment, request)
+
+    # --- Control Endpoints ---
+
+    @app.get("/__fake/stats")
+    async def stats():
+        return {
+            "pages": len(fake.pages),
+            "totalCalls": sum(fake.calls.values()),
+            "calls": dict(fake.calls.most_common()),
+        }
+
+    @app.post("/__fake/config")
+    async def configure(payload: Dict[str, float]):
+        for name in ("latency_ms", "jitter_ms", "error_rate", "throttle_rate"):
+            if name in payload:
+                setattr(fake, name, float(payload[name]))
+        return {name: getattr(fake, name) for name in ("latency_ms", "jitter_ms", "error_rate", "throttle_rate")}
+
+    @app.post("/__fake/reset-stats")
+    async def reset_stats():
+        fake.calls.clear()
+        return {"totalCalls": 0}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Confluence server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pages", type=int, default=200, help="Number of pages in the generated tree.")
+    parser.add_argument("--fanout", type=int, default=8, help="Maximum children per page.")
+    parser.add_argument("--attachments-per-page", type=float, default=0.3)
+    parser.add_argument("--attachment-kb", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429.")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    started = time.perf_counter()
+    fake = FakeConfluence(
+        seed=args.seed,
+        pages=args.pages,
+        fanout=args.fanout,
+        attachments_per_page=args.attachments_per_page,
+        attachment_bytes=args.attachment_kb * 1024,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate
+    )
+    print(f"Generated {len(fake.pages)} pages in space '{fake.space_key}' in {time.perf_counter() - started:.2f}s.")
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
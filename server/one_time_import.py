@@ -1,26 +1,112 @@
 # server/one_time_import.py
 import asyncio
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional, Set, Tuple
+from typing import Awaitable, Callable, List, Dict, Optional, Set, Tuple
 
 from app.db import db
 from app.services.confluence_service import ConfluenceService
 from app.config import settings
+from app.services.outbound_scheduler import outbound_priority, Priority
+from app.services.html_pool import html_pool
+from app.utils.page_text import PageText
 from prisma.enums import PageType
 
 confluence_service = ConfluenceService(settings)
 
+# Confluence version each page was last indexed for search at, loaded in main()
+indexed_versions: Dict[str, int] = {}
+
+# Page bodies waiting for text extraction. They are sent to the HTML pool in
+# batches large enough to give every worker a full chunk.
+TEXT_BATCH_SIZE = settings.html_pool_chunk_size * max(1, settings.html_pool_workers)
+pending_texts: List[Tuple[str, Callable[[PageText], Awaitable[None]]]] = []
+
+async def queue_page_text(html_content: str, on_extracted: Callable[[PageText], Awaitable[None]]):
+    """Queues a body for extraction; `on_extracted` runs with its PageText when the batch is flushed."""
+    pending_texts.append((html_content, on_extracted))
+    if len(pending_texts) >= TEXT_BATCH_SIZE:
+        await flush_page_texts()
+
+async def flush_page_texts():
+    """Extracts every queued body in one pool batch, then runs the callbacks in queue order."""
+    batch = pending_texts[:]
+    pending_texts.clear()
+    if not batch:
+        return
+    page_texts = await html_pool.extract_texts([html_content for html_content, _ in batch])
+    # Queue order is crawl order, so a new parent page is created before its children
+    for (_, on_extracted), page_text in zip(batch, page_texts):
+        await on_extracted(page_text)
+
 async def get_all_confluence_page_ids_recursively(page_id: str, all_ids: Set[str]):
     if page_id in all_ids:
         return
     all_ids.add(page_id)
     try:
-        children = confluence_service.confluence_repo.get_child_pages(page_id)
+        children = await confluence_service.confluence_repo.get_child_pages(page_id)
         for child in children:
             await get_all_confluence_page_ids_recursively(child['id'], all_ids)
     except Exception as e:
         print(f"  -> WARN: Could not fetch children for page ID {page_id}. Reason: {e}")
 
+async def index_page_text(page_id: str, page_text: PageText, version: int):
+    try:
+        await confluence_service._index_page_content(page_id, page_text, version)
+    except Exception as e:
+        print(f"  -> WARN: Could not index page {page_id} for search. Reason: {e}")
+
+async def create_page(
+    page_id: str,
+    page_data: dict,
+    page_text: PageText,
+    page_type: PageType,
+    parent_confluence_id: Optional[str],
+    legacy_group_id: Optional[int],
+    tag_names: List[str]
+):
+    try:
+        title = page_data["title"]
+        author_name = page_data.get("version", {}).get("by", {}).get("displayName", "Unknown")
+        updated_at = page_data["version"]["when"]
+        plain_text = page_text.plain_text
+        if len(plain_text) > 150:
+            description = plain_text[:147] + '...'
+        elif plain_text:
+            description = plain_text
+        else:
+            description = "No description available."
+        
+        tag_connect_ops = []
+        if legacy_group_id and tag_names:
+            for tag_name in tag_names:
+                tag_slug = confluence_service._slugify(tag_name)
+                tag = await db.tag.upsert(
+                    where={'name': tag_name},
+                    data={'create': {'name': tag_name, 'slug': tag_slug, 'tagGroupId': legacy_group_id}, 'update': {}}
+                )
+                tag_connect_ops.append({'id': tag.id})
+        
+        await db.page.create(data={
+            'confluenceId': page_id,
+            'title': title,
+            'slug': confluence_service._slugify(title),
+            'description': description,
+            'pageType': page_type,
+            'parentConfluenceId': parent_confluence_id,
+            'authorName': author_name,
+            'updatedAt': updated_at,
+            'tags': {'connect': tag_connect_ops}
+        })
+        # Parents are queued before their children, so the parent's path is already current
+        await confluence_service.page_repo.refresh_ancestor_path(page_id)
+        await confluence_service._index_page_content(page_id, page_text, page_data["version"]["number"])
+        print(f"  -> SUCCESS: Created page '{title}'")
+    except Exception as e:
+        print(f"  -> ERROR: Failed to create page ID {page_id}. Reason: {e}")
+        return
+
+    # Refresh the local attachment index used to resolve downloads
+    await confluence_service._sync_attachment_index(page_id)
+
 async def process_page_and_children(
     page_id: str, 
     legacy_group_id: Optional[int], 
@@ -34,7 +120,8 @@ async def process_page_and_children(
     # --- THIS IS THE NEW CORE LOGIC ---
     # Find or create the legacy group THE FIRST TIME we encounter a page with tags.
     try:
-        page_data_for_labels = confluence_service.confluence_repo.get_page_by_id(page_id, expand="metadata.labels")
+        page_data_for_labels = await confluence_service.confluence_repo.get_page_by_id(page_id, expand="metadata.labels,version")
+        current_version = page_data_for_labels.get("version", {}).get("number")
         tag_names = [
             label['name'] for label in page_data_for_labels.get("metadata", {}).get("labels", {}).get("results", [])
             if not label['name'].startswith("status-")
@@ -48,11 +135,12 @@ async def process_page_and_children(
             legacy_group_id = legacy_group.id
     except Exception as e:
         print(f"  -> WARN: Could not check labels for page {page_id}. Reason: {e}")
+        current_version = None
         tag_names = []
     # --- END OF NEW LOGIC ---
 
     existing_page = await db.page.find_unique(where={'confluenceId': page_id})
-    children_from_confluence = confluence_service.confluence_repo.get_child_pages(page_id)
+    children_from_confluence = await confluence_service.confluence_repo.get_child_pages(page_id)
     
     correct_page_type = PageType.SUBSECTION if children_from_confluence else PageType.ARTICLE
 
@@ -63,48 +151,33 @@ async def process_page_and_children(
                 where={'confluenceId': page_id},
                 data={'parentConfluenceId': parent_confluence_id, 'pageType': correct_page_type}
             )
+            await confluence_service.page_repo.refresh_ancestor_path(page_id)
+        # Re-index the body only when it changed since the last sync
+        if current_version is not None and indexed_versions.get(page_id) != current_version:
+            try:
+                page_data = await confluence_service.confluence_repo.get_page_by_id(page_id, expand="body.view,version")
+                if page_data:
+                    await queue_page_text(
+                        page_data.get("body", {}).get("view", {}).get("value", ""),
+                        lambda page_text: index_page_text(page_id, page_text, page_data["version"]["number"])
+                    )
+            except Exception as e:
+                print(f"  -> WARN: Could not index page {page_id} for search. Reason: {e}")
+        # Refresh the local attachment index used to resolve downloads
+        await confluence_service._sync_attachment_index(page_id)
     else:
         print(f"Creating new page for ID: {page_id}...")
         try:
-            page_data = confluence_service.confluence_repo.get_page_by_id(page_id, expand="body.view,version")
+            page_data = await confluence_service.confluence_repo.get_page_by_id(page_id, expand="body.view,version")
             if not page_data:
                 print(f"  -> WARN: Could not fetch data for new page ID {page_id}. Skipping.")
                 return legacy_group_id
 
-            title = page_data["title"]
-            author_name = page_data.get("version", {}).get("by", {}).get("displayName", "Unknown")
-            updated_at = page_data["version"]["when"]
-            html_content = page_data.get("body", {}).get("view", {}).get("value", "")
-            plain_text = BeautifulSoup(html_content, 'html.parser').get_text(" ", strip=True)
-            if len(plain_text) > 150:
-                description = plain_text[:147] + '...'
-            elif plain_text:
-                description = plain_text
-            else:
-                description = "No description available."
-            
-            tag_connect_ops = []
-            if legacy_group_id and tag_names:
-                for tag_name in tag_names:
-                    tag_slug = confluence_service._slugify(tag_name)
-                    tag = await db.tag.upsert(
-                        where={'name': tag_name},
-                        data={'create': {'name': tag_name, 'slug': tag_slug, 'tagGroupId': legacy_group_id}, 'update': {}}
-                    )
-                    tag_connect_ops.append({'id': tag.id})
-            
-            await db.page.create(data={
-                'confluenceId': page_id,
-                'title': title,
-                'slug': confluence_service._slugify(title),
-                'description': description,
-                'pageType': correct_page_type,
-                'parentConfluenceId': parent_confluence_id,
-                'authorName': author_name,
-                'updatedAt': updated_at,
-                'tags': {'connect': tag_connect_ops}
-            })
-            print(f"  -> SUCCESS: Created page '{title}'")
+            # The row needs the extracted text for its description, so it is written when the batch is flushed
+            await queue_page_text(
+                page_data.get("body", {}).get("view", {}).get("value", ""),
+                lambda page_text: create_page(page_id, page_data, page_text, correct_page_type, parent_confluence_id, legacy_group_id, tag_names)
+            )
         
         except Exception as e:
             print(f"  -> ERROR: Failed to create page ID {page_id}. Reason: {e}")
@@ -119,9 +192,15 @@ async def process_page_and_children(
 
 async def main():
     print("--- Starting Confluence Incremental Sync ---")
+    # The crawl yields to interactive and CMS traffic when sharing the Confluence rate budget
+    outbound_priority.set(Priority.BACKGROUND)
     await db.connect()
     
     try:
+        # The crawl always starts from freshly discovered root pages, which also refreshes the DB cache
+        if not await confluence_service.refresh_root_pages():
+            await confluence_service.load_root_pages()
+
         print("\n[Phase 1/3] Collecting all page IDs from Confluence...")
         confluence_ids: Set[str] = set()
         root_page_ids = confluence_service.confluence_repo.root_page_ids
@@ -139,21 +218,35 @@ async def main():
         if ids_to_delete:
             print(f"Found {len(ids_to_delete)} pages to delete.")
             await db.articlesubmission.delete_many(where={'confluencePageId': {'in': list(ids_to_delete)}})
+            await db.attachment.delete_many(where={'pageConfluenceId': {'in': list(ids_to_delete)}})
             await db.page.delete_many(where={'confluenceId': {'in': list(ids_to_delete)}})
             print("  -> SUCCESS: Deleted orphaned pages.")
         else:
             print("  -> No pages to delete.")
 
-        print("\n[Phase 3/3] Syncing pages and tags...")
+        print("\n[Phase 3/3] Syncing pages, tags, attachments and the search index...")
+        indexed_versions.update(await confluence_service.search_repo.get_indexed_versions())
         legacy_group_id = None # Start with no legacy group
         for slug, page_id in root_page_ids.items():
             # The recursive function will now handle the creation and propagation of the ID
             updated_legacy_id = await process_page_and_children(page_id, legacy_group_id, parent_confluence_id=None)
             if updated_legacy_id and legacy_group_id is None:
                 legacy_group_id = updated_legacy_id
+        await flush_page_texts()
+        repaired = await confluence_service.page_repo.rebuild_ancestor_paths()
+        if repaired:
+            print(f"  -> Repaired {repaired} ancestor path(s).")
+        recounted = await confluence_service.page_repo.reconcile_child_counts()
+        if recounted:
+            print(f"  -> Repaired child counts on {recounted} page(s).")
+        await confluence_service._bump_content_version()
+        if settings.search_backend == "bm25":
+            await confluence_service.rebuild_bm25_index()
         print("  -> SUCCESS: Finished syncing.")
 
     finally:
+        await confluence_service.close()
+        html_pool.shutdown()
         await db.disconnect()
         print("\n--- Confluence Incremental Sync Finished ---")
 
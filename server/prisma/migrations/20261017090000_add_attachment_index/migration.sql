@@ -0,0 +1,20 @@
+-- CreateTable
+CREATE TABLE "Attachment" (
+    "id" SERIAL NOT NULL,
+    "pageConfluenceId" TEXT NOT NULL,
+    "fileName" TEXT NOT NULL,
+    "attachmentId" TEXT NOT NULL,
+    "version" INTEGER NOT NULL,
+    "fileSize" BIGINT,
+    "mediaType" TEXT,
+    "downloadPath" TEXT,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "Attachment_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Attachment_attachmentId_key" ON "Attachment"("attachmentId");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Attachment_pageConfluenceId_fileName_key" ON "Attachment"("pageConfluenceId", "fileName");
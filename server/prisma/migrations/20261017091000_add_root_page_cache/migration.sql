@@ -0,0 +1,9 @@
+-- CreateTable
+CREATE TABLE "RootPage" (
+    "slug" TEXT NOT NULL,
+    "confluenceId" TEXT NOT NULL,
+    "title" TEXT NOT NULL,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "RootPage_pkey" PRIMARY KEY ("slug")
+);
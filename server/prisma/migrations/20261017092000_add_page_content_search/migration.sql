@@ -0,0 +1,20 @@
+-- CreateTable
+CREATE TABLE "PageContent" (
+    "id" SERIAL NOT NULL,
+    "pageConfluenceId" TEXT NOT NULL,
+    "plainText" TEXT NOT NULL,
+    "version" INTEGER NOT NULL,
+    "searchVector" tsvector,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "PageContent_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "PageContent_pageConfluenceId_key" ON "PageContent"("pageConfluenceId");
+
+-- CreateIndex
+CREATE INDEX "PageContent_searchVector_idx" ON "PageContent" USING GIN ("searchVector");
+
+-- AddForeignKey
+ALTER TABLE "PageContent" ADD CONSTRAINT "PageContent_pageConfluenceId_fkey" FOREIGN KEY ("pageConfluenceId") REFERENCES "Page"("confluenceId") ON DELETE CASCADE ON UPDATE CASCADE;
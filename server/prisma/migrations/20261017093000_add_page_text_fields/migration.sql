@@ -0,0 +1,16 @@
+-- AlterTable
+ALTER TABLE "Page" ADD COLUMN "excerpt" TEXT NOT NULL DEFAULT '',
+ADD COLUMN "wordCount" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN "readMinutes" INTEGER NOT NULL DEFAULT 1;
+
+-- Backfill from the bodies already in the search index
+UPDATE "Page" p SET
+    "wordCount" = w.words,
+    "readMinutes" = GREATEST(1, ROUND(w.words / 200.0)),
+    "excerpt" = CASE WHEN length(pc."plainText") > 150 THEN left(pc."plainText", 150) || '...' ELSE pc."plainText" END
+FROM "PageContent" pc
+CROSS JOIN LATERAL (
+    SELECT CASE WHEN btrim(pc."plainText") = '' THEN 0
+                ELSE cardinality(regexp_split_to_array(btrim(pc."plainText"), '[[:space:]]+')) END AS words
+) w
+WHERE pc."pageConfluenceId" = p."confluenceId";
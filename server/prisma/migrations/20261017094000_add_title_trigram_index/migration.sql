@@ -0,0 +1,15 @@
+-- Trigram title index for typeahead. pg_trgm is optional: deployments that
+-- cannot add extensions skip both statements and the app falls back to
+-- prefix matching (see SearchRepository.suggest_titles).
+DO $$
+BEGIN
+    -- CreateExtension
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+    -- CreateIndex
+    CREATE INDEX IF NOT EXISTS "Page_title_trgm_idx" ON "Page" USING GIN ("title" gin_trgm_ops);
+EXCEPTION
+    WHEN insufficient_privilege OR undefined_file OR feature_not_supported THEN
+        RAISE NOTICE 'pg_trgm is not available (%); title typeahead will use prefix matching', SQLERRM;
+END
+$$;
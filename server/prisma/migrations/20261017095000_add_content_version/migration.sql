@@ -0,0 +1,10 @@
+-- CreateTable
+CREATE TABLE "ContentVersion" (
+    "id" INTEGER NOT NULL DEFAULT 1,
+    "version" INTEGER NOT NULL DEFAULT 0,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "ContentVersion_pkey" PRIMARY KEY ("id")
+);
+
+INSERT INTO "ContentVersion" ("id", "version", "updatedAt") VALUES (1, 0, NOW());
@@ -0,0 +1,5 @@
+-- CreateIndex
+CREATE INDEX "Page_views_idx" ON "Page"("views");
+
+-- CreateIndex
+CREATE INDEX "Page_updatedAt_idx" ON "Page"("updatedAt");
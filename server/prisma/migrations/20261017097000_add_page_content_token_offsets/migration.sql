@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "PageContent" ADD COLUMN "tokenOffsets" INTEGER[] DEFAULT ARRAY[]::INTEGER[];
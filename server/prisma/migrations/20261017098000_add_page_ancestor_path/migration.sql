@@ -0,0 +1,21 @@
+-- AlterTable
+ALTER TABLE "Page" ADD COLUMN "ancestorIds" INTEGER[] NOT NULL DEFAULT ARRAY[]::INTEGER[],
+ADD COLUMN "depth" INTEGER NOT NULL DEFAULT 0;
+
+-- CreateIndex
+CREATE INDEX "Page_ancestorIds_idx" ON "Page" USING GIN ("ancestorIds");
+
+-- Backfill the paths of the existing tree, roots (and orphans) first
+WITH RECURSIVE paths AS (
+    SELECT r.id, r."confluenceId", ARRAY[]::INTEGER[] AS path
+    FROM "Page" r
+    WHERE r."parentConfluenceId" IS NULL
+       OR NOT EXISTS (SELECT 1 FROM "Page" x WHERE x."confluenceId" = r."parentConfluenceId")
+    UNION ALL
+    SELECT c.id, c."confluenceId", p.path || p.id
+    FROM "Page" c
+    JOIN paths p ON c."parentConfluenceId" = p."confluenceId"
+)
+UPDATE "Page" pg SET "ancestorIds" = paths.path, "depth" = cardinality(paths.path)
+FROM paths
+WHERE pg.id = paths.id;
@@ -0,0 +1,77 @@
+-- AlterTable
+ALTER TABLE "Page" ADD COLUMN "childCount" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN "publicChildCount" INTEGER NOT NULL DEFAULT 0;
+
+-- Recounts the direct children of one page. A child is public when it has no
+-- submission or its submission is PUBLISHED (the same rule as the API filters).
+CREATE OR REPLACE FUNCTION refresh_page_child_counts(parent_id TEXT) RETURNS void AS $$
+BEGIN
+    IF parent_id IS NULL THEN
+        RETURN;
+    END IF;
+    UPDATE "Page" SET
+        "childCount" = counts.total,
+        "publicChildCount" = counts.public
+    FROM (
+        SELECT COUNT(*)::int AS total,
+               COUNT(*) FILTER (WHERE s.id IS NULL OR s.status = 'PUBLISHED')::int AS public
+        FROM "Page" c
+        LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = c."confluenceId"
+        WHERE c."parentConfluenceId" = parent_id
+    ) counts
+    WHERE "confluenceId" = parent_id
+      AND ("childCount", "publicChildCount") IS DISTINCT FROM (counts.total, counts.public);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Page inserts, deletes and reparents recount the old and new parent in the same transaction
+CREATE OR REPLACE FUNCTION page_child_counts_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_page_child_counts(OLD."parentConfluenceId");
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW."parentConfluenceId" IS DISTINCT FROM
+        (CASE WHEN TG_OP = 'UPDATE' THEN OLD."parentConfluenceId" END) THEN
+        PERFORM refresh_page_child_counts(NEW."parentConfluenceId");
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Page_child_counts"
+AFTER INSERT OR DELETE OR UPDATE OF "parentConfluenceId" ON "Page"
+FOR EACH ROW EXECUTE FUNCTION page_child_counts_trigger();
+
+-- Submission changes (create, approve, reject, delete) change the public count of the page's parent
+CREATE OR REPLACE FUNCTION submission_child_counts_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_page_child_counts(
+            (SELECT "parentConfluenceId" FROM "Page" WHERE "confluenceId" = OLD."confluencePageId"));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM refresh_page_child_counts(
+            (SELECT "parentConfluenceId" FROM "Page" WHERE "confluenceId" = NEW."confluencePageId"));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "ArticleSubmission_child_counts"
+AFTER INSERT OR DELETE OR UPDATE OF "status", "confluencePageId" ON "ArticleSubmission"
+FOR EACH ROW EXECUTE FUNCTION submission_child_counts_trigger();
+
+-- Backfill
+UPDATE "Page" p SET
+    "childCount" = counts.total,
+    "publicChildCount" = counts.public
+FROM (
+    SELECT c."parentConfluenceId" AS "parentId",
+           COUNT(*)::int AS total,
+           COUNT(*) FILTER (WHERE s.id IS NULL OR s.status = 'PUBLISHED')::int AS public
+    FROM "Page" c
+    LEFT JOIN "ArticleSubmission" s ON s."confluencePageId" = c."confluenceId"
+    WHERE c."parentConfluenceId" IS NOT NULL
+    GROUP BY c."parentConfluenceId"
+) counts
+WHERE p."confluenceId" = counts."parentId";
@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "PageContent" DROP COLUMN "tokenOffsets";
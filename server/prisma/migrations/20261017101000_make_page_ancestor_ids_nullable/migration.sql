@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "Page" ALTER COLUMN "ancestorIds" DROP NOT NULL;
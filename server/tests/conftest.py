@@ -0,0 +1,9 @@
+# server/tests/conftest.py
+import os
+
+# app.config reads these at import time; tests never reach Confluence or the app database
+os.environ.setdefault("CONFLUENCE_URL", "https://confluence.test/wiki")
+for name in ("CONFLUENCE_USERNAME", "CONFLUENCE_API_TOKEN", "CONFLUENCE_SPACE_KEY", "DATABASE_URL", "SECRET_KEY"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "5")
@@ -0,0 +1,61 @@
+# server/tests/test_attachment_breaker.py
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.confluence_repository import ConfluenceRepository
+from app.services.resilience import CircuitBreaker
+
+
+def run_downloads(handler, attempts: int, failures_before: int = 0):
+    """Opens `attempts` attachment streams against a mocked Confluence; returns the repository and outcomes."""
+    repo = ConfluenceRepository(settings, transport=httpx.MockTransport(handler))
+    repo.breaker = CircuitBreaker(name="test", failure_threshold=2, reset_timeout=30.0)
+    for _ in range(failures_before):
+        repo.breaker.record_failure()
+
+    async def run():
+        outcomes = []
+        try:
+            for _ in range(attempts):
+                try:
+                    response = await repo.open_attachment_stream("1", "att1")
+                    await response.aclose()
+                    outcomes.append(response)
+                except HTTPException as e:
+                    outcomes.append(e)
+        finally:
+            await repo.client.aclose()
+        return outcomes
+
+    return repo, asyncio.run(run())
+
+
+def test_failed_downloads_open_the_breaker():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(502)
+
+    repo, outcomes = run_downloads(handler, attempts=3)
+    assert all(isinstance(o, HTTPException) and o.status_code == 503 for o in outcomes)
+    assert repo.breaker.state == "open"
+    # The third download is refused without reaching Confluence
+    assert len(calls) == 2
+    assert 1 <= int(outcomes[2].headers["Retry-After"]) <= 30
+
+
+def test_successful_download_resets_the_breaker():
+    repo, outcomes = run_downloads(lambda request: httpx.Response(200, content=b"data"), attempts=1, failures_before=1)
+    assert outcomes[0].status_code == 200
+    assert repo.breaker.consecutive_failures == 0
+
+
+def test_missing_attachment_does_not_count_against_the_breaker():
+    repo, outcomes = run_downloads(lambda request: httpx.Response(404), attempts=3)
+    assert all(isinstance(o, HTTPException) for o in outcomes)
+    assert repo.breaker.state == "closed"
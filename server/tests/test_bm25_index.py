@@ -0,0 +1,48 @@
+# server/tests/test_bm25_index.py
+import os
+
+from app.services.bm25_index import BM25Index, IndexDocument
+
+
+def docs(count, word):
+    return [IndexDocument(f"p{i}", f"{word} page {i}", "", f"{word} body text", "") for i in range(count)]
+
+
+def test_index_directory_is_created_on_first_write(tmp_path):
+    index_dir = tmp_path / "index"
+    index = BM25Index(str(index_dir), max_segments=4)
+    assert not index_dir.exists()
+    assert index.search("network") == []
+
+    index.rebuild(docs(3, "network"))
+    assert len(index.search("network")) == 3
+
+
+def test_rebuild_keeps_the_previous_generation_until_the_next_one(tmp_path):
+    index = BM25Index(str(tmp_path), max_segments=4)
+    index.rebuild(docs(3, "network"))
+    index.rebuild(docs(3, "printer"))
+    assert os.path.exists(tmp_path / "segment-00000001.kbm")
+
+    index.rebuild(docs(3, "laptop"))
+    assert not os.path.exists(tmp_path / "segment-00000001.kbm")
+    assert os.path.exists(tmp_path / "segment-00000002.kbm")
+
+
+def test_reload_rereads_a_manifest_replaced_while_loading(tmp_path):
+    writer = BM25Index(str(tmp_path), max_segments=4)
+    writer.rebuild(docs(3, "network"))
+    writer.rebuild(docs(3, "network"))
+    writer.rebuild(docs(2, "network"))  # segment 1 is gone now
+
+    reader = BM25Index(str(tmp_path), max_segments=4)
+    current = reader._read_manifest
+    reads = []
+
+    def first_read_is_stale():
+        reads.append(1)
+        return {"generation": 1, "segments": ["segment-00000001.kbm"], "retired": []} if len(reads) == 1 else current()
+
+    reader._read_manifest = first_read_is_stale
+    assert len(reader.search("network")) == 2
+    assert reader.generation == 3
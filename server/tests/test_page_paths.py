@@ -0,0 +1,125 @@
+# server/tests/test_page_paths.py
+"""
+Runs the ancestor-path SQL against a real Postgres. Point TEST_DATABASE_URL at
+a scratch database; each test works in its own temporary schema.
+"""
+import os
+import uuid
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+from app.services.page_path_sql import REFRESH_ANCESTOR_PATH_SQL, REBUILD_ANCESTOR_PATHS_SQL
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture
+def conn():
+    schema = f"test_paths_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f'CREATE SCHEMA "{schema}"')
+        conn.execute(f'SET search_path TO "{schema}"')
+        conn.execute("""
+            CREATE TABLE "Page" (
+                id SERIAL PRIMARY KEY,
+                "confluenceId" TEXT NOT NULL UNIQUE,
+                "parentConfluenceId" TEXT,
+                "ancestorIds" INTEGER[] DEFAULT ARRAY[]::INTEGER[],
+                depth INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        try:
+            yield conn
+        finally:
+            conn.execute(f'DROP SCHEMA "{schema}" CASCADE')
+
+
+def add_page(conn, confluence_id, parent=None, ancestor_ids=None):
+    return conn.execute(
+        'INSERT INTO "Page" ("confluenceId", "parentConfluenceId", "ancestorIds", depth) VALUES (%s, %s, %s, %s) RETURNING id',
+        (confluence_id, parent, ancestor_ids or [], len(ancestor_ids or []))
+    ).fetchone()[0]
+
+
+def refresh(conn, confluence_id):
+    # Prisma's raw queries use $n placeholders; psycopg uses %s
+    return conn.execute(REFRESH_ANCESTOR_PATH_SQL.replace("$1", "%s"), (confluence_id,)).rowcount
+
+
+def path_of(conn, confluence_id):
+    return conn.execute(
+        'SELECT "ancestorIds", depth FROM "Page" WHERE "confluenceId" = %s', (confluence_id,)
+    ).fetchone()
+
+
+def test_root_page_gets_an_empty_path(conn):
+    add_page(conn, "root")
+    refresh(conn, "root")
+    assert path_of(conn, "root") == ([], 0)
+
+
+def test_page_with_missing_parent_is_treated_as_root(conn):
+    add_page(conn, "orphan", parent="not-in-db")
+    refresh(conn, "orphan")
+    assert path_of(conn, "orphan") == ([], 0)
+
+
+def test_moving_a_page_to_the_root_clears_its_subtree_prefix(conn):
+    root = add_page(conn, "root")
+    mid = add_page(conn, "mid", parent="root", ancestor_ids=[root])
+    add_page(conn, "leaf", parent="mid", ancestor_ids=[root, mid])
+
+    conn.execute('UPDATE "Page" SET "parentConfluenceId" = NULL WHERE "confluenceId" = %s', ("mid",))
+    assert refresh(conn, "mid") == 2
+    assert path_of(conn, "mid") == ([], 0)
+    assert path_of(conn, "leaf") == ([mid], 1)
+
+
+def test_reparenting_moves_descendants(conn):
+    a = add_page(conn, "a")
+    b = add_page(conn, "b")
+    child = add_page(conn, "child", parent="a", ancestor_ids=[a])
+    add_page(conn, "grandchild", parent="child", ancestor_ids=[a, child])
+
+    conn.execute('UPDATE "Page" SET "parentConfluenceId" = %s WHERE "confluenceId" = %s', ("b", "child"))
+    refresh(conn, "child")
+    assert path_of(conn, "child") == ([b], 1)
+    assert path_of(conn, "grandchild") == ([b, child], 2)
+    # Unchanged paths are not rewritten
+    assert refresh(conn, "child") == 0
+
+
+def test_refresh_repairs_a_null_element_path(conn):
+    conn.execute('INSERT INTO "Page" ("confluenceId", "ancestorIds", depth) VALUES (%s, ARRAY[NULL]::int[], 1)', ("root",))
+    refresh(conn, "root")
+    assert path_of(conn, "root") == ([], 0)
+
+
+def test_refresh_repairs_a_null_path_and_its_subtree(conn):
+    root = add_page(conn, "root")
+    mid = add_page(conn, "mid", parent="root")
+    leaf = add_page(conn, "leaf", parent="mid", ancestor_ids=[root, mid])
+    add_page(conn, "deep", parent="leaf", ancestor_ids=[root, mid, leaf])
+    conn.execute('UPDATE "Page" SET "ancestorIds" = NULL WHERE "confluenceId" = %s', ("mid",))
+
+    assert refresh(conn, "mid") == 3
+    assert path_of(conn, "mid") == ([root], 1)
+    assert path_of(conn, "leaf") == ([root, mid], 2)
+    assert path_of(conn, "deep") == ([root, mid, leaf], 3)
+
+
+def test_rebuild_recomputes_every_path(conn):
+    root = add_page(conn, "root")
+    mid = add_page(conn, "mid", parent="root")
+    add_page(conn, "leaf", parent="mid")
+    add_page(conn, "orphan", parent="not-in-db", ancestor_ids=[root])
+    conn.execute('UPDATE "Page" SET "ancestorIds" = NULL WHERE "confluenceId" = %s', ("leaf",))
+
+    conn.execute(REBUILD_ANCESTOR_PATHS_SQL)
+    assert path_of(conn, "root") == ([], 0)
+    assert path_of(conn, "mid") == ([root], 1)
+    assert path_of(conn, "leaf") == ([root, mid], 2)
+    assert path_of(conn, "orphan") == ([], 0)
@@ -0,0 +1,35 @@
+# server/tests/test_snippets.py
+import os
+
+import pytest
+
+from app.utils.snippets import HEADLINE_DELIMITER, HEADLINE_START, HEADLINE_STOP, headline_options, parse_headline
+
+DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+def test_fragments_are_escaped_and_marked():
+    headline = f"a <b> {HEADLINE_START}run{HEADLINE_STOP} here{HEADLINE_DELIMITER}later {HEADLINE_START}runs{HEADLINE_STOP}"
+    fragments = parse_headline(headline)
+    assert [f.text for f in fragments] == ["a <b> run here", "later runs"]
+    assert fragments[0].highlighted == "a &lt;b&gt; <mark>run</mark> here"
+
+
+def test_headline_without_a_highlight_gives_no_fragments():
+    assert parse_headline("the start of the body") == []
+    assert parse_headline("") == []
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+def test_stemmed_matches_are_highlighted():
+    psycopg = pytest.importorskip("psycopg")
+    body = "filler " * 60 + "The team was running late. " + "filler " * 60
+    with psycopg.connect(DATABASE_URL) as conn:
+        headline = conn.execute(
+            "SELECT ts_headline('english', %s, to_tsquery('english', 'run'), %s)",
+            (body, headline_options(2, 12))
+        ).fetchone()[0]
+    fragments = parse_headline(headline)
+    assert len(fragments) == 1
+    assert "<mark>running</mark>" in fragments[0].highlighted
+    assert len(fragments[0].text.split()) <= 12